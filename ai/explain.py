@@ -1,174 +1,274 @@
 import os
-from google import genai
-from dotenv import load_dotenv
+import threading
+from functools import lru_cache
 
-load_dotenv()
 
-api_key = os.getenv("GEMINI_API_KEY")
+# ----------------------------
+# Lazy Gemini client
+# ----------------------------
 
-if api_key:
-    client = genai.Client(api_key=api_key)
-else:
-    client = None
+# google.genai costs about a second to import; it is only loaded once an
+# LLM-backed explanation actually asks for the client.
+_client = None
+_client_lock = threading.Lock()
+_env_loaded = False
 
-def generate_explanation(risk_data):
 
-    # ---- Core Inputs ----
+def _load_env():
+    # .env is read once; later calls are a flag check
+    global _env_loaded
+
+    if not _env_loaded:
+        with _client_lock:
+            if not _env_loaded:
+                from dotenv import load_dotenv
+                load_dotenv()
+                _env_loaded = True
+
+
+def get_client():
+    """
+    Returns the shared genai.Client, building it on first use.
+    Returns None when GEMINI_API_KEY is not set. GEMINI_BASE_URL sends the
+    requests to another endpoint, e.g. benchmarks.fake_model under load tests.
+    """
+
+    global _client
+
+    if _client is None:
+        _load_env()
+
+        # Without a key every call falls back, so keep that path lock-free
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return None
+
+        with _client_lock:
+            if _client is None:
+                from google import genai
+
+                base_url = os.getenv("GEMINI_BASE_URL")
+                http_options = genai.types.HttpOptions(base_url=base_url) if base_url else None
+                _client = genai.Client(api_key=api_key, http_options=http_options)
+
+    return _client
+
+
+def __getattr__(name):
+    # Backwards compatible `ai.explain.client`
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# ----------------------------
+# Deterministic explanation
+# ----------------------------
+
+OPENING_TEMPLATES = {
+    "reassuring": {
+        "HIGH RISK": "There is a high level of risk right now, but it can be managed with the right steps.",
+        "CAUTION": "There is some risk present, but it may be reduced with adjustments.",
+        "SAFE": "Based on the current inputs, no major safety concerns were detected."
+    },
+    "standard": {
+        "HIGH RISK": "This situation carries a high safety risk based on the current inputs.",
+        "CAUTION": "There is a moderate safety concern with the current timing or combination.",
+        "SAFE": "Based on the current inputs, no major safety concerns were detected."
+    },
+    "firm": {
+        "HIGH RISK": "This situation presents a serious safety risk and requires caution.",
+        "CAUTION": "There is a noticeable safety concern that should not be ignored.",
+        "SAFE": "Risk appears minimal under current conditions."
+    }
+}
+UNKNOWN_OPENING = "The current safety level could not be determined."
+
+# Organ load from which the dominant organ is called out
+ORGAN_THRESHOLD = 4
+
+ORGAN_PHRASES = {
+    "general": {
+        "liver": "There is stress on the liver.",
+        "kidney": "There is strain on the kidneys.",
+        "stomach": "There is irritation risk in the stomach."
+    },
+    "clinical": {
+        "liver": "Liver strain is elevated.",
+        "kidney": "Renal stress levels are increased.",
+        "stomach": "Gastrointestinal irritation risk is elevated."
+    }
+}
+ORGAN_DETAIL = "This may reduce the body's ability to safely handle additional dosing."
+
+# Conflict keywords in the order they are checked, each giving one sentence
+# at most once. liver and kidney are skipped when the organ is already
+# called out.
+CONFLICT_SENTENCES = (
+    ("pregnancy", "This medication is generally not recommended during pregnancy."),
+    ("age", "This medication may not be appropriate for the given age."),
+    ("duplicate", "The same active ingredient appears more than once, which increases risk."),
+    ("nsaid", "Combining multiple anti-inflammatory medicines increases safety risk."),
+    ("dose", "The total dose exceeds recommended limits."),
+    ("liver", "There is significant stress on the liver."),
+    ("kidney", "Kidney strain is contributing to the overall risk.")
+)
+ORGAN_KEYWORDS = frozenset(i for i, (word, _) in enumerate(CONFLICT_SENTENCES) if word in ("liver", "kidney"))
+
+CLOSING_TEMPLATES = {
+    "soft": "Consider waiting before the next dose to lower potential risk.",
+    "normal": "Waiting before the next dose may help reduce potential harm.",
+    "strict": "It is strongly recommended to wait before taking another dose and avoid additional risk factors."
+}
+SAFE_CLOSING = "Following the recommended schedule should remain appropriate."
+SAFE_PARACETAMOL_CLOSING = (
+    "The current paracetamol dose is well within recommended pediatric or adult "
+    "safety limits for the given weight and timing."
+)
+
+PROFESSIONAL_BOUNDARY = (
+    "This assessment provides general medication safety guidance and does not "
+    "replace professional medical evaluation."
+)
+
+# Distinct explanation texts kept (a key is a handful of small values)
+EXPLANATION_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=1024)
+def _conflict_keywords(risk):
+    text = risk.lower()
+    return tuple(i for i, (word, _) in enumerate(CONFLICT_SENTENCES) if word in text)
+
+
+def explanation_key(risk_data):
+    """
+    Reduces a result to everything generate_explanation() depends on:
+    (risk level, mode, dominant strained organ, audience, extra detail,
+    conflict sentences, closing, professional boundary).
+    """
+
     risk_level = risk_data.get("risk_level", "UNKNOWN")
     liver = risk_data.get("liver_load", 0)
     kidney = risk_data.get("kidney_load", 0)
     stomach = risk_data.get("stomach_risk", 0)
-    issues = risk_data.get("conflicts", [])
 
-    # ---- Customization Controls ----
     mode = risk_data.get("mode", "standard")
-    detail = risk_data.get("detail", "medium")
-    strength = risk_data.get("strength", "normal")
-    audience = risk_data.get("audience", "general")
-
-    explanation = []
-    added_flags = set()
-
-    # -------------------------
-    # 1️⃣ Opening Tone Control
-    # -------------------------
-    opening_templates = {
-        "reassuring": {
-            "HIGH RISK": "There is a high level of risk right now, but it can be managed with the right steps.",
-            "CAUTION": "There is some risk present, but it may be reduced with adjustments.",
-            "SAFE": "Based on the current inputs, no major safety concerns were detected."
-        },
-        "standard": {
-            "HIGH RISK": "This situation carries a high safety risk based on the current inputs.",
-            "CAUTION": "There is a moderate safety concern with the current timing or combination.",
-            "SAFE": "Based on the current inputs, no major safety concerns were detected."
-        },
-        "firm": {
-            "HIGH RISK": "This situation presents a serious safety risk and requires caution.",
-            "CAUTION": "There is a noticeable safety concern that should not be ignored.",
-            "SAFE": "Risk appears minimal under current conditions."
-        }
-    }
+    if mode not in OPENING_TEMPLATES:
+        mode = "standard"
 
-    explanation.append(
-        opening_templates.get(mode, opening_templates["standard"])
-        .get(risk_level, "The current safety level could not be determined.")
-    )
+    # First of the highest, as max() over liver, kidney, stomach
+    organ, value = "liver", liver
+    if kidney > value:
+        organ, value = "kidney", kidney
+    if stomach > value:
+        organ, value = "stomach", stomach
 
-    # -------------------------
-    # 2️⃣ Dominant Organ Logic
-    # -------------------------
-    organ_scores = {"liver": liver, "kidney": kidney, "stomach": stomach}
-    main_organ = max(organ_scores, key=organ_scores.get)
-    main_value = organ_scores[main_organ]
-
-    if main_value >= 4:
-        organ_phrases = {
-            "general": {
-                "liver": "There is stress on the liver.",
-                "kidney": "There is strain on the kidneys.",
-                "stomach": "There is irritation risk in the stomach."
-            },
-            "clinical": {
-                "liver": "Liver strain is elevated.",
-                "kidney": "Renal stress levels are increased.",
-                "stomach": "Gastrointestinal irritation risk is elevated."
-            }
-        }
-
-        explanation.append(organ_phrases[audience][main_organ])
-
-        if detail in ["medium", "high"]:
-            explanation.append(
-                "This may reduce the body's ability to safely handle additional dosing."
-            )
-
-    # -------------------------
-    # 3️⃣ Conflict Awareness
-    # -------------------------
-    for issue in issues:
+    strained = value >= ORGAN_THRESHOLD
+    audience = risk_data.get("audience", "general") if strained else None
+    detail = strained and risk_data.get("detail", "medium") in ["medium", "high"]
+
+    flags = []
+    for issue in risk_data.get("conflicts", []):
         if not isinstance(issue, dict) or "risk" not in issue:
             continue
-
-        text = issue["risk"].lower()
-
-        if "pregnancy" in text and "pregnancy" not in added_flags:
-            explanation.append(
-                "This medication is generally not recommended during pregnancy."
-            )
-            added_flags.add("pregnancy")
-
-        elif "age" in text and "age" not in added_flags:
-            explanation.append(
-                "This medication may not be appropriate for the given age."
-            )
-            added_flags.add("age")
-
-        elif "duplicate" in text and "duplicate" not in added_flags:
-            explanation.append(
-                "The same active ingredient appears more than once, which increases risk."
-            )
-            added_flags.add("duplicate")
-
-        elif "nsaid" in text and "nsaid" not in added_flags:
-            explanation.append(
-                "Combining multiple anti-inflammatory medicines increases safety risk."
-            )
-            added_flags.add("nsaid")
-
-        elif "dose" in text and "dose" not in added_flags:
-            explanation.append(
-                "The total dose exceeds recommended limits."
-            )
-            added_flags.add("dose")
-
-        elif "liver" in text and "liver" not in added_flags and main_value < 4:
-            explanation.append(
-                "There is significant stress on the liver."
-            )
-            added_flags.add("liver")
-
-        elif "kidney" in text and "kidney" not in added_flags and main_value < 4:
-            explanation.append(
-                "Kidney strain is contributing to the overall risk."
-            )
-            added_flags.add("kidney")
-
-    # -------------------------
-    # 4️⃣ Strength-Based Closing
-    # -------------------------
-    closing_templates = {
-        "soft": "Consider waiting before the next dose to lower potential risk.",
-        "normal": "Waiting before the next dose may help reduce potential harm.",
-        "strict": "It is strongly recommended to wait before taking another dose and avoid additional risk factors."
-    }
+        for keyword in _conflict_keywords(issue["risk"]):
+            if keyword not in flags and not (strained and keyword in ORGAN_KEYWORDS):
+                flags.append(keyword)
+                break
 
     if risk_level == "SAFE":
-        if risk_data.get("medicine") == "paracetamol":
-            explanation.append(
-                "The current paracetamol dose is well within recommended pediatric or adult safety limits for the given weight and timing."
-            )
-        else:
-            explanation.append(
-                "Following the recommended schedule should remain appropriate."
-            )
+        closing = "paracetamol" if risk_data.get("medicine") == "paracetamol" else "schedule"
     else:
-        explanation.append(
-            closing_templates.get(strength, closing_templates["normal"])
-        )
-
-    # -------------------------
-    # 5️⃣ Professional Boundary
-    # -------------------------
-    severe_case = (
-        risk_level == "HIGH RISK" or
-        liver >= 6 or
-        kidney >= 5
+        closing = risk_data.get("strength", "normal")
+        if closing not in CLOSING_TEMPLATES:
+            closing = "normal"
+
+    severe = risk_level == "HIGH RISK" or liver >= 6 or kidney >= 5
+
+    return (
+        risk_level, mode, organ if strained else None, audience,
+        detail, tuple(flags), closing, severe
     )
 
-    if severe_case:
-        explanation.append(
-            "This assessment provides general medication safety guidance and does not replace professional medical evaluation."
-        )
+
+@lru_cache(maxsize=EXPLANATION_CACHE_SIZE)
+def compose_explanation(key):
+    risk_level, mode, organ, audience, detail, flags, closing, severe = key
+
+    explanation = [OPENING_TEMPLATES[mode].get(risk_level, UNKNOWN_OPENING)]
+
+    if organ is not None:
+        explanation.append(ORGAN_PHRASES[audience][organ])
+        if detail:
+            explanation.append(ORGAN_DETAIL)
+
+    explanation.extend(CONFLICT_SENTENCES[flag][1] for flag in flags)
+
+    if closing == "paracetamol":
+        explanation.append(SAFE_PARACETAMOL_CLOSING)
+    elif closing == "schedule":
+        explanation.append(SAFE_CLOSING)
+    else:
+        explanation.append(CLOSING_TEMPLATES[closing])
+
+    if severe:
+        explanation.append(PROFESSIONAL_BOUNDARY)
 
     return " ".join(explanation)
+
+
+def generate_explanation(risk_data):
+    """
+    Plain-language explanation of an analyze() result. The text depends
+    only on explanation_key(), so each distinct key is composed once.
+    """
+
+    return compose_explanation(explanation_key(risk_data))
+
+
+# ----------------------------
+# LLM-backed explanation
+# ----------------------------
+
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.0-flash")
+
+LLM_PROMPT = (
+    "You explain the output of a deterministic medication safety engine to a patient. "
+    "Do not change the risk level or give new medical advice; only explain the findings "
+    "below in two to four plain sentences.\n\n"
+    "Risk level: {risk_level}\n"
+    "Score: {score}\n"
+    "Conflicts: {conflicts}\n"
+    "Guidance: {guidance}\n"
+    "Organ load (liver/kidney/stomach): {liver}/{kidney}/{stomach}"
+)
+
+
+def generate_llm_explanation(risk_data, client=None):
+    """
+    Asks the Gemini model to phrase the engine result. Raises RuntimeError
+    when no client is configured; callers fall back to generate_explanation().
+    """
+
+    client = client or get_client()
+    if client is None:
+        raise RuntimeError("GEMINI_API_KEY is not configured")
+
+    prompt = LLM_PROMPT.format(
+        risk_level=risk_data.get("risk_level", "UNKNOWN"),
+        score=risk_data.get("score", 0),
+        conflicts="; ".join(
+            c["risk"] for c in risk_data.get("conflicts", []) if isinstance(c, dict) and "risk" in c
+        ) or "none",
+        guidance=" ".join(risk_data.get("guidance", [])) or "none",
+        liver=risk_data.get("liver_load", 0),
+        kidney=risk_data.get("kidney_load", 0),
+        stomach=risk_data.get("stomach_risk", 0)
+    )
+
+    response = client.models.generate_content(model=GEMINI_MODEL, contents=prompt)
+    text = (response.text or "").strip()
+    if not text:
+        raise RuntimeError("Empty explanation from model")
+    return text
@@ -0,0 +1,220 @@
+"""
+Explanation stage with a latency budget.
+
+A model is any callable taking the engine result and returning text
+(generate_llm_explanation, or a local stub in tests). Model calls run on a
+bounded thread pool; when the budget runs out or the model fails, the
+deterministic generate_explanation() text is used instead, so /analyze
+latency never depends on the remote model.
+
+Deferred jobs let the API answer immediately and deliver the model's
+explanation later (polling or server-sent events). Jobs live in this
+process only: run the API with one worker process (and threads), or
+route polls back to the same worker.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from ai.explain import generate_explanation, generate_llm_explanation
+
+
+SOURCE_TEMPLATE = "template"
+SOURCE_MODEL = "model"
+SOURCE_FALLBACK = "fallback"
+
+
+class ExplanationJob:
+    """
+    A deferred explanation. The budget is enforced lazily: whoever polls or
+    waits after the deadline resolves the job to the fallback text.
+    """
+
+    __slots__ = ("id", "created", "deadline", "text", "source", "done", "_future", "_result", "_service")
+
+    def __init__(self, service, result, future, budget):
+        self.id = uuid.uuid4().hex
+        self.created = time.monotonic()
+        self.deadline = self.created + budget
+        self.text = None
+        self.source = None
+        self.done = threading.Event()
+        self._future = future
+        self._result = result
+        self._service = service
+
+        if future is not None:
+            future.add_done_callback(lambda _: self.poll())
+
+    def _complete(self, text, source):
+        with self._service._lock:
+            if self.done.is_set():
+                return
+            self.text, self.source = text, source
+            self._future = self._result = None
+            self.done.set()
+
+    def poll(self):
+        # Read under the lock _complete() clears them with, so a job resolved
+        # meanwhile by another thread is never explained from a None result
+        with self._service._lock:
+            if self.done.is_set():
+                return
+            future, result = self._future, self._result
+
+        if future is None:
+            self._complete(generate_explanation(result), SOURCE_TEMPLATE)
+        elif future.done() or time.monotonic() >= self.deadline:
+            self._complete(*self._service._resolve(future, result, 0))
+
+    def wait(self, timeout):
+        """
+        Blocks until the job is resolved, the deadline passes or timeout expires.
+        """
+
+        self.done.wait(max(0.0, min(timeout, self.deadline - time.monotonic())))
+        self.poll()
+        return self.done.is_set()
+
+    def as_dict(self):
+        self.poll()
+        if not self.done.is_set():
+            return {"id": self.id, "status": "pending"}
+        return {
+            "id": self.id,
+            "status": "ready",
+            "ai_explanation": self.text,
+            "source": self.source
+        }
+
+
+class ExplanationService:
+
+    def __init__(
+        self,
+        model=None,
+        budget=1.5,
+        deferred_budget=15.0,
+        max_workers=8,
+        max_jobs=10000,
+        job_ttl=300.0
+    ):
+        self.model = model
+        self.budget = budget
+        self.deferred_budget = deferred_budget
+        self.max_jobs = max_jobs
+        self.job_ttl = job_ttl
+
+        self.fallbacks = 0
+        self.model_calls = 0
+
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="explain") if model else None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---------------- Synchronous, budgeted ----------------
+
+    def explain(self, result, budget=None):
+        """
+        Returns (text, source). Never waits longer than the budget for the model.
+        """
+
+        if self.model is None:
+            return generate_explanation(result), SOURCE_TEMPLATE
+
+        future = self._executor.submit(self.model, result)
+        return self._resolve(future, result, self.budget if budget is None else budget)
+
+    def explain_many(self, results, budget=None):
+        """
+        Returns (text, source) per result. The model calls run concurrently
+        and share one budget, so a batch never waits longer than that in total.
+        """
+
+        if self.model is None:
+            return [(generate_explanation(result), SOURCE_TEMPLATE) for result in results]
+
+        deadline = time.monotonic() + (self.budget if budget is None else budget)
+        futures = [self._executor.submit(self.model, result) for result in results]
+        return [
+            self._resolve(future, result, deadline - time.monotonic())
+            for future, result in zip(futures, results)
+        ]
+
+    def _resolve(self, future, result, budget):
+        try:
+            text = future.result(timeout=max(budget, 0))
+            with self._lock:
+                self.model_calls += 1
+            return text, SOURCE_MODEL
+        except TimeoutError:
+            # The worker thread finishes in the background; its result is dropped
+            future.cancel()
+        except Exception:
+            pass
+
+        with self._lock:
+            self.fallbacks += 1
+        return generate_explanation(result), SOURCE_FALLBACK
+
+    # ---------------- Deferred ----------------
+
+    def submit(self, result):
+        """
+        Starts a deferred explanation and returns its job immediately.
+        """
+
+        future = self._executor.submit(self.model, result) if self.model else None
+        job = ExplanationJob(self, result, future, self.deferred_budget)
+
+        with self._lock:
+            self._expire_jobs()
+            self._jobs[job.id] = job
+
+        job.poll()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _expire_jobs(self):
+        now = time.monotonic()
+        while self._jobs:
+            oldest = next(iter(self._jobs.values()))
+            if len(self._jobs) < self.max_jobs and now - oldest.created < self.job_ttl:
+                break
+            self._jobs.popitem(last=False)
+
+    def stats(self):
+        return {
+            "model_calls": self.model_calls,
+            "fallbacks": self.fallbacks,
+            "pending_jobs": sum(1 for job in list(self._jobs.values()) if not job.done.is_set())
+        }
+
+
+def service_from_env():
+    """
+    EXPLANATION_MODEL=gemini enables the LLM-backed explanation (needs
+    GEMINI_API_KEY); anything else keeps the deterministic templates.
+    """
+
+    model = None
+    if os.environ.get("EXPLANATION_MODEL", "").lower() == "gemini":
+        model = generate_llm_explanation
+
+    return ExplanationService(
+        model=model,
+        budget=float(os.environ.get("EXPLANATION_BUDGET_MS", 1500)) / 1000,
+        deferred_budget=float(os.environ.get("EXPLANATION_DEFERRED_BUDGET_MS", 15000)) / 1000,
+        max_workers=int(os.environ.get("EXPLANATION_WORKERS", 8))
+    )
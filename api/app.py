@@ -1,20 +1,42 @@
+import atexit
+import json
+import logging
 import os
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from engine.analyzer import analyze
-from ai.explain import generate_explanation
+from api import handlers
+from api.serialize import dumps
 
 
-app = Flask(__name__)
-CORS(app)
+# Longest a server-sent events connection waits for a deferred explanation
+SSE_TIMEOUT = float(os.environ.get("EXPLANATION_SSE_TIMEOUT", 30))
 
+class JSONProvider(DefaultJSONProvider):
+    """
+    jsonify() through api.serialize.dumps, the same encoder as the ASGI app.
+    """
 
-@app.route("/health", methods=["GET"])
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            # Indented output for debugging
+            return super().response(*args, **kwargs)
+
+        return self._app.response_class(
+            dumps(self._prepare_response_obj(args, kwargs)), mimetype=self.mimetype
+        )
+
+
+routes = Blueprint("api", __name__)
+
+
+@routes.route("/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "API running"}), 200
+    payload, status = handlers.handle_health()
+    return jsonify(payload), status
 
 
-@app.route("/analyze", methods=["POST"])
+@routes.route("/analyze", methods=["POST"])
 def analyze_medicine():
 
     if not request.is_json:
@@ -22,25 +44,148 @@ def analyze_medicine():
 
     data = request.get_json()
 
-    try:
-        # 1️⃣ Deterministic Safety Engine
-        result = analyze(data)
+    payload, status = handlers.handle_analyze(data, request.args.get("explain"))
+    return jsonify(payload), status
+
+
+@routes.route("/analyze/batch", methods=["POST"])
+def analyze_batch():
+
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    payload, status = handlers.handle_batch(request.get_json())
+    return jsonify(payload), status
+
+
+@routes.route("/next-dose", methods=["POST"])
+def next_dose():
+
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    payload, status = handlers.handle_next_dose(request.get_json())
+    return jsonify(payload), status
+
+
+@routes.route("/sweep", methods=["POST"])
+def sweep():
+
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    payload, status = handlers.handle_sweep(request.get_json())
+    return jsonify(payload), status
+
+
+@routes.route("/search", methods=["GET"])
+def search():
+    payload, status = handlers.handle_search(request.args.get("q"), request.args.get("limit"))
+    return jsonify(payload), status
+
+
+@routes.route("/rules", methods=["GET"])
+def rules_snapshot():
+    body, status, headers = handlers.handle_rules(request.headers.get("If-None-Match"))
+    return Response(body, status=status, headers=headers, mimetype="application/json")
+
+
+@routes.route("/sessions", methods=["POST"])
+def create_session():
+
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    payload, status = handlers.handle_create_session(request.get_json())
+    return jsonify(payload), status
+
+
+@routes.route("/sessions/<session_id>", methods=["GET", "PATCH", "DELETE"])
+def session_resource(session_id):
+
+    if request.method == "GET":
+        payload, status = handlers.handle_get_session(session_id)
+    elif request.method == "DELETE":
+        payload, status = handlers.handle_delete_session(session_id)
+    elif not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+    else:
+        payload, status = handlers.handle_update_session(session_id, request.get_json())
+
+    return jsonify(payload), status
+
+
+@routes.route("/sessions/<session_id>/doses", methods=["POST"])
+def session_dose(session_id):
+
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    payload, status = handlers.handle_session_dose(session_id, request.get_json())
+    return jsonify(payload), status
+
+
+@routes.route("/explanations/<job_id>", methods=["GET"])
+def explanation_status(job_id):
+    payload, status = handlers.handle_explanation_status(job_id)
+    return jsonify(payload), status
+
+
+@routes.route("/explanations/<job_id>/events", methods=["GET"])
+def explanation_events(job_id):
+    job = handlers.explanations.get(job_id)
+
+    if job is None:
+        return jsonify({"error": "Unknown explanation id"}), 404
+
+    def events():
+        waited = 0.0
+        while not job.wait(min(5.0, SSE_TIMEOUT - waited)):
+            waited += 5.0
+            if waited >= SSE_TIMEOUT:
+                break
+            # Comment line keeps proxies from closing an idle stream
+            yield ": waiting\n\n"
+
+        yield f"event: explanation\ndata: {json.dumps(job.as_dict())}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@routes.route("/admin/reload", methods=["POST"])
+def reload_rules():
+    payload, status = handlers.handle_reload(request.headers.get("X-Admin-Token"))
+    return jsonify(payload), status
+
+
+@routes.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(handlers.metrics_text(), mimetype="text/plain; version=0.0.4")
 
-        # If engine returns validation error → do NOT call AI
-        if "error" in result:
-            return jsonify(result), 400
 
-        # 2️⃣ AI Explanation Layer
-        explanation = generate_explanation(result)
+def create_app():
+    """
+    The Flask app. It starts no rule watcher: the server does that on
+    startup (below, or api.gunicorn_conf under gunicorn).
+    """
 
-        result["ai_explanation"] = explanation
+    app = Flask(__name__)
+    app.json = JSONProvider(app)
+    CORS(app)
+    app.register_blueprint(routes)
+    return app
 
-        return jsonify(result), 200
 
-    except Exception as e:
-        return jsonify({"error": "Internal server error"}), 500
+app = create_app()
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING"))
     port = int(os.environ.get("PORT", 5050))
+    handlers.start_rule_watcher()
+    atexit.register(handlers.rule_watcher.stop)
     app.run(host="0.0.0.0", port=port)
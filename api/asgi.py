@@ -0,0 +1,307 @@
+"""
+ASGI serving mode.
+
+Serves the same routes and JSON bodies as the Flask app (api.app), built
+on the shared api.handlers. analyze() runs on a bounded thread pool so the
+event loop stays free for slow clients, keep-alive connections and
+pipelined requests:
+
+    uvicorn api.asgi:app --host 0.0.0.0 --port 5050 --workers 4
+
+ASGI_EXECUTOR_THREADS bounds the analyze pool (default 8) and
+ASGI_MAX_PENDING bounds how many requests may queue for it (default 256).
+"""
+
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from api import handlers
+from api.serialize import dumps
+from engine.rulebook import get_rulebook
+
+
+EXECUTOR_THREADS = int(os.environ.get("ASGI_EXECUTOR_THREADS", 8))
+MAX_PENDING = int(os.environ.get("ASGI_MAX_PENDING", 256))
+MAX_BODY_BYTES = int(os.environ.get("ASGI_MAX_BODY_BYTES", 16 * 1024 * 1024))
+SSE_TIMEOUT = float(os.environ.get("EXPLANATION_SSE_TIMEOUT", 30))
+
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+_executor = ThreadPoolExecutor(EXECUTOR_THREADS, thread_name_prefix="analyze")
+_pending = None
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+
+async def _respond(send, status, body, content_type=b"application/json", headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type),
+            (b"content-length", str(len(body)).encode()),
+            *CORS_HEADERS,
+            *headers
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _respond_json(send, payload, status):
+    await _respond(send, status, dumps(payload))
+
+
+async def _read_body(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise _BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _is_json(scope):
+    for name, value in scope["headers"]:
+        if name == b"content-type":
+            mimetype = value.split(b";", 1)[0].strip().lower()
+            return mimetype == b"application/json" or (
+                mimetype.startswith(b"application/") and mimetype.endswith(b"+json")
+            )
+    return False
+
+
+async def _offload(fn, *args):
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(MAX_PENDING)
+
+    async with _pending:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+async def _json_request(scope, receive, send):
+    """
+    Returns (data,) with the decoded JSON body (which may itself be None),
+    or None after an error response has been sent.
+    """
+
+    if not _is_json(scope):
+        await _respond_json(send, {"error": "Request must be JSON"}, 400)
+        return None
+
+    try:
+        body = await _read_body(receive)
+    except _BodyTooLarge:
+        await _respond_json(send, {"error": "Request body too large"}, 413)
+        return None
+
+    if body is None:
+        return None
+
+    try:
+        return (json.loads(body),)
+    except ValueError:
+        await _respond_json(send, {"error": "Invalid JSON body"}, 400)
+        return None
+
+
+# ----------------------------
+# Routes
+# ----------------------------
+
+async def _analyze(scope, receive, send):
+    data = await _json_request(scope, receive, send)
+    if data is None:
+        return
+
+    explain = parse_qs(scope.get("query_string", b"").decode()).get("explain", [None])[0]
+    payload, status = await _offload(handlers.handle_analyze, data[0], explain)
+    await _respond_json(send, payload, status)
+
+
+async def _batch(scope, receive, send):
+    data = await _json_request(scope, receive, send)
+    if data is None:
+        return
+
+    payload, status = await _offload(handlers.handle_batch, data[0])
+    await _respond_json(send, payload, status)
+
+
+async def _next_dose(scope, receive, send):
+    data = await _json_request(scope, receive, send)
+    if data is None:
+        return
+
+    payload, status = await _offload(handlers.handle_next_dose, data[0])
+    await _respond_json(send, payload, status)
+
+
+async def _sweep(scope, receive, send):
+    data = await _json_request(scope, receive, send)
+    if data is None:
+        return
+
+    payload, status = await _offload(handlers.handle_sweep, data[0])
+    await _respond_json(send, payload, status)
+
+
+async def _sessions(scope, receive, send, method, parts):
+    # parts: ["", "sessions"], ["", "sessions", id] or ["", "sessions", id, "doses"]
+    if len(parts) == 2 and method == "POST":
+        data = await _json_request(scope, receive, send)
+        if data is not None:
+            await _respond_json(send, *await _offload(handlers.handle_create_session, data[0]))
+
+    elif len(parts) == 3 and method == "GET":
+        await _respond_json(send, *await _offload(handlers.handle_get_session, parts[2]))
+
+    elif len(parts) == 3 and method == "DELETE":
+        await _respond_json(send, *await _offload(handlers.handle_delete_session, parts[2]))
+
+    elif len(parts) == 3 and method == "PATCH":
+        data = await _json_request(scope, receive, send)
+        if data is not None:
+            await _respond_json(send, *await _offload(handlers.handle_update_session, parts[2], data[0]))
+
+    elif len(parts) == 4 and parts[3] == "doses" and method == "POST":
+        data = await _json_request(scope, receive, send)
+        if data is not None:
+            await _respond_json(send, *await _offload(handlers.handle_session_dose, parts[2], data[0]))
+
+    else:
+        await _respond_json(send, {"error": "Not found"}, 404)
+
+
+async def _explanation_events(send, job_id):
+    job = handlers.explanations.get(job_id)
+    if job is None:
+        await _respond_json(send, {"error": "Unknown explanation id"}, 404)
+        return
+
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+            *CORS_HEADERS
+        ]
+    })
+
+    loop = asyncio.get_running_loop()
+    waited = 0.0
+    while not await loop.run_in_executor(None, job.wait, min(5.0, SSE_TIMEOUT - waited)):
+        waited += 5.0
+        if waited >= SSE_TIMEOUT:
+            break
+        await send({"type": "http.response.body", "body": b": waiting\n\n", "more_body": True})
+
+    event = f"event: explanation\ndata: {json.dumps(job.as_dict())}\n\n"
+    await send({"type": "http.response.body", "body": event.encode()})
+
+
+async def _http(scope, receive, send):
+    method = scope["method"]
+    path = scope["path"].rstrip("/") or "/"
+
+    if method == "OPTIONS":
+        await _respond(send, 204, b"", headers=[
+            (b"access-control-allow-methods", b"GET, POST, PATCH, DELETE, OPTIONS"),
+            (b"access-control-allow-headers", b"Content-Type, X-Admin-Token")
+        ])
+        return
+
+    if path == "/health" and method == "GET":
+        payload, status = handlers.handle_health()
+        await _respond_json(send, payload, status)
+
+    elif path == "/analyze" and method == "POST":
+        await _analyze(scope, receive, send)
+
+    elif path == "/analyze/batch" and method == "POST":
+        await _batch(scope, receive, send)
+
+    elif path == "/next-dose" and method == "POST":
+        await _next_dose(scope, receive, send)
+
+    elif path == "/sweep" and method == "POST":
+        await _sweep(scope, receive, send)
+
+    elif path == "/search" and method == "GET":
+        query = parse_qs(scope.get("query_string", b"").decode())
+        payload, status = await _offload(
+            handlers.handle_search, query.get("q", [None])[0], query.get("limit", [None])[0]
+        )
+        await _respond_json(send, payload, status)
+
+    elif path == "/rules" and method == "GET":
+        if_none_match = dict(scope["headers"]).get(b"if-none-match")
+        body, status, headers = handlers.handle_rules(if_none_match.decode("latin-1") if if_none_match else None)
+        await _respond(send, status, body, headers=[
+            (name.lower().encode(), value.encode()) for name, value in headers.items()
+        ])
+
+    elif path == "/admin/reload" and method == "POST":
+        token = dict(scope["headers"]).get(b"x-admin-token")
+        payload, status = await _offload(handlers.handle_reload, token.decode("latin-1") if token else None)
+        await _respond_json(send, payload, status)
+
+    elif path == "/metrics" and method == "GET":
+        body = handlers.metrics_text().encode()
+        await _respond(send, 200, body, b"text/plain; version=0.0.4; charset=utf-8")
+
+    elif path == "/sessions" or path.startswith("/sessions/"):
+        await _sessions(scope, receive, send, method, path.split("/"))
+
+    elif path.startswith("/explanations/") and method == "GET":
+        parts = path.split("/")
+        if len(parts) == 3:
+            payload, status = handlers.handle_explanation_status(parts[2])
+            await _respond_json(send, payload, status)
+        elif len(parts) == 4 and parts[3] == "events":
+            await _explanation_events(send, parts[2])
+        else:
+            await _respond_json(send, {"error": "Not found"}, 404)
+
+    else:
+        await _respond_json(send, {"error": "Not found"}, 404)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Load the rules and name index before the first request rather than during it
+            get_rulebook().search_index
+            handlers.start_rule_watcher()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            handlers.rule_watcher.stop()
+            _executor.shutdown(wait=False, cancel_futures=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "http":
+        await _http(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        await _lifespan(receive, send)
@@ -0,0 +1,20 @@
+"""
+gunicorn hooks for api.app:
+
+    gunicorn -c python:api.gunicorn_conf api.app:app
+
+Each worker starts its own rule watcher after the fork (threads do not
+survive a fork, and the master serves no requests) and stops it on exit.
+"""
+
+
+def post_fork(server, worker):
+    from api import handlers
+
+    handlers.start_rule_watcher()
+
+
+def worker_exit(server, worker):
+    from api import handlers
+
+    handlers.rule_watcher.stop()
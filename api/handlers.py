@@ -0,0 +1,443 @@
+"""
+Transport-independent request handlers shared by the Flask app
+(api.app) and the ASGI app (api.asgi), so both serve identical JSON.
+
+Each handler takes already-decoded request data and returns
+(payload, status); handle_rules returns ready-encoded bytes instead.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+
+from engine.analyzer import analyze, analyze_many
+from engine.cache import ResultCache, cached_call
+from engine.next_dose import next_safe_dose
+from engine.session import add_dose, store_from_env, update_profile, validate_profile
+from engine.metrics import render_stage_timings, stage_timing_enabled
+from engine.reload import RuleWatcher
+from engine.rulebook import get_rulebook
+from engine.search import MAX_RESULTS as MAX_SEARCH_RESULTS
+from ai.explain import generate_explanation
+from ai.explain_service import service_from_env
+from api.serialize import dumps
+
+
+MAX_BATCH_ITEMS = int(os.environ.get("MAX_BATCH_ITEMS", 10000))
+MAX_SWEEP_CELLS = int(os.environ.get("MAX_SWEEP_CELLS", 250000))
+MAX_SEARCH_QUERY = 100
+
+# How long clients may reuse a /rules snapshot before revalidating it. The
+# snapshot only drives client-side prechecks and autocomplete; /analyze
+# always checks against the live rules, so a stale copy is never unsafe.
+RULES_MAX_AGE = int(os.environ.get("RULES_MAX_AGE", 86400))
+
+# Optional result cache in front of analyze + explanation (0 disables)
+CACHE_SIZE = int(os.environ.get("ANALYZE_CACHE_SIZE", 0))
+CACHE_TTL = float(os.environ.get("ANALYZE_CACHE_TTL", 0)) or None
+
+result_cache = ResultCache(CACHE_SIZE, CACHE_TTL) if CACHE_SIZE > 0 else None
+
+# Budgeted (optionally LLM-backed) explanation stage
+explanations = service_from_env()
+
+# Patient sessions: SESSION_STORE=memory (default) or sqlite:///path/to.db
+sessions = store_from_env(os.environ.get("SESSION_STORE"))
+
+# Rule hot reload: RULES_WATCH_INTERVAL seconds between file checks (0 = off);
+# POST /admin/reload needs the X-Admin-Token header to match ADMIN_TOKEN.
+RULES_WATCH_INTERVAL = float(os.environ.get("RULES_WATCH_INTERVAL", 0))
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+rule_watcher = RuleWatcher(interval=RULES_WATCH_INTERVAL)
+
+
+def start_rule_watcher():
+    """
+    Starts polling the rule files when RULES_WATCH_INTERVAL is set. Called
+    by the servers on startup (api.app's __main__, api.gunicorn_conf, the
+    ASGI lifespan), not on import, so tests, the CLI and pool workers run
+    no watcher thread.
+    """
+
+    if RULES_WATCH_INTERVAL > 0:
+        rule_watcher.start()
+
+
+# ----------------------------
+# Analysis
+# ----------------------------
+
+def analyze_and_explain(data, rulebook=None):
+    result = analyze(data, rulebook)
+
+    # If engine returns validation error → do NOT call AI
+    if "error" not in result:
+        result["ai_explanation"] = generate_explanation(result)
+
+    return result
+
+
+def run_analysis(data):
+    if explanations.model is None:
+        # Deterministic explanation: cache it together with the result
+        if result_cache is not None:
+            return cached_call(result_cache, data, analyze_and_explain)
+        return analyze_and_explain(data)
+
+    result = cached_call(result_cache, data, analyze) if result_cache is not None else analyze(data)
+
+    if "error" not in result:
+        result["ai_explanation"], _ = explanations.explain(result)
+
+    return result
+
+
+def run_deferred_analysis(data):
+    result = cached_call(result_cache, data, analyze) if result_cache is not None else analyze(data)
+
+    if "error" not in result:
+        job = explanations.submit(result)
+        # Deterministic text now; the job delivers the model's version later
+        result["ai_explanation"] = job.text or generate_explanation(result)
+        result["explanation_id"] = job.id
+
+    return result
+
+
+# ----------------------------
+# Handlers
+# ----------------------------
+
+def handle_health():
+    return {"status": "API running"}, 200
+
+
+def handle_analyze(data, explain=None):
+    try:
+        # 1️⃣ Deterministic Safety Engine + 2️⃣ AI Explanation Layer
+        # explain="deferred" returns immediately; poll /explanations/<id> for the text
+        if explain == "deferred":
+            result = run_deferred_analysis(data)
+        else:
+            result = run_analysis(data)
+
+        if "error" in result:
+            return result, 400
+
+        return result, 200
+
+    except Exception as e:
+        return {"error": "Internal server error"}, 500
+
+
+def handle_batch(data):
+    if not isinstance(data, dict) or not isinstance(data.get("items"), list):
+        return {"error": "Request must contain an 'items' list"}, 400
+
+    items = data["items"]
+
+    if len(items) > MAX_BATCH_ITEMS:
+        return {"error": f"Batch too large (max {MAX_BATCH_ITEMS} items)"}, 413
+
+    explain = data.get("explain", True)
+
+    try:
+        results = analyze_many(items)
+
+        analyzed = [result for result in results if "error" not in result]
+        errors = len(results) - len(analyzed)
+
+        if explain:
+            for result, (text, _) in zip(analyzed, explanations.explain_many(analyzed)):
+                result["ai_explanation"] = text
+
+        return {
+            "count": len(results),
+            "errors": errors,
+            "results": results
+        }, 200
+
+    except Exception as e:
+        return {"error": "Internal server error"}, 500
+
+
+def handle_next_dose(data):
+    if not isinstance(data, dict):
+        return {"error": "Request must be a JSON object"}, 400
+
+    try:
+        result = next_safe_dose(data)
+    except KeyError as e:
+        return {"error": f"Missing required field: {e.args[0]}"}, 400
+    except (TypeError, AttributeError, ValueError):
+        return {"error": "Invalid input format"}, 400
+    except Exception as e:
+        return {"error": "Internal server error"}, 500
+
+    if "error" in result:
+        return result, 400
+
+    return result, 200
+
+
+def handle_sweep(data):
+    if not isinstance(data, dict) or not isinstance(data.get("doses"), list):
+        return {"error": "Request must contain a 'doses' list"}, 400
+
+    # numpy is only needed here; keep it out of the API's import path
+    from engine.sweep import sweep, sweep_payload, time_grid
+
+    try:
+        times = data.get("times") or time_grid(data.get("step_minutes", 15))
+        weights = data.get("weights") or [data.get("weight")]
+
+        if len(times) * len(weights) * len(data["doses"]) > MAX_SWEEP_CELLS:
+            return {"error": f"Sweep too large (max {MAX_SWEEP_CELLS} cells)"}, 413
+
+        result = sweep_payload(sweep(data, data["doses"], times, weights))
+    except KeyError as e:
+        return {"error": f"Missing required field: {e.args[0]}"}, 400
+    except (TypeError, AttributeError, ValueError, ZeroDivisionError):
+        return {"error": "Invalid input format"}, 400
+    except Exception as e:
+        return {"error": "Internal server error"}, 500
+
+    if "error" in result:
+        return result, 400
+
+    return result, 200
+
+
+def handle_search(query, limit=None):
+    if not query or not query.strip():
+        return {"error": "Missing query parameter: q"}, 400
+
+    if len(query) > MAX_SEARCH_QUERY:
+        return {"error": f"Query too long (max {MAX_SEARCH_QUERY} characters)"}, 400
+
+    try:
+        limit = int(limit) if limit is not None else 10
+    except ValueError:
+        return {"error": "Invalid limit: must be a whole number"}, 400
+
+    if not 1 <= limit <= MAX_SEARCH_RESULTS:
+        return {"error": f"Invalid limit: must be between 1 and {MAX_SEARCH_RESULTS}"}, 400
+
+    rulebook = get_rulebook()
+    return {
+        "query": query,
+        "results": rulebook.search_index.search(query, limit),
+        "rule_version": rulebook.version
+    }, 200
+
+
+def handle_rules(if_none_match=None):
+    """
+    (body, status, headers) for GET /rules: the rule snapshot, or an empty
+    304 when If-None-Match already names its ETag.
+    """
+
+    body, etag = rules_snapshot()
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={RULES_MAX_AGE}"}
+
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return b"", 304, headers
+
+    return body, 200, headers
+
+
+def handle_create_session(data):
+    error = validate_profile(data)
+    if error:
+        return {"error": error}, 400
+
+    return sessions.create(data).as_dict(), 201
+
+
+def handle_get_session(session_id):
+    session = sessions.get(session_id)
+
+    if session is None:
+        return {"error": "Unknown session id"}, 404
+
+    return session.as_dict(), 200
+
+
+def handle_update_session(session_id, data):
+    session = sessions.get(session_id)
+
+    if session is None:
+        return {"error": "Unknown session id"}, 404
+
+    result = update_profile(sessions, session, data)
+    return result, 400 if "error" in result else 200
+
+
+def handle_delete_session(session_id):
+    if not sessions.delete(session_id):
+        return {"error": "Unknown session id"}, 404
+
+    return {"session_id": session_id, "deleted": True}, 200
+
+
+def handle_session_dose(session_id, data):
+    session = sessions.get(session_id)
+
+    if session is None:
+        return {"error": "Unknown session id"}, 404
+
+    if not isinstance(data, dict):
+        return {"error": "Request must be a JSON object"}, 400
+
+    try:
+        result = add_dose(sessions, session, data)
+    except KeyError as e:
+        return {"error": f"Missing required field: {e.args[0]}"}, 400
+    except (TypeError, AttributeError, ValueError):
+        return {"error": "Invalid input format"}, 400
+    except Exception as e:
+        return {"error": "Internal server error"}, 500
+
+    if "error" in result:
+        return result, 400
+
+    return result, 200
+
+
+def handle_explanation_status(job_id):
+    job = explanations.get(job_id)
+
+    if job is None:
+        return {"error": "Unknown explanation id"}, 404
+
+    payload = job.as_dict()
+    return payload, 200 if payload["status"] == "ready" else 202
+
+
+def handle_reload(token):
+    if not ADMIN_TOKEN:
+        return {"error": "Admin endpoints are disabled"}, 403
+
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        return {"error": "Invalid admin token"}, 403
+
+    try:
+        previous, version = rule_watcher.reload()
+    except ValueError as e:
+        return {"error": f"Rule reload failed: {e}"}, 422
+
+    return {
+        "previous_version": previous,
+        "version": version,
+        "reloaded": previous != version
+    }, 200
+
+
+# ----------------------------
+# Rule snapshot
+# ----------------------------
+
+# Numeric limits sent per ingredient, in this order
+SNAPSHOT_LIMITS = ("max_daily_dose", "single_dose_limit", "min_spacing_hours")
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def build_rules_snapshot(rulebook):
+    """
+    What a client needs to validate and autocomplete offline: the per-
+    ingredient limits, the aliases and the brands that expand to a known
+    ingredient (analyze() rejects the rest as "Medicine not found").
+    """
+
+    rules = rulebook.rules
+
+    return {
+        "version": rulebook.version,
+        "limits": list(SNAPSHOT_LIMITS),
+        "ingredients": {
+            name: [rule[field] for field in SNAPSHOT_LIMITS]
+            for name, rule in rules.items()
+        },
+        "aliases": {
+            alias: name
+            for name, rule in rules.items()
+            for alias in rule.get("aliases", ())
+        },
+        "brands": {
+            brand: list(ingredients)
+            for brand, ingredients in rulebook.brand_map.items()
+            if ingredients and ingredients[0] in rules
+        }
+    }
+
+
+def rules_snapshot():
+    """
+    (body, etag) of the current rules' snapshot, encoded once per rule
+    version and shared by every request until the rules change.
+    """
+
+    global _snapshot
+    rulebook = get_rulebook()
+
+    snapshot = _snapshot
+    if snapshot is not None and snapshot[0] == rulebook.version:
+        return snapshot[1:]
+
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot[0] != rulebook.version:
+            body = dumps(build_rules_snapshot(rulebook))
+            # Strong validator: a digest of the exact bytes served
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            _snapshot = (rulebook.version, body, etag)
+        return _snapshot[1:]
+
+
+def _etag_matches(if_none_match, etag):
+    # If-None-Match uses the weak comparison (RFC 9110 13.1.2)
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(
+        tag.strip().removeprefix("W/") == etag
+        for tag in if_none_match.split(",")
+    )
+
+
+def metrics_text():
+    lines = []
+
+    if result_cache is not None:
+        stats = result_cache.stats()
+        for name in ("hits", "misses", "evictions", "invalidations"):
+            lines.append(f"# TYPE analyze_cache_{name}_total counter")
+            lines.append(f"analyze_cache_{name}_total {stats[name]}")
+        lines.append("# TYPE analyze_cache_size gauge")
+        lines.append(f"analyze_cache_size {stats['size']}")
+
+    stats = explanations.stats()
+    lines.append("# TYPE explanation_model_calls_total counter")
+    lines.append(f"explanation_model_calls_total {stats['model_calls']}")
+    lines.append("# TYPE explanation_fallbacks_total counter")
+    lines.append(f"explanation_fallbacks_total {stats['fallbacks']}")
+    lines.append("# TYPE explanation_pending_jobs gauge")
+    lines.append(f"explanation_pending_jobs {stats['pending_jobs']}")
+
+    stats = rule_watcher.stats()
+    lines.append("# TYPE rules_info gauge")
+    lines.append(f'rules_info{{version="{stats["version"]}"}} 1')
+    lines.append("# TYPE rules_reloads_total counter")
+    lines.append(f"rules_reloads_total {stats['reloads']}")
+    lines.append("# TYPE rules_reload_failures_total counter")
+    lines.append(f"rules_reload_failures_total {stats['failures']}")
+
+    body = "\n".join(lines) + "\n"
+
+    if stage_timing_enabled():
+        body += render_stage_timings()
+
+    return body
@@ -0,0 +1,38 @@
+"""
+JSON response bodies, shared by the Flask app (api.app) and the ASGI app
+(api.asgi) so both send the same bytes.
+
+dumps() writes compact JSON with sorted keys and a trailing newline, as
+Flask's jsonify does. When orjson is installed it does the encoding
+(several times faster on analyze() results); otherwise, or for values
+orjson rejects, the standard library does. The two give the same JSON but
+not always the same bytes: orjson writes non-ASCII text as UTF-8 rather
+than \\u escapes, some floats in another notation (1e16 for 1e+16) and
+NaN as null.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+FAST_JSON = orjson is not None
+
+_ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE if FAST_JSON else 0
+
+
+def dumps_stdlib(payload):
+    return (json.dumps(payload, sort_keys=True, separators=(",", ":")) + "\n").encode()
+
+
+def dumps(payload):
+    if FAST_JSON:
+        try:
+            return orjson.dumps(payload, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # e.g. integers beyond 64 bits
+            pass
+    return dumps_stdlib(payload)
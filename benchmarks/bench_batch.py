@@ -0,0 +1,42 @@
+"""
+Throughput of POST /analyze/batch versus looping over POST /analyze,
+measured in-process with the Flask test client.
+
+    python -m benchmarks.bench_batch [--items N]
+"""
+
+import argparse
+import time
+
+from api.app import app
+from benchmarks.bench_rulebook import SAMPLE_INPUTS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--no-explain", action="store_true")
+    args = parser.parse_args(argv)
+
+    items = [SAMPLE_INPUTS[i % len(SAMPLE_INPUTS)] for i in range(args.items)]
+    explain = not args.no_explain
+    client = app.test_client()
+
+    start = time.perf_counter()
+    for item in items:
+        client.post("/analyze", json=item)
+    looped = time.perf_counter() - start
+
+    start = time.perf_counter()
+    response = client.post("/analyze/batch", json={"items": items, "explain": explain})
+    batched = time.perf_counter() - start
+
+    assert response.status_code == 200
+
+    print(f"looped /analyze      : {args.items / looped:10.0f} items/s")
+    print(f"/analyze/batch       : {args.items / batched:10.0f} items/s")
+    print(f"speedup              : {looped / batched:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Scaling of check_interactions: linear scan over the raw interaction list
+versus the prebuilt InteractionIndex, on synthetic tables.
+
+    python -m benchmarks.bench_interactions [--sizes 10000 50000 100000]
+"""
+
+import argparse
+import random
+import time
+
+from engine.interactions import build_interaction_index, check_interactions
+from benchmarks.synthetic import ingredient_names, synthetic_interactions
+
+
+def _pair_loop(meds, data):
+    conflicts = []
+    for i in range(len(meds)):
+        for j in range(i + 1, len(meds)):
+            conflicts.extend(check_interactions(meds[i], [meds[j]], data))
+    return conflicts
+
+
+def _time_per_call(meds_list, data):
+    start = time.perf_counter()
+    for meds in meds_list:
+        _pair_loop(meds, data)
+    return (time.perf_counter() - start) / len(meds_list)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--ingredients", type=int, default=2000)
+    parser.add_argument("--meds", type=int, default=8, help="medicines per request")
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    names = ingredient_names(args.ingredients)
+
+    print(f"{'entries':>8} {'linear us/req':>14} {'indexed us/req':>15} {'build ms':>9} {'speedup':>8}")
+    for size in args.sizes:
+        table = synthetic_interactions(size, names, random.Random(0))
+        meds_list = [rng.sample(names, args.meds) for _ in range(args.requests)]
+
+        start = time.perf_counter()
+        index = build_interaction_index(table)
+        build = time.perf_counter() - start
+
+        for meds in meds_list:
+            assert _pair_loop(meds, table) == _pair_loop(meds, index)
+
+        linear = _time_per_call(meds_list, table)
+        indexed = _time_per_call(meds_list, index)
+
+        print(
+            f"{size:>8} {linear * 1e6:>14.1f} {indexed * 1e6:>15.1f} "
+            f"{build * 1e3:>9.1f} {linear / indexed:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
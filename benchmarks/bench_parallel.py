@@ -0,0 +1,81 @@
+"""
+Scaling of process-pool batch analysis from 1 to N workers on a
+synthetic workload.
+
+    python -m benchmarks.bench_parallel [--records 1000000] [--workers 1 2 4 8]
+        [--rules-dir build/synthetic --workload build/synthetic/workload.jsonl]
+
+--rules-dir and --workload take the files written by benchmarks.synthetic;
+the workload is cycled up to --records.
+"""
+
+import argparse
+import random
+import time
+
+from engine.analyzer import analyze_many
+from engine.parallel import DEFAULT_CHUNK_SIZE, default_workers
+from engine.rulebook import load_rulebook
+from benchmarks.synthetic import read_workload
+
+
+MEDICINES = ["paracetamol", "ibuprofen", "aspirin", "naproxen", "crocin", "dolo_650", "combiflam"]
+
+
+def synthetic_workload(records, seed=0):
+    rng = random.Random(seed)
+    for _ in range(records):
+        item = {
+            "medicine": rng.choice(MEDICINES),
+            "dose": rng.choice([200, 400, 500, 650, 1000]),
+            "time": f"{rng.randrange(24):02d}:{rng.randrange(60):02d}",
+            "other_meds": rng.sample(MEDICINES, rng.randint(0, 3)),
+        }
+        if rng.random() < 0.3:
+            item["weight"] = rng.choice([12, 20, 35, 60, 80])
+        if rng.random() < 0.2:
+            item["alcohol"] = True
+        yield item
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--rules-dir", help="rule files to analyze against (default: engine/)")
+    parser.add_argument("--workload", help="workload.jsonl to replay instead of the built-in mix")
+    args = parser.parse_args(argv)
+
+    workers_list = args.workers
+    if not workers_list:
+        cores = default_workers()
+        workers_list = sorted({1, *(w for w in (2, 4, 8, 16, 32) if w <= cores), cores})
+
+    rulebook = load_rulebook(args.rules_dir) if args.rules_dir else None
+
+    if args.workload:
+        replay = read_workload(args.workload)
+        items = [replay[i % len(replay)] for i in range(args.records)]
+    else:
+        items = list(synthetic_workload(args.records))
+
+    print(f"{args.records} records, chunk size {args.chunk_size}")
+    print(f"{'workers':>7} {'seconds':>9} {'records/s':>11} {'speedup':>8} {'efficiency':>10}")
+
+    baseline = None
+    for workers in workers_list:
+        start = time.perf_counter()
+        analyze_many(items, rulebook, workers=workers, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+
+        baseline = baseline or elapsed
+        speedup = baseline / elapsed
+        print(
+            f"{workers:>7} {elapsed:>9.2f} {args.records / elapsed:>11.0f} "
+            f"{speedup:>7.2f}x {speedup / workers:>9.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
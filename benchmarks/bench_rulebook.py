@@ -0,0 +1,72 @@
+"""
+Per-request latency of analyze() with per-call rule loading (the old
+behaviour) versus a RuleBook built once and shared.
+
+    python -m benchmarks.bench_rulebook [--iterations N]
+
+The old analyze() read rules.json, interactions.json and brand_map.json
+with json.load on every call and did no other preparation, so the
+per-call case times those three reads plus analyze() on the shared
+RuleBook. It does not call load_rulebook(), whose index, conflict
+matrix and clinical tables the old code never built.
+"""
+
+import argparse
+import json
+import time
+
+from engine.analyzer import analyze
+from engine.rulebook import (
+    get_rulebook,
+    rule_path,
+    RULES_FILE,
+    INTERACTIONS_FILE,
+    BRAND_MAP_FILE
+)
+
+
+SAMPLE_INPUTS = [
+    {"medicine": "paracetamol", "dose": 500, "time": "14:00"},
+    {"medicine": "crocin", "dose": 500, "other_meds": ["dolo_650"], "time": "14:00"},
+    {"medicine": "ibuprofen", "dose": 400, "other_meds": ["aspirin"], "alcohol": True, "time": "22:00"},
+    {"medicine": "paracetamol", "dose": 500, "dose_history": [1000, 1000, 500], "weight": 30, "time": "20:00"},
+]
+
+
+def _read_rule_files():
+    # What the old analyze() did on every request
+    for filename in (RULES_FILE, INTERACTIONS_FILE, BRAND_MAP_FILE):
+        with open(rule_path(filename)) as f:
+            json.load(f)
+
+
+def _time_per_call(fn, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(SAMPLE_INPUTS[i % len(SAMPLE_INPUTS)])
+    return (time.perf_counter() - start) / iterations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    shared = get_rulebook()
+
+    def per_call_loading(data):
+        _read_rule_files()
+        return analyze(data, rulebook=shared)
+
+    per_call = _time_per_call(per_call_loading, args.iterations)
+    cached = _time_per_call(
+        lambda data: analyze(data, rulebook=shared), args.iterations
+    )
+
+    print(f"per-call rule loading : {per_call * 1e6:9.1f} us/request")
+    print(f"shared RuleBook       : {cached * 1e6:9.1f} us/request")
+    print(f"speedup               : {per_call / cached:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
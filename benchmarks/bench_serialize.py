@@ -0,0 +1,85 @@
+"""
+Response encoding throughput and memory allocated per /analyze request.
+
+    python -m benchmarks.bench_serialize [--iterations N]
+
+Encodes the /analyze responses of the test_engine.py scenarios with the
+standard library (Flask's default) and with api.serialize.dumps (orjson
+when installed), reporting MB/s and microseconds per response. Then runs
+whole requests, analyze() + explanation + encoding, under tracemalloc and
+reports the bytes allocated at peak per request.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from api.serialize import FAST_JSON, dumps, dumps_stdlib
+from api.handlers import analyze_and_explain
+from test_engine import SCENARIOS
+
+
+def responses():
+    cases = [case for scenario in SCENARIOS.values() for case in scenario]
+    return cases, [analyze_and_explain(case) for case in cases]
+
+
+def encode_rate(encode, payloads, iterations):
+    """
+    (MB/s, us per response) encoding `payloads` `iterations` times.
+    """
+
+    size = sum(len(encode(payload)) for payload in payloads)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for payload in payloads:
+            encode(payload)
+    elapsed = time.perf_counter() - start
+
+    return size * iterations / elapsed / 1e6, elapsed / (iterations * len(payloads)) * 1e6
+
+
+def peak_bytes_per_request(cases, encode):
+    # Warm caches first so one-off allocations are not counted
+    for case in cases:
+        encode(analyze_and_explain(case))
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for case in cases:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            encode(analyze_and_explain(case))
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    return sum(peaks) / len(peaks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    cases, payloads = responses()
+    encoders = [("stdlib json", dumps_stdlib)]
+    if FAST_JSON:
+        encoders.append(("orjson", dumps))
+    else:
+        print("orjson not installed; api.serialize uses the standard library")
+
+    print(f"{len(payloads)} responses, {sum(map(len, map(dumps, payloads))) / len(payloads):.0f} bytes on average")
+    for name, encode in encoders:
+        rate, per_response = encode_rate(encode, payloads, args.iterations)
+        peak = peak_bytes_per_request(cases, encode)
+        print(
+            f"{name:<12}: {rate:8.1f} MB/s  {per_response:7.2f} us/response  "
+            f"{peak / 1024:6.1f} KiB allocated at peak per request"
+        )
+
+
+if __name__ == "__main__":
+    main()
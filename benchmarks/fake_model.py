@@ -0,0 +1,166 @@
+"""
+Local stand-in for the Gemini API, for load tests and CI.
+
+    python -m benchmarks.fake_model [--port 8090] [--latency-ms 800]
+        [--spread 0.25] [--error-rate 0.01]
+
+Answers generateContent calls (POST /v1beta/models/<model>:generateContent)
+with a fixed explanation after a simulated delay: latency-ms scaled by a
+log-normal factor with the given spread (sigma), so the delays have the
+long right tail of a real model. A share of calls (error-rate) fails with
+503. Point the API at it with
+
+    EXPLANATION_MODEL=gemini GEMINI_API_KEY=fake GEMINI_BASE_URL=http://127.0.0.1:8090
+
+and the real google.genai client talks to it over HTTP.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+FAKE_TEXT = "This is a placeholder explanation from the local test model."
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; do not let them wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if not self.path.endswith(":generateContent"):
+            self._reply(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+
+        model = self.server.model
+        delay, fail = model.next_call()
+        time.sleep(delay)
+        try:
+            if fail:
+                self._reply(503, {"error": {"code": 503, "message": "Injected failure", "status": "UNAVAILABLE"}})
+            else:
+                self._reply(200, {
+                    "candidates": [{
+                        "content": {"role": "model", "parts": [{"text": FAKE_TEXT}]},
+                        "finishReason": "STOP",
+                        "index": 0
+                    }],
+                    "modelVersion": "fake"
+                })
+        finally:
+            model.finish_call()
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+
+    daemon_threads = True
+    # Bursts from a loaded API must queue here rather than be refused
+    request_queue_size = 1024
+
+
+class FakeModelServer:
+    """
+    The fake model on a background thread; port 0 picks a free port.
+    """
+
+    def __init__(self, port=0, latency_ms=800.0, spread=0.25, error_rate=0.0, seed=None):
+        self.latency = latency_ms / 1000
+        self.spread = spread
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.model = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def next_call(self):
+        """
+        (delay in seconds, whether to fail) for an incoming call.
+        """
+
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            delay = self.latency * (self._rng.lognormvariate(0, self.spread) if self.spread else 1.0)
+        return delay, fail
+
+    def finish_call(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors, "peak_in_flight": self.peak_in_flight}
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-model", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--spread", type=float, default=0.25, help="log-normal sigma of the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    server = FakeModelServer(args.port, args.latency_ms, args.spread, args.error_rate, args.seed)
+    print(f"fake model listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
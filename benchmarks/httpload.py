@@ -0,0 +1,273 @@
+"""
+Minimal asyncio HTTP/1.1 load client: persistent keep-alive connections,
+optional request pipelining, per-request latency capture.
+
+closed_loop() keeps a fixed number of connections busy; open_loop() sends
+at a fixed request rate whatever the server's speed, which is what finding
+a saturation point needs.
+
+Used by benchmarks.load_compare and benchmarks.load_test; no third-party
+dependencies.
+"""
+
+import asyncio
+import json
+import random
+import time
+
+
+def build_request(method, path, host, payload=None):
+    body = b"" if payload is None else json.dumps(payload).encode()
+    head = [
+        f"{method} {path} HTTP/1.1",
+        f"Host: {host}",
+        "Connection: keep-alive",
+        f"Content-Length: {len(body)}"
+    ]
+    if payload is not None:
+        head.append("Content-Type: application/json")
+    return ("\r\n".join(head) + "\r\n\r\n").encode() + body
+
+
+async def read_response(reader):
+    """
+    Returns (status, keep_alive, body). Handles Content-Length and chunked bodies.
+    """
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(chunks)
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+    keep_alive = headers.get("connection", "").lower() != "close"
+    return status, keep_alive, body
+
+
+class LoadStats:
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        # Requests scheduled by open_loop()
+        self.offered = None
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, status, latency):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        ordered = sorted(self.latencies)
+        completed = len(ordered)
+        ok = sum(count for status, count in self.statuses.items() if status < 500)
+
+        def pct(p):
+            if not ordered:
+                return None
+            return round(ordered[min(completed - 1, int(p / 100 * completed))] * 1000, 2)
+
+        return {
+            "requests": completed,
+            "errors": self.errors + completed - ok,
+            "error_rate": round((self.errors + completed - ok) / max(1, completed + self.errors), 4),
+            "rps": round(completed / elapsed, 1) if elapsed > 0 else 0.0,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "offered": self.offered,
+            "statuses": self.statuses
+        }
+
+
+async def _connection_worker(host, port, requests, deadline, depth, stats, index):
+    """
+    Sends requests round-robin over one keep-alive connection, `depth`
+    requests in flight at a time (depth > 1 pipelines them).
+    """
+
+    reader = writer = None
+    position = index
+
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+
+            batch = [requests[(position + i) % len(requests)] for i in range(depth)]
+            position += depth
+
+            sent_at = time.perf_counter()
+            writer.write(b"".join(batch))
+            await writer.drain()
+
+            answered = 0
+            keep_alive = True
+            while answered < len(batch) and keep_alive:
+                status, keep_alive, _ = await read_response(reader)
+                stats.record(status, time.perf_counter() - sent_at)
+                answered += 1
+
+            if not keep_alive:
+                # Pipelined requests behind a "Connection: close" are never answered
+                stats.errors += len(batch) - answered
+                writer.close()
+                reader = writer = None
+
+        except (ConnectionError, asyncio.IncompleteReadError, OSError, ValueError):
+            stats.errors += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+
+    if writer is not None:
+        writer.close()
+
+
+async def closed_loop(host, port, requests, connections=32, duration=10.0, depth=1):
+    """
+    `connections` persistent connections each issue requests back to back
+    (pipelined `depth` at a time) for `duration` seconds.
+    """
+
+    stats = LoadStats()
+    deadline = time.perf_counter() + duration
+
+    await asyncio.gather(*(
+        _connection_worker(host, port, requests, deadline, depth, stats, i)
+        for i in range(connections)
+    ))
+
+    stats.finished = time.perf_counter()
+    return stats
+
+
+class _ConnectionPool:
+    """
+    Idle keep-alive connections, opened on demand, at most `size` in use.
+    """
+
+    def __init__(self, host, port, size):
+        self.host = host
+        self.port = port
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def acquire(self):
+        await self._slots.acquire()
+        if self._idle:
+            return self._idle.pop()
+        try:
+            return await asyncio.open_connection(self.host, self.port)
+        except OSError:
+            self._slots.release()
+            raise
+
+    def release(self, connection, reusable):
+        if reusable:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+        self._slots.release()
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+
+async def _send_at(pool, request, scheduled, stats):
+    await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+
+    try:
+        connection = await pool.acquire()
+    except OSError:
+        stats.errors += 1
+        return
+
+    reusable = False
+    try:
+        reader, writer = connection
+        writer.write(request)
+        await writer.drain()
+        status, reusable, _ = await read_response(reader)
+        # From the scheduled time, so waiting for a connection counts too
+        stats.record(status, time.perf_counter() - scheduled)
+    except (ConnectionError, asyncio.IncompleteReadError, OSError, ValueError):
+        stats.errors += 1
+    finally:
+        pool.release(connection, reusable)
+
+
+async def open_loop(
+    host, port, requests, rps, duration=10.0, max_connections=512, poisson=False, drain=30.0, seed=None
+):
+    """
+    Sends `rps` requests per second for `duration` seconds, evenly spaced
+    (or as a Poisson process with that mean rate), without waiting for
+    earlier answers. Each request takes an idle connection or opens one,
+    up to `max_connections`.
+
+    Latency runs from when a request was due, not when it was written, so a
+    slow server cannot hide its queue by slowing the client down. Requests
+    still unanswered `drain` seconds after the last one was due are
+    counted as errors.
+    """
+
+    rng = random.Random(seed)
+    pool = _ConnectionPool(host, port, max_connections)
+    stats = LoadStats()
+    pending = set()
+
+    start = stats.started
+    deadline = start + duration
+    scheduled = start
+    sent = 0
+
+    while scheduled < deadline:
+        # Create the tasks shortly before they are due rather than all upfront
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter() - 0.005))
+
+        task = asyncio.create_task(_send_at(pool, requests[sent % len(requests)], scheduled, stats))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+        sent += 1
+        # Evenly spaced times from the count, so rounding does not add a request
+        scheduled = scheduled + rng.expovariate(rps) if poisson else start + sent / rps
+
+    if pending:
+        _, unanswered = await asyncio.wait(set(pending), timeout=drain)
+        for task in unanswered:
+            task.cancel()
+        stats.errors += len(unanswered)
+        await asyncio.gather(*unanswered, return_exceptions=True)
+
+    pool.close()
+    stats.offered = sent
+    stats.finished = time.perf_counter()
+    return stats
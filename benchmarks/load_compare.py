@@ -0,0 +1,113 @@
+"""
+Load-test comparison: gunicorn + Flask (api.app) versus uvicorn + ASGI
+(api.asgi), same routes and payloads, over keep-alive connections with
+optional HTTP/1.1 pipelining. Reports p50/p99 latency and requests/s.
+
+    python -m benchmarks.load_compare [--workers 2] [--connections 64] [--depth 1 4]
+        [--rules-dir build/synthetic --workload build/synthetic/workload.jsonl]
+
+--rules-dir points the servers at other rule files (RULES_DIR) and
+--workload replays requests written by benchmarks.synthetic.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_rulebook import SAMPLE_INPUTS
+from benchmarks.httpload import build_request, closed_loop
+from benchmarks.synthetic import read_workload
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    "gunicorn+flask": lambda port, workers, threads: [
+        sys.executable, "-m", "gunicorn", "-c", "python:api.gunicorn_conf", "api.app:app",
+        "--bind", f"127.0.0.1:{port}", "--workers", str(workers),
+        "--worker-class", "gthread", "--threads", str(threads), "--log-level", "warning"
+    ],
+    "uvicorn+asgi": lambda port, workers, threads: [
+        sys.executable, "-m", "uvicorn", "api.asgi:app",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+        "--log-level", "warning", "--no-access-log"
+    ]
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def start_server(name, workers, threads, env=None):
+    port = free_port()
+    process = subprocess.Popen(
+        SERVERS[name](port, workers, threads),
+        cwd=ROOT,
+        env={**os.environ, **(env or {}), "ASGI_EXECUTOR_THREADS": str(threads)}
+    )
+    try:
+        wait_until_up(port)
+    except RuntimeError:
+        process.kill()
+        raise
+    return process, port
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=list(SERVERS))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--depth", type=int, nargs="+", default=[1, 4], help="pipelining depths")
+    parser.add_argument("--rules-dir", help="rule files for the servers (default: engine/)")
+    parser.add_argument("--workload", help="workload.jsonl to send instead of the sample inputs")
+    args = parser.parse_args(argv)
+
+    payloads = read_workload(args.workload) if args.workload else SAMPLE_INPUTS
+    env = {"RULES_DIR": os.path.abspath(args.rules_dir)} if args.rules_dir else None
+
+    print(f"{'server':<16} {'depth':>5} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+
+    for name in args.servers:
+        process, port = start_server(name, args.workers, args.threads, env)
+        try:
+            requests = [
+                build_request("POST", "/analyze", f"127.0.0.1:{port}", payload)
+                for payload in payloads
+            ]
+            for depth in args.depth:
+                stats = asyncio.run(
+                    closed_loop("127.0.0.1", port, requests, args.connections, args.duration, depth)
+                )
+                summary = stats.summary()
+                print(
+                    f"{name:<16} {depth:>5} {summary['rps']:>9.1f} {summary['p50_ms']:>8} "
+                    f"{summary['p99_ms']:>8} {summary['errors']:>7}"
+                )
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Capacity test: open-loop load against a locally launched API, with the
+explanation model replaced by benchmarks.fake_model.
+
+    python -m benchmarks.load_test [--server gunicorn+flask] [--configs 1x8 2x8]
+        [--rps 5 10 20 40 80] [--duration 10] [--poisson]
+        [--model-latency-ms 800] [--model-error-rate 0.01] [--no-model]
+        [--workload build/synthetic/workload.jsonl] [-o results.json]
+
+For each worker configuration (WORKERSxTHREADS) the API is started with
+EXPLANATION_MODEL=gemini pointed at the fake model, then offered each
+request rate in turn for --duration seconds, whatever its speed. A rate
+is saturated when p99 latency exceeds --slo-ms or the error rate
+(5xx, failed or unanswered requests) exceeds --max-error-rate. The
+saturation point of a configuration is the first saturated rate; higher
+rates are skipped.
+
+--workload replays one analyze request per line (benchmarks.synthetic
+output, or requests recorded in the same format); --explain deferred
+sends ?explain=deferred.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+
+from benchmarks.bench_rulebook import SAMPLE_INPUTS
+from benchmarks.fake_model import FakeModelServer
+from benchmarks.httpload import build_request, open_loop
+from benchmarks.load_compare import SERVERS, start_server
+from benchmarks.synthetic import read_workload
+
+
+def parse_config(text):
+    workers, _, threads = text.partition("x")
+    return int(workers), int(threads or 1)
+
+
+def is_saturated(summary, slo_ms, max_error_rate):
+    return (
+        summary["p99_ms"] is None
+        or summary["p99_ms"] > slo_ms
+        or summary["error_rate"] > max_error_rate
+    )
+
+
+def run_config(args, payloads, workers, threads, model):
+    env = {"EXPLANATION_BUDGET_MS": str(args.budget_ms)}
+    if model is not None:
+        env.update(EXPLANATION_MODEL="gemini", GEMINI_API_KEY="fake", GEMINI_BASE_URL=model.url)
+    if args.rules_dir:
+        env["RULES_DIR"] = os.path.abspath(args.rules_dir)
+
+    path = "/analyze?explain=deferred" if args.explain == "deferred" else "/analyze"
+    rows = []
+
+    process, port = start_server(args.server, workers, threads, env)
+    try:
+        host = f"127.0.0.1:{port}"
+        requests = [build_request("POST", path, host, payload) for payload in payloads]
+
+        def offer(rps, duration):
+            return asyncio.run(open_loop(
+                "127.0.0.1", port, requests, rps, duration,
+                max_connections=args.connections, poisson=args.poisson, seed=args.seed
+            )).summary()
+
+        # Imports, rule loading and the model client happen on first use
+        offer(args.rps[0], args.warmup)
+
+        for rps in args.rps:
+            calls = model.stats()["calls"] if model else 0
+            summary = offer(rps, args.duration)
+            row = {
+                "server": args.server,
+                "workers": workers,
+                "threads": threads,
+                "offered_rps": rps,
+                "saturated": is_saturated(summary, args.slo_ms, args.max_error_rate),
+                "model_calls": (model.stats()["calls"] - calls) if model else 0,
+                **summary
+            }
+            rows.append(row)
+            print(
+                f"{workers}x{threads:<6} {rps:>8g} {row['rps']:>9.1f} {row['p50_ms']!s:>8} "
+                f"{row['p95_ms']!s:>8} {row['p99_ms']!s:>8} {row['error_rate'] * 100:>7.2f}%"
+                f"{'  saturated' if row['saturated'] else ''}"
+            )
+            if row["saturated"]:
+                break
+    finally:
+        process.terminate()
+        process.wait()
+
+    return rows
+
+
+def saturation_points(rows):
+    """
+    {"WxT": {"sustained_rps", "saturation_rps"}} per worker configuration.
+    """
+
+    points = {}
+    for row in rows:
+        point = points.setdefault(
+            f"{row['workers']}x{row['threads']}", {"sustained_rps": None, "saturation_rps": None}
+        )
+        if row["saturated"]:
+            point["saturation_rps"] = row["offered_rps"]
+        else:
+            point["sustained_rps"] = row["offered_rps"]
+    return points
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--server", choices=sorted(SERVERS), default="gunicorn+flask")
+    parser.add_argument("--configs", nargs="+", default=["1x8", "2x8"], help="WORKERSxTHREADS")
+    parser.add_argument("--rps", type=float, nargs="+", default=[5, 10, 20, 40, 80])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of evenly spaced")
+    parser.add_argument("--connections", type=int, default=512, help="client connection limit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--explain", choices=["inline", "deferred"], default="inline")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="EXPLANATION_BUDGET_MS")
+    parser.add_argument("--no-model", action="store_true", help="template explanations only")
+    parser.add_argument("--model-latency-ms", type=float, default=800.0)
+    parser.add_argument("--model-spread", type=float, default=0.25)
+    parser.add_argument("--model-error-rate", type=float, default=0.0)
+    parser.add_argument("--slo-ms", type=float, default=2000.0, help="p99 latency objective")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--rules-dir", help="rule files for the API (default: engine/)")
+    parser.add_argument("--workload", help="workload.jsonl to send instead of the sample inputs")
+    parser.add_argument("-o", "--output", help="write all rows and saturation points as JSON")
+    args = parser.parse_args(argv)
+
+    payloads = read_workload(args.workload) if args.workload else SAMPLE_INPUTS
+    model = None
+    if not args.no_model:
+        model = FakeModelServer(
+            latency_ms=args.model_latency_ms, spread=args.model_spread,
+            error_rate=args.model_error_rate, seed=args.seed
+        ).start()
+
+    print(f"{'config':<8} {'rps':>8} {'achieved':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>8}")
+
+    rows = []
+    try:
+        for config in args.configs:
+            workers, threads = parse_config(config)
+            rows += run_config(args, payloads, workers, threads, model)
+    finally:
+        if model is not None:
+            model.stop()
+
+    points = saturation_points(rows)
+    print()
+    for config, point in points.items():
+        saturation = f"{point['saturation_rps']:g} rps" if point["saturation_rps"] else "not reached"
+        sustained = f"{point['sustained_rps']:g} rps" if point["sustained_rps"] else "none"
+        print(f"{config:<8} saturation point: {saturation} (highest sustained: {sustained})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": rows, "saturation": points}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
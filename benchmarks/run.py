@@ -0,0 +1,231 @@
+"""
+Benchmark suite for the engine and API hot paths.
+
+    python -m benchmarks.run [-o results.json] [--compare baseline.json]
+
+Covers analyze() per scenario class from test_engine.py,
+generate_explanation(), the /analyze Flask route (test client), response
+encoding and analyze() and rule loading (JSON vs compiled bundle) against
+synthetic large rule sets. Results are written as JSON;
+with --compare, any benchmark whose median slowed down by more than
+--threshold against the baseline file is reported and the exit status is 1.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from engine.analyzer import analyze
+from engine.compile_rules import compile_rules
+from engine.rulebook import RuleBook, get_rulebook, load_rulebook
+from ai.explain import compose_explanation, explanation_key, generate_explanation
+from benchmarks.synthetic import formulary, workload, write_formulary
+from test_engine import SCENARIOS
+
+
+# Scenario classes benchmarked from test_engine.py
+SCENARIO_CLASSES = (
+    "basic", "spacing", "mg_per_kg", "accumulation", "alcohol",
+    "brand_duplicates", "nsaid_stacking", "pregnancy_age", "organ_stress"
+)
+
+
+# ----------------------------
+# Measurement
+# ----------------------------
+
+def measure(fn, cases, rounds, min_time):
+    """
+    Calls fn(case) over all cases repeatedly. Each round runs whole passes
+    until min_time has elapsed; the per-call time of every round is kept.
+    """
+
+    per_call = []
+    for _ in range(rounds):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            for case in cases:
+                fn(case)
+            calls += len(cases)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        per_call.append(elapsed / calls)
+
+    return {
+        "median_us": round(statistics.median(per_call) * 1e6, 3),
+        "min_us": round(min(per_call) * 1e6, 3),
+        "mean_us": round(statistics.fmean(per_call) * 1e6, 3),
+        "stdev_us": round(statistics.pstdev(per_call) * 1e6, 3),
+        "rounds": rounds,
+        "cases": len(cases)
+    }
+
+
+# ----------------------------
+# Synthetic rule sets
+# ----------------------------
+
+def synthetic_rulebook(ingredients, interactions, seed=0):
+    """
+    The real rules extended with a generated formulary (benchmarks.synthetic).
+    """
+
+    return RuleBook(*formulary(ingredients, interactions, seed=seed, base=get_rulebook().to_data()))
+
+
+# ----------------------------
+# Suites
+# ----------------------------
+
+def bench_scenarios(args):
+    results = {}
+    for name in SCENARIO_CLASSES:
+        results[f"analyze.{name}"] = measure(analyze, SCENARIOS[name], args.rounds, args.min_time)
+    return results
+
+
+def bench_explanation(args):
+    analyzed = [analyze(case) for name in SCENARIO_CLASSES for case in SCENARIOS[name]]
+    analyzed = [result for result in analyzed if "error" not in result]
+    return {
+        "generate_explanation": measure(generate_explanation, analyzed, args.rounds, args.min_time),
+        # Feature key plus composing the text, as on a memo miss
+        "generate_explanation.uncached": measure(
+            lambda result: compose_explanation.__wrapped__(explanation_key(result)),
+            analyzed, args.rounds, args.min_time
+        )
+    }
+
+
+def bench_api(args):
+    try:
+        from api.app import app
+    except ImportError as e:
+        print(f"skipping API benchmarks: {e}", file=sys.stderr)
+        return {}
+
+    from api.handlers import analyze_and_explain
+    from api.serialize import dumps
+
+    client = app.test_client()
+    cases = [case for name in SCENARIO_CLASSES for case in SCENARIOS[name]]
+    responses = [analyze_and_explain(case) for case in cases]
+
+    return {
+        "api.analyze": measure(lambda case: client.post("/analyze", json=case), cases, args.rounds, args.min_time),
+        "api.encode": measure(dumps, responses, args.rounds, args.min_time),
+        "api.health": measure(lambda _: client.get("/health"), [None], args.rounds, args.min_time)
+    }
+
+
+def bench_synthetic(args):
+    results = {}
+
+    for ingredients, interactions in ((1000, 10000), (5000, 100000)):
+        rulebook = synthetic_rulebook(ingredients, interactions)
+        cases = list(workload(rulebook.rules, rulebook.brand_map, 20, seed=1, max_meds=20))
+        results[f"analyze.synthetic_{ingredients}x{interactions}"] = measure(
+            lambda case: analyze(case, rulebook), cases, args.rounds, args.min_time
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            write_formulary(directory, *rulebook.to_data())
+            compile_rules(directory)
+
+            for source, bundle in (("json", False), ("bundle", True)):
+                results[f"load_rules.{source}_{ingredients}x{interactions}"] = measure(
+                    lambda _: load_rulebook(directory, bundle), [None], args.rounds, 0
+                )
+
+    return results
+
+
+SUITES = {
+    "scenarios": bench_scenarios,
+    "explanation": bench_explanation,
+    "api": bench_api,
+    "synthetic": bench_synthetic
+}
+
+
+# ----------------------------
+# Results
+# ----------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    regressions = []
+    for name, stats in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        change = stats["median_us"] / before["median_us"] - 1
+        if change > threshold:
+            regressions.append((name, before["median_us"], stats["median_us"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine and API hot paths.")
+    parser.add_argument("-o", "--output", help="write results JSON to this file")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed median slowdown (0.2 = 20%%)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per round")
+    parser.add_argument("--suite", choices=sorted(SUITES), nargs="+", default=list(SUITES))
+    args = parser.parse_args(argv)
+
+    benchmarks = {}
+    for suite in args.suite:
+        benchmarks.update(SUITES[suite](args))
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds")
+        },
+        "benchmarks": benchmarks
+    }
+
+    width = max(len(name) for name in benchmarks)
+    for name, stats in benchmarks.items():
+        print(f"{name:<{width}}  {stats['median_us']:>10.1f} us  (min {stats['min_us']:.1f})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["benchmarks"]
+
+        regressions = compare(benchmarks, baseline, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before:.1f} us -> {after:.1f} us (+{change:.0%})")
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
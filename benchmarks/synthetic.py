@@ -0,0 +1,229 @@
+"""
+Deterministic synthetic formulary and request workload for scale testing.
+
+    python -m benchmarks.synthetic -o build/synthetic [--ingredients 5000]
+        [--interactions 100000] [--brands 2000] [--requests 10000] [--seed 0]
+
+writes rules.json, interactions.json and brand_map.json (valid input for
+load_rulebook() and `python -m engine.compile_rules --dir`) plus
+workload.jsonl, one analyze() request per line. The same seed always gives
+the same files.
+
+Ingredients are drug_<n>, brands brand_<n> with one to four ingredients.
+With --with-base the real engine rules are kept and extended, so workloads
+also hit the named checks (NSAID stacking, alcohol, paracetamol dosing).
+"""
+
+import argparse
+import json
+import os
+import random
+
+from engine.compile_rules import validate
+from engine.rulebook import rule_path, get_rulebook, RULES_FILE, INTERACTIONS_FILE, BRAND_MAP_FILE
+
+
+WORKLOAD_FILE = "workload.jsonl"
+
+RISKS = ["bleeding", "liver stress", "kidney stress", "sedation", "serotonin syndrome", "qt prolongation"]
+CONTRAINDICATIONS = ["pregnancy", "liver_disease", "kidney_disease", "ulcer_history"]
+
+# Organ loads add up over all of a patient's medicines; most drugs have none
+ORGAN_LOADS = [0, 0, 0, 0, 0, 0, 1, 1, 2]
+
+# Share of brands combining several ingredients
+MULTI_INGREDIENT_SHARE = 0.3
+
+
+# ----------------------------
+# Formulary
+# ----------------------------
+
+def ingredient_names(count):
+    return [f"drug_{i}" for i in range(count)]
+
+
+def synthetic_rules(names, rng):
+    rules = {}
+    for name in names:
+        single = rng.choice([50, 100, 250, 500, 1000])
+        rule = {
+            "max_daily_dose": single * rng.choice([2, 3, 4, 6]),
+            "single_dose_limit": single,
+            "min_spacing_hours": rng.choice([4, 6, 8, 12, 24]),
+            "liver_load": rng.choice(ORGAN_LOADS),
+            "stomach_risk": rng.choice(ORGAN_LOADS),
+            "kidney_load": rng.choice(ORGAN_LOADS),
+            "contraindications": {}
+        }
+        for key in CONTRAINDICATIONS:
+            if rng.random() < 0.1:
+                rule["contraindications"][key] = True
+        if rng.random() < 0.1:
+            rule["contraindications"]["min_age"] = rng.choice([2, 6, 12, 16])
+        rules[name] = rule
+    return rules
+
+
+def synthetic_interactions(size, names, rng):
+    """
+    `size` interactions between distinct pairs of `names`.
+    """
+
+    possible = len(names) * (len(names) - 1) // 2
+    if size > possible:
+        raise ValueError(f"{len(names)} ingredients allow at most {possible} interactions")
+
+    seen = set()
+    table = []
+    while len(table) < size:
+        a, b = rng.sample(names, 2)
+        if (a, b) in seen or (b, a) in seen:
+            continue
+        seen.add((a, b))
+        table.append({
+            "drugA": a,
+            "drugB": b,
+            "risk": rng.choice(RISKS),
+            "severity": rng.randint(1, 5)
+        })
+    return table
+
+
+def synthetic_brands(count, names, rng):
+    brands = {}
+    for i in range(count):
+        size = rng.randint(2, 4) if rng.random() < MULTI_INGREDIENT_SHARE else 1
+        brands[f"brand_{i}"] = rng.sample(names, min(size, len(names)))
+    return brands
+
+
+def formulary(ingredients=1000, interactions=10000, brands=None, seed=0, base=None):
+    """
+    Returns (rules, interactions, brand_map). brands defaults to half the
+    ingredient count. base: (rules, interactions, brand_map) to extend,
+    e.g. get_rulebook().to_data().
+    """
+
+    rng = random.Random(seed)
+    names = ingredient_names(ingredients)
+    if brands is None:
+        brands = ingredients // 2
+
+    rules = synthetic_rules(names, rng)
+    table = synthetic_interactions(interactions, names, rng)
+    brand_map = synthetic_brands(brands, names, rng)
+
+    if base is not None:
+        base_rules, base_interactions, base_brands = base
+        rules = {**base_rules, **rules}
+        table = list(base_interactions) + table
+        brand_map = {**base_brands, **brand_map}
+
+    return rules, table, brand_map
+
+
+# ----------------------------
+# Workload
+# ----------------------------
+
+def workload(rules, brand_map, requests, seed=0, max_meds=30):
+    """
+    Yields `requests` analyze() inputs: a medicine (ingredient or brand),
+    usually within its single-dose limit, and 1 to `max_meds` other
+    medicines (few for most patients), with optional history and patient
+    fields.
+    """
+
+    rng = random.Random(seed)
+    medicines = list(rules) + [brand for brand, found in brand_map.items() if found[0] in rules]
+
+    for _ in range(requests):
+        medicine = rng.choice(medicines)
+        limit = rules[brand_map[medicine][0] if medicine in brand_map else medicine]["single_dose_limit"]
+
+        meds = min(int(rng.triangular(1, max_meds + 1, 1)), max_meds, len(medicines))
+        item = {
+            "medicine": medicine,
+            "dose": rng.choice([limit / 4, limit / 2, limit / 2, limit, limit * 2]),
+            "time": f"{rng.randrange(24):02d}:{rng.randrange(60):02d}",
+            "other_meds": rng.sample(medicines, meds)
+        }
+
+        if rng.random() < 0.5:
+            item["previous_time"] = f"{rng.randrange(24):02d}:{rng.randrange(60):02d}"
+            item["dose_history"] = [limit / 2] * rng.randint(1, 3)
+        if rng.random() < 0.3:
+            item["weight"] = rng.choice([12, 20, 35, 60, 80])
+        if rng.random() < 0.3:
+            item["age"] = rng.choice([4, 10, 30, 70])
+        if rng.random() < 0.1:
+            item["pregnant"] = True
+        if rng.random() < 0.2:
+            item["alcohol"] = True
+
+        yield item
+
+
+def read_workload(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ----------------------------
+# Files
+# ----------------------------
+
+def write_formulary(directory, rules, interactions, brand_map):
+    os.makedirs(directory, exist_ok=True)
+    for filename, data in zip(
+        (RULES_FILE, INTERACTIONS_FILE, BRAND_MAP_FILE), (rules, interactions, brand_map)
+    ):
+        with open(rule_path(filename, directory), "w") as f:
+            json.dump(data, f)
+
+
+def write_workload(path, items):
+    with open(path, "w") as f:
+        for item in items:
+            f.write(json.dumps(item) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-o", "--output", required=True, help="directory to write the files to")
+    parser.add_argument("--ingredients", type=int, default=1000)
+    parser.add_argument("--interactions", type=int, default=10000)
+    parser.add_argument("--brands", type=int, help="default: half the ingredient count")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--max-meds", type=int, default=30, help="other medicines per request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--with-base", action="store_true", help="extend the real engine rules")
+    args = parser.parse_args(argv)
+
+    base = get_rulebook().to_data() if args.with_base else None
+    rules, interactions, brand_map = formulary(
+        args.ingredients, args.interactions, args.brands, args.seed, base
+    )
+
+    errors, _ = validate(rules, interactions, brand_map)
+    if errors:
+        raise SystemExit(f"generated rules are invalid: {errors[0]}")
+
+    write_formulary(args.output, rules, interactions, brand_map)
+    write_workload(
+        os.path.join(args.output, WORKLOAD_FILE),
+        workload(rules, brand_map, args.requests, args.seed, args.max_meds)
+    )
+
+    print(json.dumps({
+        "output": args.output,
+        "rules": len(rules),
+        "interactions": len(interactions),
+        "brands": len(brand_map),
+        "requests": args.requests
+    }))
+
+
+if __name__ == "__main__":
+    main()
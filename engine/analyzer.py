@@ -1,30 +1,25 @@
-import json
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
 from collections import Counter
+from functools import lru_cache
 
 from engine.spacing import check_spacing
 from engine.overdose import check_overdose
 from engine.interactions import check_interactions
 from engine.scoring import compute_score
+from engine.metrics import start_clock
+from engine.timeline import dose_window
+from engine.result import AnalysisResult, Conflict
+from engine.rulebook import get_rulebook
 
 
-# ----------------------------
-# Load configuration files
-# ----------------------------
-
-def load_rules():
-    with open("engine/rules.json") as f:
-        return json.load(f)
-
+logger = logging.getLogger(__name__)
 
-def load_interactions():
-    with open("engine/interactions.json") as f:
-        return json.load(f)
+# Drug class whose stacking is reported as "nsaid_stacking"
+NSAID_CLASS = "nsaid"
 
-
-def load_brand_map():
-    with open("engine/brand_map.json") as f:
-        return json.load(f)
+INFANT_CONFLICT = Conflict("Infants require pediatric supervision for medication dosing.", 10)
+CHILD_WEIGHT_CONFLICT = Conflict("Weight-based dosing is required for children.", 5)
 
 
 # ----------------------------
@@ -37,7 +32,7 @@ def calculate_remaining_time(previous_time, current_time, min_spacing):
     curr = datetime.strptime(current_time, fmt)
 
     if curr < prev:
-        curr = curr.replace(day=prev.day + 1)
+        curr += timedelta(days=1)
 
     hours_passed = (curr - prev).total_seconds() / 3600
     remaining = min_spacing - hours_passed
@@ -45,6 +40,27 @@ def calculate_remaining_time(previous_time, current_time, min_spacing):
     return round(remaining, 1) if remaining > 0 else 0
 
 
+@lru_cache(maxsize=4096)
+def conflict_group(risk):
+    """
+    Deduplication key for a conflict's risk text.
+    """
+
+    key = risk.lower()
+
+    # Group similar liver-related risks
+    if "liver" in key:
+        key = "liver_issue"
+    elif "kidney" in key:
+        key = "kidney_issue"
+    elif "duplicate" in key:
+        key = "duplicate_issue"
+    elif "nsaid" in key:
+        key = "nsaid_issue"
+
+    return key
+
+
 # ----------------------------
 # Guidance Generator
 # ----------------------------
@@ -71,9 +87,9 @@ def generate_guidance(
     if absolute_block:
         # Check for specific infant block
         if conflicts:
-            infant_risk = next((c for c in conflicts if "infants" in c["risk"].lower()), None)
+            infant_risk = next((c for c in conflicts if "infants" in c.risk.lower()), None)
             if infant_risk:
-                return [infant_risk["risk"]]
+                return [infant_risk.risk]
                 
         return [
             "Avoid taking this medication until you speak to a healthcare professional."
@@ -150,11 +166,52 @@ def generate_guidance(
 # Main Analyzer
 # ----------------------------
 
-def analyze(input_data):
+def analyze_result(input_data, rulebook=None, profile_cache=None):
+    """
+    analyze() before it becomes the response: an AnalysisResult, or the
+    {"error": ...} dict for invalid input.
+    """
+
+    if rulebook is None:
+        rulebook = get_rulebook()
+
+    clock = start_clock()
+    result = _analyze(input_data, rulebook, clock, profile_cache)
+    clock.finish()
+    return result
+
+
+def analyze(input_data, rulebook=None, profile_cache=None):
+
+    if rulebook is None:
+        rulebook = get_rulebook()
+
+    result = analyze_result(input_data, rulebook, profile_cache)
 
-    rules = load_rules()
-    interactions_data = load_interactions()
-    brand_map = load_brand_map()
+    if isinstance(result, dict):
+        logger.info(
+            "analysis rejected",
+            extra={"event": "analyze_rejected", "error": result["error"]}
+        )
+    else:
+        # Which rules produced this result, for reproducibility
+        result = result.as_dict(rulebook.version)
+
+        logger.debug(
+            "analysis complete",
+            extra={
+                "event": "analyze_complete",
+                "risk_level": result["risk_level"],
+                "score": result["score"]
+            }
+        )
+
+    return result
+
+
+def _analyze(input_data, rulebook, clock, profile_cache=None):
+
+    rules = rulebook.rules
 
     medicine = input_data["medicine"].lower()
     dose = input_data["dose"]
@@ -166,6 +223,8 @@ def analyze(input_data):
     age = input_data.get("age")
     weight = input_data.get("weight")
     pregnant = input_data.get("pregnant", False)
+    # Timestamped history: previous_time and dose_history come from the events
+    dose_events = input_data.get("dose_events")
 
     conflicts = []
     absolute_block = False
@@ -181,10 +240,7 @@ def analyze(input_data):
             # infant hard stop
             if weight < 5:
                 absolute_block = True
-                conflicts.append({
-                    "risk": "Infants require pediatric supervision for medication dosing.",
-                    "severity": 10
-                })
+                conflicts.append(INFANT_CONFLICT)
         except (ValueError, TypeError):
             return {"error": "Invalid weight format: must be a number"}
 
@@ -196,10 +252,7 @@ def analyze(input_data):
             
             # pediatric caution without weight
             if age < 12 and weight is None:
-                conflicts.append({
-                    "risk": "Weight-based dosing is required for children.",
-                    "severity": 5
-                })
+                conflicts.append(CHILD_WEIGHT_CONFLICT)
         except (ValueError, TypeError):
             return {"error": "Invalid age format: must be a number"}
 
@@ -211,21 +264,24 @@ def analyze(input_data):
     ):
         return {"error": "Invalid dose_history format"}
 
-    try:
-        datetime.strptime(time, "%H:%M")
-    except:
-        return {"error": "Invalid time format. Use HH:MM"}
+    if dose_events is None:
+        try:
+            datetime.strptime(time, "%H:%M")
+        except:
+            return {"error": "Invalid time format. Use HH:MM"}
 
-    if previous_time:
+    if previous_time and dose_events is None:
         try:
             datetime.strptime(previous_time, "%H:%M")
         except:
             return {"error": "Invalid previous_time format. Use HH:MM"}
 
+    clock.lap("validation")
+
     # ---------------- Brand Expansion ----------------
 
     def expand(med):
-        return brand_map.get(med, [med])
+        return list(rulebook.expand(med))
 
     expanded_primary = expand(medicine)
     expanded_others = []
@@ -243,16 +299,35 @@ def analyze(input_data):
     if primary not in rules:
         return {"error": "Medicine not found in rules"}
 
+    clock.lap("brand_expansion")
+
     # ---------------- Spacing ----------------
 
     spacing_violation = False
-    if previous_time:
+    if dose_events is not None:
+        try:
+            dose_history, gap_hours, current, previous = dose_window(
+                primary, dose, time, dose_events, rulebook
+            )
+        except ValueError as e:
+            return {"error": str(e)}
+
+        # Clock times for the guidance text
+        time = current.strftime("%H:%M")
+        previous_time = previous.strftime("%H:%M") if previous else None
+
+        if gap_hours is not None:
+            spacing_violation = gap_hours < rules[primary]["min_spacing_hours"]
+
+    elif previous_time:
         spacing_violation = check_spacing(
             previous_time,
             time,
             rules[primary]["min_spacing_hours"]
         )
 
+    clock.lap("spacing")
+
     # ---------------- Overdose & Near Limit ----------------
 
     overdose, total_dose = check_overdose(
@@ -263,202 +338,69 @@ def analyze(input_data):
 
     max_daily = rules[primary]["max_daily_dose"]
     
-    # Stricter paracetamol accumulation
-    if primary == "paracetamol":
-        near_limit = (total_dose >= 0.75 * max_daily) and not overdose
-    else:
-        near_limit = (total_dose >= 0.85 * max_daily) and not overdose
+    # Some ingredients (paracetamol) have a stricter factor in clinical.json
+    near_limit_factor = rulebook.clinical.near_limit_factor(primary)
+    near_limit = (total_dose >= near_limit_factor * max_daily) and not overdose
 
-    # ---------------- Interactions ----------------
+    clock.lap("overdose")
 
-    for i in range(len(expanded_all)):
-        for j in range(i + 1, len(expanded_all)):
-            conflicts.extend(
-                check_interactions(
-                    expanded_all[i],
-                    [expanded_all[j]],
-                    interactions_data
-                )
-            )
-
-    # ---------------- Weight-Based Dosing (Paracetamol) ----------------
-    
-    dose_per_kg = 0
-    if primary == "paracetamol" and weight:
-        dose_per_kg = dose / weight
-        if dose_per_kg > 20:
-            absolute_block = True
-            conflicts.append({
-                "risk": f"Paracetamol dose too high for weight ({round(dose_per_kg, 1)}mg/kg > 20mg/kg)",
-                "severity": 10
-            })
-        elif dose_per_kg > 15:
-            conflicts.append({
-                "risk": f"Paracetamol dose requires caution for weight ({round(dose_per_kg, 1)}mg/kg > 15mg/kg)",
-                "severity": 4
-            })
-
-    # ---------------- Daily mg/kg Accumulation (Paracetamol) ----------------
-
-    if primary == "paracetamol" and weight:
-        total_dose_per_kg = total_dose / weight
-        
-        if total_dose_per_kg > 75:
-            absolute_block = True
-            conflicts.append({
-                "risk": f"Critical daily paracetamol accumulation ({round(total_dose_per_kg, 1)}mg/kg > 75mg/kg)",
-                "severity": 10
-            })
-        elif total_dose_per_kg > 60:
-            conflicts.append({
-                "risk": f"High daily paracetamol accumulation ({round(total_dose_per_kg, 1)}mg/kg > 60mg/kg)",
-                "severity": 4
-            })
+    # ---------------- Medicine & Profile Stages ----------------
 
-    # ---------------- Contraindications ----------------
-
-   
-
-    for med in expanded_primary:
-        contra = rules[med].get("contraindications", {})
-
-        if pregnant and contra.get("pregnancy"):
-            absolute_block = True
-            conflicts.append({
-                "risk": f"{med} contraindicated in pregnancy",
-                "severity": 7
-            })
-
-        if age and age < contra.get("min_age", 0):
-            absolute_block = True
-            conflicts.append({
-                "risk": f"{med} contraindicated for this age",
-                "severity": 5
-            })
-
-    # ---------------- Duplicate Ingredient ----------------
-
-    # Collect both name and ingredients to detect "hidden" ones
-    all_pairs = []
-    for med in [medicine] + other_meds:
-        ingredients = expand(med)
-        for ing in ingredients:
-            all_pairs.append({"name": med, "ingredient": ing})
-
-    if alcohol:
-        all_pairs.append({"name": "alcohol", "ingredient": "alcohol"})
-
-    # Count ingredient occurrences
-    ing_counts = Counter(p["ingredient"] for p in all_pairs)
-
-    duplicate_ingredients = [ing for ing, count in ing_counts.items() if count > 1 and ing in rules]
-
-    for ing in duplicate_ingredients:
-        # Check if the names used are different
-        names_for_this_ing = set(p["name"] for p in all_pairs if p["ingredient"] == ing)
-        
-        if len(names_for_this_ing) > 1:
-            # Different names = Hidden Duplicate
-            if ing == "paracetamol":
-                absolute_block = True
-                conflicts.append({
-                    "risk": "Critical: Hidden duplicate paracetamol detected across brands",
-                    "severity": 10
-                })
-            else:
-                conflicts.append({
-                    "risk": f"Hidden duplicate {ing} detected across different brands",
-                    "severity": 7
-                })
-        else:
-            # Same name used multiple times
-            if ing == "paracetamol":
-                # For same-name paracetamol, we don't absolute block (overdose handles it)
-                # but we still warn.
-                conflicts.append({
-                    "risk": "Multiple doses of paracetamol detected",
-                    "severity": 2
-                })
-            else:
-                conflicts.append({
-                    "risk": f"Multiple doses of {ing} detected",
-                    "severity": 2
-                })
-
-    duplicate_stacking = len(duplicate_ingredients) > 0
-
-    # ---------------- Organ Load ----------------
-
-    liver_load = 0
-    stomach_risk = 0
-    kidney_load = 0
+    # Interactions, contraindications, duplicates and organ load do not depend
+    # on the dose or its timing; callers re-checking one patient (sessions)
+    # pass a profile_cache to skip them between doses.
+    profile = None
+    if profile_cache is not None:
+        profile_key = (
+            medicine, tuple(other_meds), bool(alcohol), age, bool(pregnant), rulebook.version
+        )
+        profile = profile_cache.get(profile_key)
 
-    for med in expanded_all:
-        if med in rules:
-            liver_load += rules[med]["liver_load"]
-            stomach_risk += rules[med]["stomach_risk"]
-            kidney_load += rules[med].get("kidney_load", 0)
+    if profile is None:
+        profile = _profile_stages(
+            medicine, other_meds, alcohol, age, pregnant,
+            primary, expanded_primary, expanded_all, rulebook, clock
+        )
+        if profile_cache is not None:
+            profile_cache[profile_key] = profile
 
-    # Severe organ escalation
-    if liver_load >= 6:
-        absolute_block = True
-        conflicts.append({
-            "risk": "Severe liver stress detected",
-            "severity": 5
-        })
+    conflicts.extend(profile["interaction_conflicts"])
 
-    if kidney_load >= 4:
-        absolute_block = True
-        conflicts.append({
-            "risk": "High kidney stress detected",
-            "severity": 5
-        })
+    # ---------------- Weight-Based Dosing (single dose, daily mg/kg) ----------------
 
-    # ---------------- NSAID Stacking ----------------
+    weight_conflicts, weight_block = rulebook.clinical.weight_conflicts(
+        primary, dose, total_dose, weight
+    )
+    conflicts.extend(weight_conflicts)
+    absolute_block = absolute_block or weight_block
 
-    nsaid_list = ["ibuprofen", "aspirin", "naproxen", "diclofenac"]
-    nsaid_count = sum(1 for med in expanded_all if med in nsaid_list)
-    nsaid_stacking = nsaid_count > 1
+    clock.lap("weight_dosing")
 
-    if nsaid_stacking:
-        conflicts.append({
-            "risk": "NSAID stacking",
-            "severity": 4
-        })
+    conflicts.extend(profile["conflicts"])
 
-    # ---------------- Alcohol Synergy Escalation ----------------
-    
-    if alcohol and primary == "paracetamol":
-        absolute_block = True
-        conflicts.append({
-            "risk": "Alcohol significantly increases paracetamol liver toxicity",
-            "severity": 10
-        })
+    absolute_block = absolute_block or profile["absolute_block"]
+    nsaid_stacking = profile["nsaid_stacking"]
+    duplicate_stacking = profile["duplicate_stacking"]
+    liver_load = profile["liver_load"]
+    stomach_risk = profile["stomach_risk"]
+    kidney_load = profile["kidney_load"]
 
     # ---------------- Conflict Deduplication ----------------
     unique_conflicts = {}
     for conflict in conflicts:
-        key = conflict["risk"].lower()
-
-        # Group similar liver-related risks
-        if "liver" in key:
-            key = "liver_issue"
-        elif "kidney" in key:
-            key = "kidney_issue"
-        elif "duplicate" in key:
-            key = "duplicate_issue"
-        elif "nsaid" in key:
-            key = "nsaid_issue"
+        key = conflict_group(conflict.risk)
 
         # Keep highest severity version
-        if key not in unique_conflicts or conflict["severity"] > unique_conflicts[key]["severity"]:
+        if key not in unique_conflicts or conflict.severity > unique_conflicts[key].severity:
             unique_conflicts[key] = conflict
 
     conflicts = list(unique_conflicts.values())
 
+    clock.lap("dedup")
+
     # ---------------- Scoring ----------------
 
-    result = compute_score(
+    scored = compute_score(
         overdose=overdose,
         spacing_violation=spacing_violation,
         conflicts=conflicts,
@@ -467,7 +409,7 @@ def analyze(input_data):
         kidney_load=kidney_load
     )
 
-    result["score"] = min(result["score"], 100)
+    score = min(scored["score"], 100)
 
     # ---------------- Deterministic Risk Logic ----------------
 
@@ -480,20 +422,20 @@ def analyze(input_data):
     elif near_limit:
         risk_level = "CAUTION"
 
-    elif result["score"] <= 25:
+    elif score <= 25:
         risk_level = "SAFE"
 
-    elif result["score"] <= 60:
+    elif score <= 60:
         risk_level = "CAUTION"
 
     else:
         risk_level = "HIGH RISK"
 
-    result["risk_level"] = risk_level
+    clock.lap("scoring")
 
     # ---------------- Guidance ----------------
 
-    result["guidance"] = generate_guidance(
+    guidance = generate_guidance(
         spacing_violation,
         overdose,
         near_limit,
@@ -512,17 +454,199 @@ def analyze(input_data):
         weight
     )
 
+    result = AnalysisResult(
+        score,
+        risk_level,
+        scored["issues"],
+        guidance,
+        conflicts,
+        liver_load,
+        stomach_risk,
+        kidney_load,
+        nsaid_stacking,
+        duplicate_stacking,
+        total_dose,
+        rules[primary]["min_spacing_hours"],
+        absolute_block
+    )
 
-    
-    result["conflicts"] = conflicts
-    result["liver_load"] = liver_load
-    result["stomach_risk"] = stomach_risk
-    result["kidney_load"] = kidney_load
-    result["nsaid_stacking"] = nsaid_stacking
-    result["duplicate_stacking"] = duplicate_stacking
-    result["total_dose"] = total_dose
-    result["min_spacing"] = rules[primary]["min_spacing_hours"]
-
-    print("FINAL RESULT:", result)
+    clock.lap("guidance")
 
     return result
+
+
+def _profile_stages(
+    medicine,
+    other_meds,
+    alcohol,
+    age,
+    pregnant,
+    primary,
+    expanded_primary,
+    expanded_all,
+    rulebook,
+    clock
+):
+    """
+    Stages that depend only on the medicines taken and the patient profile.
+    """
+
+    rules = rulebook.rules
+    clinical = rulebook.clinical
+
+    def expand(med):
+        return list(rulebook.expand(med))
+
+    # ---------------- Interactions ----------------
+
+    # Rulebook entries are read-only; the result copies them when it is built
+    interaction_conflicts = []
+    matrix = rulebook.conflict_matrix
+    interactions_data = rulebook.interaction_index
+
+    if matrix is not None:
+        ids = [matrix.id_of(med) for med in expanded_all]
+        for i in range(len(ids)):
+            for j in range(i + 1, len(ids)):
+                interaction_conflicts.extend(matrix.pair_entries(ids[i], ids[j]))
+    else:
+        for i in range(len(expanded_all)):
+            for j in range(i + 1, len(expanded_all)):
+                interaction_conflicts.extend(
+                    check_interactions(
+                        expanded_all[i],
+                        [expanded_all[j]],
+                        interactions_data
+                    )
+                )
+
+    interaction_conflicts = [Conflict.from_entry(entry) for entry in interaction_conflicts]
+
+    clock.lap("interactions")
+
+    conflicts = []
+    absolute_block = False
+
+    # ---------------- Contraindications ----------------
+
+   
+
+    for med in expanded_primary:
+        contra = rules[med].get("contraindications", {})
+
+        if pregnant and contra.get("pregnancy"):
+            absolute_block = True
+            conflicts.append(Conflict(f"{med} contraindicated in pregnancy", 7))
+
+        if age and age < contra.get("min_age", 0):
+            absolute_block = True
+            conflicts.append(Conflict(f"{med} contraindicated for this age", 5))
+
+    clock.lap("contraindications")
+
+    # ---------------- Duplicate Ingredient ----------------
+
+    # Collect both name and ingredients to detect "hidden" ones
+    all_pairs = []
+    for med in [medicine] + other_meds:
+        ingredients = expand(med)
+        for ing in ingredients:
+            all_pairs.append({"name": med, "ingredient": ing})
+
+    if alcohol:
+        all_pairs.append({"name": "alcohol", "ingredient": "alcohol"})
+
+    # Count ingredient occurrences
+    ing_counts = Counter(p["ingredient"] for p in all_pairs)
+
+    duplicate_ingredients = [ing for ing, count in ing_counts.items() if count > 1 and ing in rules]
+
+    for ing in duplicate_ingredients:
+        # Check if the names used are different
+        names_for_this_ing = set(p["name"] for p in all_pairs if p["ingredient"] == ing)
+        
+        if len(names_for_this_ing) > 1:
+            # Different names = Hidden Duplicate; clinical.json may make it critical
+            override = clinical.hidden_duplicates.get(ing)
+            if override is not None:
+                conflict, block = override
+                absolute_block = absolute_block or block
+                conflicts.append(conflict)
+            else:
+                conflicts.append(Conflict(f"Hidden duplicate {ing} detected across different brands", 7))
+        else:
+            # Same name used multiple times: no block, the overdose check handles it
+            conflicts.append(Conflict(f"Multiple doses of {ing} detected", 2))
+
+    duplicate_stacking = len(duplicate_ingredients) > 0
+
+    clock.lap("duplicates")
+
+    # ---------------- Organ Load ----------------
+
+    liver_load = 0
+    stomach_risk = 0
+    kidney_load = 0
+
+    for med in expanded_all:
+        if med in rules:
+            liver_load += rules[med]["liver_load"]
+            stomach_risk += rules[med]["stomach_risk"]
+            kidney_load += rules[med].get("kidney_load", 0)
+
+    # ---------------- Escalations (organ load, class stacking, alcohol) ----------------
+
+    loads = {"liver_load": liver_load, "stomach_risk": stomach_risk, "kidney_load": kidney_load}
+    escalations, escalation_block, stacked = clinical.escalate(primary, alcohol, loads, expanded_all)
+    conflicts.extend(escalations)
+    absolute_block = absolute_block or escalation_block
+    nsaid_stacking = NSAID_CLASS in stacked
+
+    clock.lap("organ_load")
+
+    return {
+        "interaction_conflicts": interaction_conflicts,
+        "conflicts": conflicts,
+        "absolute_block": absolute_block,
+        "nsaid_stacking": nsaid_stacking,
+        "duplicate_stacking": duplicate_stacking,
+        "liver_load": liver_load,
+        "stomach_risk": stomach_risk,
+        "kidney_load": kidney_load
+    }
+
+
+# ----------------------------
+# Batch Analyzer
+# ----------------------------
+
+def analyze_many(inputs, rulebook=None, workers=None, chunk_size=None):
+    """
+    Analyze a sequence of inputs against one shared RuleBook.
+    Returns one entry per input, in order; malformed items get an
+    {"error": ...} entry instead of aborting the batch.
+
+    With workers > 1 the batch is spread over a process pool
+    (see engine.parallel).
+    """
+
+    if workers and workers > 1:
+        from engine.parallel import analyze_parallel, DEFAULT_CHUNK_SIZE
+        return analyze_parallel(inputs, workers, chunk_size or DEFAULT_CHUNK_SIZE, rulebook)
+
+    if rulebook is None:
+        rulebook = get_rulebook()
+
+    return [analyze_item(item, rulebook) for item in inputs]
+
+
+def analyze_item(item, rulebook=None):
+    if not isinstance(item, dict):
+        return {"error": "Each item must be a JSON object"}
+
+    try:
+        return analyze(item, rulebook)
+    except KeyError as e:
+        return {"error": f"Missing required field: {e.args[0]}"}
+    except (TypeError, AttributeError, ValueError):
+        return {"error": "Invalid input format"}
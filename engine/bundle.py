@@ -0,0 +1,417 @@
+"""
+Compiled rule bundle.
+
+One file holding rules.json, interactions.json, brand_map.json and
+clinical.json in a form that loads without JSON parsing or index building:
+
+  * ingredient, brand and risk names interned once in a string table,
+  * numeric rule fields as typed arrays in rule order,
+  * interactions as parallel name-ID / severity arrays,
+  * the prebuilt conflict matrix tables (engine.conflict_matrix),
+  * the clinical rules, small enough to stay JSON in the header.
+
+Arrays are used in place from a memory map, and an interaction entry is
+only turned into a dict when a lookup first reaches it. The bundle records
+the same version fingerprint load_rulebook() computes from the JSON files,
+plus their sizes and mtimes, so a bundle older than its sources is ignored.
+
+Layout: MAGIC, u32 header length, JSON header, then 8-byte aligned
+sections listed in the header as [offset, length, typecode].
+
+Written by `python -m engine.compile_rules`.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from types import MappingProxyType
+
+from engine.clinical import ClinicalRules, CLINICAL_FILE
+from engine.conflict_matrix import ConflictMatrix
+from engine.rulebook import (
+    RuleBook,
+    rule_path,
+    source_path,
+    _fingerprint,
+    _freeze,
+    RULES_FILE,
+    INTERACTIONS_FILE,
+    BRAND_MAP_FILE
+)
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TIRBNDL1"
+FORMAT_VERSION = 3
+BUNDLE_FILE = "rules.bundle"
+
+SOURCE_FILES = (RULES_FILE, INTERACTIONS_FILE, BRAND_MAP_FILE, CLINICAL_FILE)
+
+# Interaction entries stored as arrays; anything else is kept as JSON
+INTERACTION_KEYS = ["drugA", "drugB", "risk", "severity"]
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _numeric_fields(rules):
+    """
+    Leading rule fields that every rule has, in the same position, with one
+    numeric type throughout: those become typed arrays.
+    """
+
+    rows = list(rules.values())
+    if not rows:
+        return []
+
+    fields = []
+    for position, field in enumerate(rows[0]):
+        values = []
+        for row in rows:
+            keys = list(row)
+            if position >= len(keys) or keys[position] != field:
+                return fields
+            values.append(row[field])
+
+        if all(_is_int(v) for v in values):
+            fields.append((field, "q"))
+        elif all(isinstance(v, float) for v in values):
+            fields.append((field, "d"))
+        else:
+            break
+
+    return fields
+
+
+def source_stats(directory=None):
+    stats = {}
+    for filename in SOURCE_FILES:
+        try:
+            info = os.stat(source_path(filename, directory))
+        except OSError:
+            return None
+        stats[filename] = [info.st_size, info.st_mtime_ns]
+    return stats
+
+
+def source_version(directory=None):
+    blobs = []
+    for filename in SOURCE_FILES:
+        with open(source_path(filename, directory), "rb") as f:
+            blobs.append(f.read())
+    return _fingerprint(*blobs)
+
+
+# ----------------------------
+# Writing
+# ----------------------------
+
+def write_bundle(rulebook, path, sources=None):
+    """
+    Writes `rulebook` to `path`. sources: {filename: [size, mtime_ns]} of
+    the JSON files it was compiled from (see source_stats).
+    """
+
+    rules, interactions, brand_map = rulebook.to_data()
+
+    strings = []
+    string_ids = {}
+
+    def intern(name):
+        if name not in string_ids:
+            string_ids[name] = len(strings)
+            strings.append(name)
+        return string_ids[name]
+
+    sections = {}
+
+    # ---------------- Rules ----------------
+
+    fields = _numeric_fields(rules)
+    sections["rule_names"] = array("i", (intern(name) for name in rules))
+    for field, typecode in fields:
+        sections[f"rule.{field}"] = array(typecode, (rule[field] for rule in rules.values()))
+
+    array_fields = {field for field, _ in fields}
+    rule_extra = [
+        {key: value for key, value in rule.items() if key not in array_fields}
+        for rule in rules.values()
+    ]
+
+    # ---------------- Brand map ----------------
+
+    brand_names = array("i")
+    brand_offsets = array("I", [0])
+    brand_members = array("i")
+    for brand, ingredients in brand_map.items():
+        brand_names.append(intern(brand))
+        brand_members.extend(intern(name) for name in ingredients)
+        brand_offsets.append(len(brand_members))
+
+    sections.update(brand_names=brand_names, brand_offsets=brand_offsets, brand_members=brand_members)
+
+    # ---------------- Interactions ----------------
+
+    drug_a, drug_b, risk, severity = array("i"), array("i"), array("i"), array("q")
+    interaction_extra = {}
+    for position, entry in enumerate(interactions):
+        regular = (
+            list(entry) == INTERACTION_KEYS
+            and isinstance(entry["drugA"], str)
+            and isinstance(entry["drugB"], str)
+            and isinstance(entry["risk"], str)
+            and _is_int(entry["severity"])
+        )
+        if regular:
+            drug_a.append(intern(entry["drugA"]))
+            drug_b.append(intern(entry["drugB"]))
+            risk.append(intern(entry["risk"]))
+            severity.append(entry["severity"])
+        else:
+            interaction_extra[str(position)] = entry
+            drug_a.append(-1)
+            drug_b.append(-1)
+            risk.append(-1)
+            severity.append(0)
+
+    sections.update(ix_drug_a=drug_a, ix_drug_b=drug_b, ix_risk=risk, ix_severity=severity)
+
+    # ---------------- Conflict matrix ----------------
+
+    matrix = rulebook.conflict_matrix
+    if matrix is not None:
+        order = rulebook.interaction_index.order
+        slot_offsets = array("I", [0, 0])
+        slot_members = array("I")
+        for found in matrix.entries[1:]:
+            slot_members.extend(order[id(entry)] for entry in found)
+            slot_offsets.append(len(slot_members))
+
+        sections.update(
+            matrix_names=array("i", (intern(name) for name in matrix.names)),
+            matrix_cells=array("i", matrix.cells),
+            slot_offsets=slot_offsets,
+            slot_members=slot_members
+        )
+
+    string_blob = "\0".join(strings).encode()
+
+    # ---------------- Layout ----------------
+
+    payloads = [("strings", string_blob, "B")]
+    payloads.extend((name, data.tobytes(), data.typecode) for name, data in sections.items())
+
+    header = {
+        "format": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "version": rulebook.version,
+        "sources": sources,
+        "string_count": len(strings),
+        "rule_fields": fields,
+        "rule_extra": rule_extra,
+        "interaction_extra": interaction_extra,
+        "clinical": rulebook.clinical.to_data(),
+        "matrix": matrix is not None,
+        "sections": {}
+    }
+
+    # Offsets depend on the header length, which depends on the offsets:
+    # lay out relative to the data start, then shift once the header is fixed.
+    relative = {}
+    cursor = 0
+    for name, blob, typecode in payloads:
+        relative[name] = (cursor, len(blob), typecode)
+        cursor += (len(blob) + 7) // 8 * 8
+
+    start = 0
+    while True:
+        header["sections"] = {
+            name: [start + offset, length, typecode]
+            for name, (offset, length, typecode) in relative.items()
+        }
+        encoded = json.dumps(header, separators=(",", ":")).encode()
+        needed = (len(MAGIC) + 4 + len(encoded) + 7) // 8 * 8
+        if needed == start:
+            break
+        start = needed
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(encoded)))
+        f.write(encoded)
+        f.write(b"\0" * (start - f.tell()))
+        for name, blob, _ in payloads:
+            f.write(blob)
+            f.write(b"\0" * (-len(blob) % 8))
+
+    # Readers never see a half-written bundle
+    os.replace(tmp, path)
+
+
+# ----------------------------
+# Reading
+# ----------------------------
+
+class _LazyEntries:
+    """
+    Sequence of matrix slots -> entry tuples, built on first access.
+    """
+
+    __slots__ = ("_offsets", "_members", "_entry", "_cache")
+
+    def __init__(self, offsets, members, entry):
+        self._offsets = offsets
+        self._members = members
+        self._entry = entry
+        self._cache = {0: ()}
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, slot):
+        found = self._cache.get(slot)
+        if found is None:
+            found = tuple(
+                self._entry(k)
+                for k in self._members[self._offsets[slot]:self._offsets[slot + 1]]
+            )
+            self._cache[slot] = found
+        return found
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a rule bundle")
+        (length,) = struct.unpack("<I", f.read(4))
+        return json.loads(f.read(length))
+
+
+def is_fresh(header, directory=None):
+    """
+    True when the bundle matches the JSON files next to it (or they are absent).
+    """
+
+    stats = source_stats(directory)
+    if stats is None:
+        # Bundle-only deployment
+        return not any(os.path.exists(rule_path(name, directory)) for name in SOURCE_FILES)
+
+    if header.get("sources") == stats:
+        return True
+
+    # Touched but possibly unchanged: compare contents
+    return source_version(directory) == header["version"]
+
+
+def read_bundle(path):
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(data)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a rule bundle")
+
+    (length,) = struct.unpack_from("<I", view, len(MAGIC))
+    header = json.loads(bytes(view[len(MAGIC) + 4:len(MAGIC) + 4 + length]))
+
+    if header["format"] != FORMAT_VERSION or header["byteorder"] != sys.byteorder:
+        raise ValueError(f"{path}: unsupported bundle format")
+
+    def section(name):
+        offset, size, typecode = header["sections"][name]
+        return view[offset:offset + size].cast(typecode)
+
+    strings = bytes(section("strings")).decode().split("\0") if header["string_count"] else []
+
+    # ---------------- Rules ----------------
+
+    columns = [(field, section(f"rule.{field}")) for field, _ in header["rule_fields"]]
+    rules = {}
+    for position, name_id in enumerate(section("rule_names")):
+        rule = {field: column[position] for field, column in columns}
+        rule.update(header["rule_extra"][position])
+        rules[strings[name_id]] = _freeze(rule)
+
+    # ---------------- Brand map ----------------
+
+    offsets, members = section("brand_offsets"), section("brand_members")
+    brand_map = {
+        strings[brand]: tuple(strings[m] for m in members[offsets[i]:offsets[i + 1]])
+        for i, brand in enumerate(section("brand_names"))
+    }
+
+    # ---------------- Interactions (materialized on demand) ----------------
+
+    drug_a, drug_b = section("ix_drug_a"), section("ix_drug_b")
+    risk, severity = section("ix_risk"), section("ix_severity")
+    extra = header["interaction_extra"]
+    built = {}
+
+    def entry(k):
+        found = built.get(k)
+        if found is None:
+            if drug_a[k] < 0:
+                found = _freeze(extra[str(k)])
+            else:
+                found = MappingProxyType({
+                    "drugA": strings[drug_a[k]],
+                    "drugB": strings[drug_b[k]],
+                    "risk": strings[risk[k]],
+                    "severity": severity[k]
+                })
+            built[k] = found
+        return found
+
+    def all_entries():
+        return tuple(entry(k) for k in range(len(drug_a)))
+
+    # ---------------- Conflict matrix ----------------
+
+    matrix = None
+    if header["matrix"]:
+        matrix = ConflictMatrix.from_tables(
+            [strings[i] for i in section("matrix_names")],
+            section("matrix_cells"),
+            _LazyEntries(section("slot_offsets"), section("slot_members"), entry)
+        )
+
+    return RuleBook.from_parts(
+        MappingProxyType(rules),
+        MappingProxyType(brand_map),
+        header["version"],
+        matrix,
+        all_entries,
+        ClinicalRules(header["clinical"])
+    )
+
+
+def load_bundle(directory=None):
+    """
+    The RuleBook from `directory`/rules.bundle, or None when there is no
+    usable, up-to-date bundle (callers then read the JSON files).
+    """
+
+    path = rule_path(BUNDLE_FILE, directory)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        if not is_fresh(read_header(path), directory):
+            logger.warning("rule bundle %s is older than its JSON sources; ignoring it", path)
+            return None
+        return read_bundle(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("cannot read rule bundle %s: %s", path, e)
+        return None
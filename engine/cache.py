@@ -0,0 +1,173 @@
+"""
+Bounded LRU/TTL cache for analyze() results.
+
+Inputs are reduced to a canonical form before lookup, and every entry is
+tagged with the RuleBook version it was computed against: a lookup under a
+different version clears the cache, so results never outlive the rules
+that produced them.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from engine.analyzer import analyze
+from engine.rulebook import get_rulebook
+
+
+# ----------------------------
+# Canonical input
+# ----------------------------
+
+def _normalize_time(value):
+    if not isinstance(value, str):
+        return value
+    try:
+        return datetime.strptime(value, "%H:%M").strftime("%H:%M")
+    except ValueError:
+        return value
+
+
+def canonicalize(input_data):
+    """
+    Returns the canonical form of an analyze() input, or None when the input
+    is too malformed to canonicalize (those calls bypass the cache).
+
+    Medicine names are lowercased and other_meds sorted. Brand names are kept
+    rather than replaced by their ingredients: "crocin + dolo_650" and
+    "paracetamol + paracetamol" expand alike but are scored differently by
+    hidden-duplicate detection. The rule version in the cache tag covers
+    brand-map changes instead.
+    """
+
+    if not isinstance(input_data, dict):
+        return None
+
+    try:
+        canonical = dict(input_data)
+        canonical["medicine"] = input_data["medicine"].lower()
+        canonical["time"] = _normalize_time(input_data["time"])
+
+        if "previous_time" in input_data:
+            canonical["previous_time"] = _normalize_time(input_data["previous_time"])
+
+        if "other_meds" in input_data:
+            canonical["other_meds"] = sorted(m.lower() for m in input_data["other_meds"])
+
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+    return canonical
+
+
+def cache_key(canonical):
+    try:
+        # JSON keeps 500 and 500.0 (and True and 1) distinct, unlike tuple keys
+        return json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return None
+
+
+# ----------------------------
+# Cache
+# ----------------------------
+
+class ResultCache:
+
+    def __init__(self, maxsize=4096, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self.version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self._check_version(version)
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or self.clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                del self._entries[key]
+                self.evictions += 1
+
+            self.misses += 1
+            return None
+
+    def put(self, key, version, value):
+        expires_at = self.clock() + self.ttl if self.ttl else None
+
+        with self._lock:
+            self._check_version(version)
+
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+def cached_call(cache, input_data, compute, rulebook=None):
+    """
+    Runs compute(canonical_input, rulebook) through the cache. Returns a
+    shallow copy of the cached value so callers can add top-level keys.
+    """
+
+    if rulebook is None:
+        rulebook = get_rulebook()
+
+    canonical = canonicalize(input_data)
+    key = cache_key(canonical) if canonical is not None else None
+
+    if key is None:
+        return compute(input_data, rulebook)
+
+    value = cache.get(key, rulebook.version)
+    if value is None:
+        value = compute(canonical, rulebook)
+        cache.put(key, rulebook.version, value)
+
+    return dict(value)
+
+
+def cached_analyze(input_data, cache, rulebook=None):
+    return cached_call(cache, input_data, analyze, rulebook)
@@ -0,0 +1,207 @@
+"""
+Clinical rules from clinical.json, compiled for analyze().
+
+The file holds the checks that go beyond one ingredient's rules.json entry:
+
+  * "near_limit_factor": share of max_daily_dose that counts as near the
+    limit, with per-ingredient overrides,
+  * per-ingredient "single_mg_per_kg" / "daily_mg_per_kg" tables
+    ({"caution": ..., "block": ...}) and a "hidden_duplicate" conflict
+    replacing the default one,
+  * "classes": named ingredient lists (e.g. NSAIDs),
+  * "escalations", checked in file order once the organ loads are summed:
+      {"load": "liver_load", "at_least": 6, ...}  organ load total
+      {"class": "nsaid", "at_least": 2, ...}      class members taken
+      {"primary": "paracetamol", "alcohol": true, ...}
+    each adding its "risk" / "severity" conflict, and blocking the dose
+    when "block" is true.
+
+ClinicalRules compiles this once per RuleBook: ingredient entries become
+dict lookups, so analyze() only looks at the rules for the ingredients
+actually taken, and escalations a flat decision table of
+(kind, key, threshold) rows with their conflicts prebuilt.
+"""
+
+import copy
+from collections import namedtuple
+
+from engine.result import Conflict
+
+
+CLINICAL_FILE = "clinical.json"
+
+LOAD_FIELDS = ("liver_load", "stomach_risk", "kidney_load")
+
+# Severities of the mg/kg conflicts
+WEIGHT_CAUTION_SEVERITY = 4
+WEIGHT_BLOCK_SEVERITY = 10
+
+# (basis, caution message, block message); basis is the single or daily dose
+WEIGHT_CHECKS = (
+    (
+        "single_mg_per_kg",
+        "{Name} dose requires caution for weight ({value}mg/kg > {limit}mg/kg)",
+        "{Name} dose too high for weight ({value}mg/kg > {limit}mg/kg)"
+    ),
+    (
+        "daily_mg_per_kg",
+        "High daily {name} accumulation ({value}mg/kg > {limit}mg/kg)",
+        "Critical daily {name} accumulation ({value}mg/kg > {limit}mg/kg)"
+    )
+)
+
+
+MgPerKg = namedtuple("MgPerKg", "caution block caution_risk block_risk")
+
+# Escalation kinds
+LOAD, CLASS, PRIMARY = range(3)
+
+# arg: the at_least threshold, or for PRIMARY whether alcohol is required
+Escalation = namedtuple("Escalation", "kind key arg conflict block stacks")
+
+
+def _conflict(entry):
+    return Conflict(entry["risk"], entry["severity"])
+
+
+def _named(template, name):
+    # Leaves {value} and {limit} for analyze() to fill in
+    return template.replace("{name}", name).replace("{Name}", name.capitalize())
+
+
+def _compile_escalation(entry):
+    block = entry.get("block", False)
+    if "load" in entry:
+        return Escalation(LOAD, entry["load"], entry["at_least"], _conflict(entry), block, None)
+    if "class" in entry:
+        name = entry["class"]
+        return Escalation(CLASS, name, entry["at_least"], _conflict(entry), block, name)
+    return Escalation(
+        PRIMARY, entry["primary"], entry.get("alcohol", False), _conflict(entry), block, None
+    )
+
+
+class ClinicalRules:
+
+    __slots__ = (
+        "_data", "default_near_limit_factor", "near_limit_factors",
+        "mg_per_kg", "hidden_duplicates", "class_of", "escalations"
+    )
+
+    def __init__(self, data):
+        self._data = data
+        self.default_near_limit_factor = data["near_limit_factor"]
+        self.near_limit_factors = {}
+        # ingredient -> {basis: MgPerKg}
+        self.mg_per_kg = {}
+        # ingredient -> (conflict, block)
+        self.hidden_duplicates = {}
+
+        for name, entry in data.get("ingredients", {}).items():
+            if "near_limit_factor" in entry:
+                self.near_limit_factors[name] = entry["near_limit_factor"]
+
+            tables = {}
+            for basis, caution_risk, block_risk in WEIGHT_CHECKS:
+                if basis in entry:
+                    tables[basis] = MgPerKg(
+                        entry[basis]["caution"],
+                        entry[basis]["block"],
+                        _named(caution_risk, name),
+                        _named(block_risk, name)
+                    )
+            if tables:
+                self.mg_per_kg[name] = tables
+
+            if "hidden_duplicate" in entry:
+                found = entry["hidden_duplicate"]
+                self.hidden_duplicates[name] = (_conflict(found), found.get("block", False))
+
+        self.class_of = {}
+        for class_name, members in data.get("classes", {}).items():
+            for member in members:
+                self.class_of.setdefault(member, []).append(class_name)
+        self.class_of = {name: tuple(found) for name, found in self.class_of.items()}
+
+        self.escalations = tuple(_compile_escalation(entry) for entry in data.get("escalations", ()))
+
+    def to_data(self):
+        return copy.deepcopy(self._data)
+
+    def near_limit_factor(self, ingredient):
+        return self.near_limit_factors.get(ingredient, self.default_near_limit_factor)
+
+    def weight_conflicts(self, ingredient, dose, total_dose, weight):
+        """
+        mg/kg conflicts for `ingredient` (single dose first, then the daily
+        total) and whether any of them blocks the dose.
+        """
+
+        tables = self.mg_per_kg.get(ingredient)
+        if not tables or not weight:
+            return [], False
+
+        conflicts = []
+        block = False
+        for basis, amount in (("single_mg_per_kg", dose), ("daily_mg_per_kg", total_dose)):
+            limits = tables.get(basis)
+            if limits is None:
+                continue
+
+            per_kg = amount / weight
+            if per_kg > limits.block:
+                block = True
+                conflicts.append(Conflict(
+                    limits.block_risk.format(value=round(per_kg, 1), limit=limits.block),
+                    WEIGHT_BLOCK_SEVERITY
+                ))
+            elif per_kg > limits.caution:
+                conflicts.append(Conflict(
+                    limits.caution_risk.format(value=round(per_kg, 1), limit=limits.caution),
+                    WEIGHT_CAUTION_SEVERITY
+                ))
+
+        return conflicts, block
+
+    def class_counts(self, ingredients):
+        counts = {}
+        class_of = self.class_of
+        for name in ingredients:
+            found = class_of.get(name)
+            if found:
+                for class_name in found:
+                    counts[class_name] = counts.get(class_name, 0) + 1
+        return counts
+
+    def escalate(self, primary, alcohol, loads, ingredients):
+        """
+        Escalation conflicts for one medicine list, in file order. Returns
+        (conflicts, block, names of the classes found stacked).
+        """
+
+        classes = self.class_counts(ingredients)
+        conflicts = []
+        block = False
+        stacked = ()
+
+        for kind, key, arg, conflict, blocks, stacks in self.escalations:
+            if kind == LOAD:
+                applies = loads[key] >= arg
+            elif kind == CLASS:
+                applies = classes.get(key, 0) >= arg
+            else:
+                applies = primary == key and (alcohol or not arg)
+
+            if applies:
+                conflicts.append(conflict)
+                block = block or blocks
+                if stacks:
+                    stacked += (stacks,)
+
+        return conflicts, block, stacked
+
+    def __repr__(self):
+        return (
+            f"ClinicalRules(ingredients={len(self._data.get('ingredients', {}))}, "
+            f"classes={len(self._data.get('classes', {}))}, escalations={len(self.escalations)})"
+        )
@@ -0,0 +1,291 @@
+"""
+compile-rules: validate the rule files and write the binary rule bundle.
+
+    python -m engine.compile_rules                 # engine/*.json -> engine/rules.bundle
+    python -m engine.compile_rules --dir rules/ -o build/rules.bundle
+
+Exits non-zero (writing nothing) when validation finds errors. load_rulebook()
+picks the bundle up automatically when it sits next to the JSON files and
+falls back to them when it is missing or out of date.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from engine.bundle import BUNDLE_FILE, source_stats, write_bundle
+from engine.clinical import CLINICAL_FILE, LOAD_FIELDS
+from engine.rulebook import (
+    RuleBook,
+    rule_path,
+    source_path,
+    _fingerprint,
+    RULES_FILE,
+    INTERACTIONS_FILE,
+    BRAND_MAP_FILE
+)
+
+
+REQUIRED_RULE_FIELDS = (
+    "max_daily_dose",
+    "single_dose_limit",
+    "min_spacing_hours",
+    "liver_load",
+    "stomach_risk"
+)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate(rules, interactions, brand_map):
+    """
+    Returns (errors, warnings) as lists of messages.
+    """
+
+    errors = []
+    warnings = []
+
+    if not isinstance(rules, dict):
+        return [f"{RULES_FILE}: must be an object of ingredient rules"], warnings
+    if not isinstance(interactions, list):
+        return [f"{INTERACTIONS_FILE}: must be a list of interactions"], warnings
+    if not isinstance(brand_map, dict):
+        return [f"{BRAND_MAP_FILE}: must be an object of brand -> ingredients"], warnings
+
+    for name, rule in rules.items():
+        where = f"{RULES_FILE}: {name}"
+        if name != name.lower():
+            errors.append(f"{where}: names must be lowercase")
+        if not isinstance(rule, dict):
+            errors.append(f"{where}: must be an object")
+            continue
+
+        for field in REQUIRED_RULE_FIELDS:
+            if field not in rule:
+                errors.append(f"{where}: missing {field}")
+            elif not _is_number(rule[field]) or rule[field] < 0:
+                errors.append(f"{where}: {field} must be a non-negative number")
+
+        if "kidney_load" in rule and (not _is_number(rule["kidney_load"]) or rule["kidney_load"] < 0):
+            errors.append(f"{where}: kidney_load must be a non-negative number")
+
+        if (
+            _is_number(rule.get("single_dose_limit")) and _is_number(rule.get("max_daily_dose"))
+            and rule["single_dose_limit"] > rule["max_daily_dose"]
+        ):
+            warnings.append(f"{where}: single_dose_limit exceeds max_daily_dose")
+
+        if not isinstance(rule.get("contraindications", {}), dict):
+            errors.append(f"{where}: contraindications must be an object")
+
+        aliases = rule.get("aliases", [])
+        if not isinstance(aliases, list) or not all(isinstance(a, str) and a for a in aliases):
+            errors.append(f"{where}: aliases must be a list of names")
+
+    for position, entry in enumerate(interactions):
+        where = f"{INTERACTIONS_FILE}[{position}]"
+        if not isinstance(entry, dict):
+            errors.append(f"{where}: must be an object")
+            continue
+
+        for field in ("drugA", "drugB", "risk"):
+            if not isinstance(entry.get(field), str) or not entry.get(field):
+                errors.append(f"{where}: {field} must be a non-empty string")
+
+        if not _is_number(entry.get("severity")):
+            errors.append(f"{where}: severity must be a number")
+
+        for field in ("drugA", "drugB"):
+            if isinstance(entry.get(field), str) and entry[field] not in rules:
+                warnings.append(f"{where}: {entry[field]} has no entry in {RULES_FILE}")
+
+    for brand, ingredients in brand_map.items():
+        where = f"{BRAND_MAP_FILE}: {brand}"
+        if brand != brand.lower():
+            errors.append(f"{where}: names must be lowercase")
+        if (
+            not isinstance(ingredients, list) or not ingredients
+            or not all(isinstance(i, str) for i in ingredients)
+        ):
+            errors.append(f"{where}: must be a non-empty list of ingredient names")
+            continue
+
+        # analyze() answers "Medicine not found" for these rather than failing
+        for ingredient in ingredients:
+            if ingredient not in rules:
+                warnings.append(f"{where}: {ingredient} has no entry in {RULES_FILE}")
+
+    return errors, warnings
+
+
+def _check_conflict(entry, where, errors):
+    if not isinstance(entry, dict):
+        errors.append(f"{where}: must be an object")
+        return
+    if not isinstance(entry.get("risk"), str) or not entry.get("risk"):
+        errors.append(f"{where}: risk must be a non-empty string")
+    if not _is_number(entry.get("severity")):
+        errors.append(f"{where}: severity must be a number")
+    if not isinstance(entry.get("block", False), bool):
+        errors.append(f"{where}: block must be true or false")
+
+
+def _check_factor(value, where, errors):
+    if not _is_number(value) or not 0 < value <= 1:
+        errors.append(f"{where}: near_limit_factor must be a number in (0, 1]")
+
+
+def validate_clinical(clinical, rules):
+    """
+    Returns (errors, warnings) for the clinical rules, checked against `rules`.
+    """
+
+    errors = []
+    warnings = []
+
+    if not isinstance(clinical, dict):
+        return [f"{CLINICAL_FILE}: must be an object"], warnings
+
+    _check_factor(clinical.get("near_limit_factor"), CLINICAL_FILE, errors)
+
+    ingredients = clinical.get("ingredients", {})
+    if not isinstance(ingredients, dict):
+        errors.append(f"{CLINICAL_FILE}: ingredients must be an object")
+        ingredients = {}
+
+    for name, entry in ingredients.items():
+        where = f"{CLINICAL_FILE}: {name}"
+        if not isinstance(entry, dict):
+            errors.append(f"{where}: must be an object")
+            continue
+        if name not in rules:
+            warnings.append(f"{where}: has no entry in {RULES_FILE}")
+
+        if "near_limit_factor" in entry:
+            _check_factor(entry["near_limit_factor"], where, errors)
+
+        for basis in ("single_mg_per_kg", "daily_mg_per_kg"):
+            if basis not in entry:
+                continue
+            table = entry[basis]
+            if (
+                not isinstance(table, dict)
+                or not all(_is_number(table.get(k)) and table[k] > 0 for k in ("caution", "block"))
+            ):
+                errors.append(f"{where}: {basis} needs positive caution and block numbers")
+            elif table["caution"] > table["block"]:
+                errors.append(f"{where}: {basis} caution exceeds block")
+
+        if "hidden_duplicate" in entry:
+            _check_conflict(entry["hidden_duplicate"], f"{where}: hidden_duplicate", errors)
+
+    classes = clinical.get("classes", {})
+    if not isinstance(classes, dict):
+        errors.append(f"{CLINICAL_FILE}: classes must be an object")
+        classes = {}
+
+    for class_name, members in classes.items():
+        where = f"{CLINICAL_FILE}: class {class_name}"
+        if not isinstance(members, list) or not all(isinstance(m, str) for m in members):
+            errors.append(f"{where}: must be a list of ingredient names")
+            continue
+        for member in members:
+            if member not in rules:
+                warnings.append(f"{where}: {member} has no entry in {RULES_FILE}")
+
+    escalations = clinical.get("escalations", [])
+    if not isinstance(escalations, list):
+        errors.append(f"{CLINICAL_FILE}: escalations must be a list")
+        escalations = []
+
+    for position, entry in enumerate(escalations):
+        where = f"{CLINICAL_FILE}: escalations[{position}]"
+        _check_conflict(entry, where, errors)
+        if not isinstance(entry, dict):
+            continue
+
+        kinds = [kind for kind in ("load", "class", "primary") if kind in entry]
+        if len(kinds) != 1:
+            errors.append(f"{where}: needs exactly one of load, class or primary")
+        elif kinds[0] == "load" and entry["load"] not in LOAD_FIELDS:
+            errors.append(f"{where}: load must be one of {', '.join(LOAD_FIELDS)}")
+        elif kinds[0] == "class" and entry["class"] not in classes:
+            errors.append(f"{where}: unknown class {entry['class']}")
+        elif kinds[0] == "primary" and not isinstance(entry.get("alcohol", False), bool):
+            errors.append(f"{where}: alcohol must be true or false")
+
+        if len(kinds) == 1 and kinds[0] in ("load", "class") and not _is_number(entry.get("at_least")):
+            errors.append(f"{where}: at_least must be a number")
+
+    return errors, warnings
+
+
+def compile_rules(directory=None, output=None):
+    """
+    Validates the JSON rule files in `directory` and writes the bundle.
+    Returns (errors, warnings, rulebook or None).
+    """
+
+    blobs = []
+    for filename in (RULES_FILE, INTERACTIONS_FILE, BRAND_MAP_FILE, CLINICAL_FILE):
+        with open(source_path(filename, directory), "rb") as f:
+            blobs.append(f.read())
+
+    try:
+        rules, interactions, brand_map, clinical = (json.loads(blob) for blob in blobs)
+    except ValueError as e:
+        return [f"invalid JSON: {e}"], [], None
+
+    errors, warnings = validate(rules, interactions, brand_map)
+    if isinstance(rules, dict):
+        clinical_errors, clinical_warnings = validate_clinical(clinical, rules)
+        errors += clinical_errors
+        warnings += clinical_warnings
+    if errors:
+        return errors, warnings, None
+
+    rulebook = RuleBook(
+        rules, interactions, brand_map, version=_fingerprint(*blobs), clinical=clinical
+    )
+    write_bundle(rulebook, output or rule_path(BUNDLE_FILE, directory), source_stats(directory))
+
+    return errors, warnings, rulebook
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="compile-rules",
+        description="Validate the rule files and write the binary rule bundle."
+    )
+    parser.add_argument("--dir", help="directory holding the JSON rule files (default: engine/)")
+    parser.add_argument("-o", "--output", help=f"bundle path (default: <dir>/{BUNDLE_FILE})")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    errors, warnings, rulebook = compile_rules(args.dir, args.output)
+
+    for message in warnings:
+        print(f"warning: {message}", file=sys.stderr)
+    for message in errors:
+        print(f"error: {message}", file=sys.stderr)
+
+    if rulebook is None:
+        return 1
+
+    print(json.dumps({
+        "version": rulebook.version,
+        "rules": len(rulebook.rules),
+        "interactions": len(rulebook.interactions),
+        "brands": len(rulebook.brand_map),
+        "matrix": rulebook.conflict_matrix is not None,
+        "output": args.output or rule_path(BUNDLE_FILE, args.dir),
+        "seconds": round(time.perf_counter() - started, 3)
+    }))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
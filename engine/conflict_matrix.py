@@ -0,0 +1,86 @@
+"""
+Precomputed pairwise conflict table.
+
+Every ingredient the rule files can produce (rules.json keys, brand_map
+ingredients, interaction drugs and alcohol) gets an integer ID. For each
+ID pair a flat array points at the merged interaction entries for that
+pair (file order).
+
+analyze() then replaces its per-pair interaction scan with direct table
+lookups.
+"""
+
+from array import array
+
+
+# Above this many ingredients the n*n tables get too large; analyze()
+# falls back to the interaction index instead.
+MAX_MATRIX_INGREDIENTS = 2048
+
+
+class ConflictMatrix:
+    __slots__ = ("names", "ids", "size", "cells", "entries")
+
+    def __init__(self, names, interaction_index):
+        self.names = tuple(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.size = n = len(self.names)
+
+        # cells[i * n + j] indexes into entries; 0 means "no interactions"
+        self.cells = array("i", bytes(4 * n * n))
+        self.entries = [()]
+
+        for pair, found in interaction_index.pairs.items():
+            members = tuple(pair)
+            a, b = members if len(members) == 2 else members * 2
+            i, j = self.ids[a], self.ids[b]
+
+            self.entries.append(found)
+            slot = len(self.entries) - 1
+
+            self.cells[i * n + j] = self.cells[j * n + i] = slot
+
+    @classmethod
+    def from_tables(cls, names, cells, entries):
+        """
+        Wraps tables built earlier (see engine.bundle) without recomputing them.
+        """
+
+        self = cls.__new__(cls)
+        self.names = tuple(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.size = len(self.names)
+        self.cells = cells
+        self.entries = entries
+        return self
+
+    def id_of(self, name):
+        return self.ids.get(name, -1)
+
+    def pair_entries(self, i, j):
+        if i < 0 or j < 0:
+            return ()
+        return self.entries[self.cells[i * self.size + j]]
+
+
+def known_ingredients(rules, interactions, brand_map):
+    names = set(rules)
+    names.add("alcohol")
+
+    for ingredients in brand_map.values():
+        names.update(ingredients)
+
+    for entry in interactions:
+        names.add(entry["drugA"])
+        names.add(entry["drugB"])
+
+    return sorted(names)
+
+
+def build_conflict_matrix(rules, interactions, brand_map, interaction_index):
+    names = known_ingredients(rules, interactions, brand_map)
+
+    if len(names) > MAX_MATRIX_INGREDIENTS:
+        return None
+
+    return ConflictMatrix(names, interaction_index)
@@ -1,4 +1,70 @@
+class InteractionIndex:
+    """
+    Interaction entries keyed on the unordered ingredient pair, plus an
+    adjacency set per ingredient. Entries for a pair keep their file order.
+    """
+
+    __slots__ = ("pairs", "adjacency", "entries", "order")
+
+    def __init__(self, interactions_data):
+        pairs = {}
+        adjacency = {}
+
+        for entry in interactions_data:
+            a, b = entry["drugA"], entry["drugB"]
+            pairs.setdefault(frozenset((a, b)), []).append(entry)
+            adjacency.setdefault(a, set()).add(b)
+            adjacency.setdefault(b, set()).add(a)
+
+        self.pairs = {key: tuple(found) for key, found in pairs.items()}
+        self.adjacency = {key: frozenset(found) for key, found in adjacency.items()}
+        self.entries = tuple(interactions_data)
+        self.order = {id(entry): i for i, entry in enumerate(self.entries)}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def lookup(self, drug_a, drug_b):
+        return self.pairs.get(frozenset((drug_a, drug_b)), ())
+
+    def neighbours(self, medicine):
+        return self.adjacency.get(medicine, frozenset())
+
+
+def build_interaction_index(interactions_data):
+    if isinstance(interactions_data, InteractionIndex):
+        return interactions_data
+    return InteractionIndex(interactions_data)
+
+
 def check_interactions(medicine, other_meds, interactions_data):
+    """
+    interactions_data: raw interaction list or a prebuilt InteractionIndex
+    """
+
+    if isinstance(interactions_data, InteractionIndex):
+        conflicts = []
+        partners = interactions_data.neighbours(medicine)
+
+        if not partners:
+            return conflicts
+
+        # One entry list per distinct partner, in entry order, as the scan below
+        seen = set()
+        for other in other_meds:
+            if other in partners and other not in seen:
+                seen.add(other)
+                conflicts.extend(interactions_data.lookup(medicine, other))
+
+        if len(seen) > 1:
+            order = interactions_data.order
+            conflicts.sort(key=lambda entry: order[id(entry)])
+
+        return conflicts
+
     conflicts = []
 
     for entry in interactions_data:
@@ -0,0 +1,131 @@
+"""
+Opt-in per-stage timing for analyze().
+
+Disabled (the default), start_clock() hands out a shared no-op clock, so
+each stage boundary costs a single empty method call. Enable with
+ANALYZE_STAGE_TIMING=1 or enable_stage_timing(); timings are aggregated
+into fixed-bucket histograms and rendered in Prometheus text format.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+
+# Seconds; analyze() stages run in the microsecond range
+BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025,
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1
+)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(BUCKETS, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+
+class StageRegistry:
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def render(self, name="analyze_stage_seconds"):
+        lines = [
+            f"# HELP {name} Time spent in each analyze() stage.",
+            f"# TYPE {name} histogram"
+        ]
+
+        for stage, histogram in list(self.histograms.items()):
+            with histogram._lock:
+                counts = list(histogram.counts)
+                total, count = histogram.sum, histogram.count
+
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.9f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = StageRegistry()
+
+
+# ----------------------------
+# Clocks
+# ----------------------------
+
+class StageClock:
+    __slots__ = ("registry", "started", "last")
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.started = self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.registry.observe(stage, now - self.last)
+        self.last = now
+
+    def finish(self):
+        self.registry.observe("total", time.perf_counter() - self.started)
+
+
+class _NullClock:
+    __slots__ = ()
+
+    def lap(self, stage):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_CLOCK = _NullClock()
+
+_enabled = os.environ.get("ANALYZE_STAGE_TIMING", "") in ("1", "true", "yes")
+
+
+def enable_stage_timing(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+
+def stage_timing_enabled():
+    return _enabled
+
+
+def start_clock():
+    return StageClock(REGISTRY) if _enabled else NULL_CLOCK
+
+
+def render_stage_timings():
+    return REGISTRY.render()
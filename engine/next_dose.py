@@ -0,0 +1,162 @@
+"""
+Earliest safe next dose.
+
+Rather than re-running analyze() over candidate times and doses, the
+spacing, single-dose, daily-cap, near-limit and mg/kg (clinical.json) limits
+are solved in closed form. One analyze() call at the answer confirms it;
+if some other rule disagrees, the dose is bisected with analyze() as the
+oracle (SAFE is monotone in the dose).
+
+Input is the /analyze payload without "dose": dose_history lists the
+doses already taken today and previous_time is the time of the last one.
+"""
+
+import math
+from datetime import datetime, timedelta
+
+from engine.analyzer import analyze
+from engine.rulebook import get_rulebook
+
+
+TIME_FORMAT = "%H:%M"
+
+
+# ----------------------------
+# Closed-form bounds
+# ----------------------------
+
+def wait_hours(previous_time, current_time, min_spacing):
+    """
+    Hours still to wait at current_time (HH:MM, wrapping past midnight).
+    """
+
+    if not previous_time:
+        return 0.0
+
+    elapsed = (current_time - previous_time) % timedelta(days=1)
+    return max(0.0, min_spacing - elapsed.total_seconds() / 3600)
+
+
+def dose_limits(rule, primary, history, weight=None, clinical=None):
+    """
+    Largest whole-mg dose allowed by each limit, given the doses already
+    taken. clinical defaults to the shared RuleBook's clinical rules.
+    """
+
+    if clinical is None:
+        clinical = get_rulebook().clinical
+
+    taken = sum(history)
+    max_daily = rule["max_daily_dose"]
+    factor = clinical.near_limit_factor(primary)
+
+    limits = {
+        "single_dose_limit": rule["single_dose_limit"],
+        "max_daily_dose": math.floor(max_daily - taken),
+        # near_limit trips at total >= factor * max_daily, so stay strictly below
+        "near_limit": math.ceil(factor * max_daily - taken) - 1
+    }
+
+    tables = clinical.mg_per_kg.get(primary, {})
+    if weight:
+        if "single_mg_per_kg" in tables:
+            limits["single_mg_per_kg"] = math.floor(tables["single_mg_per_kg"].caution * weight)
+        if "daily_mg_per_kg" in tables:
+            limits["daily_mg_per_kg"] = math.floor(tables["daily_mg_per_kg"].caution * weight - taken)
+
+    return limits
+
+
+def _positive_weight(weight):
+    try:
+        weight = float(weight)
+    except (TypeError, ValueError):
+        return None
+    return weight if weight > 0 else None
+
+
+# ----------------------------
+# Solver
+# ----------------------------
+
+def next_safe_dose(input_data, rulebook=None):
+
+    if rulebook is None:
+        rulebook = get_rulebook()
+
+    history = input_data.get("dose_history", [])
+    if not isinstance(history, list) or not all(
+        isinstance(d, (int, float)) and d > 0 for d in history
+    ):
+        return {"error": "Invalid dose_history format"}
+
+    try:
+        now = datetime.strptime(input_data["time"], TIME_FORMAT)
+    except (TypeError, ValueError):
+        return {"error": "Invalid time format. Use HH:MM"}
+
+    previous_time = input_data.get("previous_time")
+    if previous_time:
+        try:
+            previous_time = datetime.strptime(previous_time, TIME_FORMAT)
+        except (TypeError, ValueError):
+            return {"error": "Invalid previous_time format. Use HH:MM"}
+
+    primary = rulebook.expand(input_data["medicine"].lower())[0]
+    if primary not in rulebook.rules:
+        return {"error": "Medicine not found in rules"}
+
+    rule = rulebook.rules[primary]
+
+    # Rounded up to a whole minute: HH:MM cannot say 12:19:48, and 12:19 is too early
+    wait_minutes = math.ceil(round(wait_hours(previous_time, now, rule["min_spacing_hours"]) * 60, 6))
+    wait = wait_minutes / 60
+    earliest = (now + timedelta(minutes=wait_minutes)).strftime(TIME_FORMAT)
+
+    limits = dose_limits(
+        rule, primary, history, _positive_weight(input_data.get("weight")), rulebook.clinical
+    )
+    binding = min(limits, key=limits.get)
+    max_dose = limits[binding]
+
+    def check(dose):
+        return analyze(
+            {**input_data, "dose": dose, "dose_history": history + [dose], "time": earliest},
+            rulebook
+        )
+
+    # Confirm the closed-form answer (also validates the rest of the input)
+    result = check(max(max_dose, 1))
+    if "error" in result:
+        return result
+
+    if max_dose >= 1 and result["risk_level"] != "SAFE":
+        # A rule outside the closed-form limits objects: bisect the dose
+        floor = check(1)
+        if floor["risk_level"] != "SAFE":
+            result, max_dose, binding = floor, 0, "rules"
+        else:
+            low, high = 1, max_dose
+            while low < high:
+                mid = (low + high + 1) // 2
+                if check(mid)["risk_level"] == "SAFE":
+                    low = mid
+                else:
+                    high = mid - 1
+            max_dose, binding = low, "rules"
+            result = check(max_dose)
+
+    safe = max_dose >= 1 and result["risk_level"] == "SAFE"
+
+    return {
+        "medicine": primary,
+        "safe": safe,
+        "earliest_time": earliest if safe else None,
+        "wait_hours": round(wait, 2) if safe else None,
+        "max_dose": max_dose if safe else 0,
+        "binding_limit": binding,
+        "limits": limits,
+        "risk_level": result["risk_level"],
+        "score": result["score"],
+        "guidance": result["guidance"]
+    }
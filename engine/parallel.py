@@ -0,0 +1,101 @@
+"""
+Multi-core batch analysis.
+
+analyze() is pure CPU-bound Python, so bulk audits are spread over a
+process pool. Each worker builds its RuleBook once in the pool initializer
+and then analyzes whole chunks of inputs; results always come back in
+input order.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from engine.analyzer import analyze_many
+from engine.rulebook import get_rulebook
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Rule book of the current worker process, set by _init_worker
+_worker_rulebook = None
+
+
+def _init_worker(rulebook):
+    global _worker_rulebook
+    _worker_rulebook = rulebook if rulebook is not None else get_rulebook()
+
+
+def _analyze_chunk(chunk):
+    return analyze_many(chunk, _worker_rulebook)
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+class ParallelAnalyzer:
+    """
+    A process pool dedicated to analyze(). Use as a context manager so the
+    workers are shut down with it:
+
+        with ParallelAnalyzer(workers=8) as pool:
+            results = pool.map(inputs)
+    """
+
+    def __init__(self, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, rulebook=None):
+        self.workers = workers or default_workers()
+        self.chunk_size = chunk_size
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(rulebook,)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def map(self, inputs):
+        return [result for chunk in self.imap_chunks(_chunked(inputs, self.chunk_size)) for result in chunk]
+
+    def imap(self, inputs):
+        """
+        Lazily analyzes an iterable of inputs and yields results in order,
+        keeping only a bounded number of chunks in flight.
+        """
+
+        for chunk in self.imap_chunks(_chunked(inputs, self.chunk_size)):
+            yield from chunk
+
+    def imap_chunks(self, chunks):
+        max_in_flight = self.workers * 2
+        pending = deque()
+
+        for chunk in chunks:
+            pending.append(self._executor.submit(_analyze_chunk, chunk))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyze_parallel(inputs, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, rulebook=None):
+    with ParallelAnalyzer(workers, chunk_size, rulebook) as pool:
+        return pool.map(inputs)
@@ -0,0 +1,176 @@
+"""
+Hot reload of the rule files.
+
+RuleWatcher polls the size and mtime of rules.json, interactions.json,
+brand_map.json, clinical.json (the engine's own when the rules directory
+has none) and rules.bundle. When any of them changes it builds a new
+RuleBook on its own thread (validating JSON sources first) and swaps it in
+with set_rulebook(). Requests already running finish on the RuleBook they
+started with; there is no point at which a request can see half of the old
+rules and half of the new ones. Rule files that fail to load or validate
+are logged and the current rules stay in place.
+
+reload() can also be called directly, e.g. from an admin endpoint.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from engine.bundle import BUNDLE_FILE, SOURCE_FILES, load_bundle
+from engine.compile_rules import validate, validate_clinical
+from engine.rulebook import RuleBook, get_rulebook, rule_path, set_rulebook, source_path, _fingerprint
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds load_checked() sleeps between steps
+RELOAD_PAUSE = 0.0002
+
+
+def file_signature(directory=None):
+    """
+    (path, size, mtime) of each file load_rulebook() would read, so a
+    clinical.json taken from the engine directory is watched there.
+    """
+
+    paths = [source_path(filename, directory) for filename in SOURCE_FILES]
+    paths.append(rule_path(BUNDLE_FILE, directory))
+
+    signature = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+            signature.append((path, info.st_size, info.st_mtime_ns))
+        except OSError:
+            signature.append((path, None))
+    return tuple(signature)
+
+
+def _pause():
+    # Let request threads waiting for the GIL run between reload steps
+    time.sleep(RELOAD_PAUSE)
+
+
+def load_checked(directory=None):
+    """
+    Like load_rulebook(), but JSON sources are validated (a bundle was
+    validated when it was compiled). Raises ValueError when they are invalid.
+
+    The work is done in steps of a fraction of a millisecond each, with a
+    short sleep between them, so a reload never holds the GIL long enough
+    to stall the requests running meanwhile.
+    """
+
+    rulebook = load_bundle(directory)
+    if rulebook is not None:
+        return rulebook
+
+    blobs = []
+    for filename in SOURCE_FILES:
+        with open(source_path(filename, directory), "rb") as f:
+            blobs.append(f.read())
+
+    parsed = []
+    for blob in blobs:
+        _pause()
+        parsed.append(json.loads(blob))
+    rules, interactions, brand_map, clinical = parsed
+
+    _pause()
+    errors, _ = validate(rules, interactions, brand_map)
+    _pause()
+    errors += validate_clinical(clinical, rules)[0]
+    if errors:
+        raise ValueError(f"{len(errors)} rule error(s), first: {errors[0]}")
+
+    _pause()
+    return RuleBook(rules, interactions, brand_map, version=_fingerprint(*blobs), clinical=clinical)
+
+
+class RuleWatcher:
+
+    def __init__(self, directory=None, interval=5.0, install=set_rulebook):
+        self.directory = directory
+        self.interval = interval
+        self.install = install
+
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+
+        self._signature = file_signature(directory)
+        self._reload_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def reload(self, current=None):
+        """
+        Loads the rule files and installs them if their version differs from
+        `current` (default: the shared RuleBook). Returns (old, new) versions;
+        raises ValueError (keeping the old rules) when they cannot be loaded.
+        """
+
+        with self._reload_lock:
+            self._signature = file_signature(self.directory)
+
+            if current is None:
+                current = get_rulebook()
+
+            try:
+                rulebook = load_checked(self.directory)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.failures += 1
+                self.last_error = str(e)
+                logger.warning("rule reload failed, keeping version %s: %s", current.version, e)
+                raise ValueError(str(e)) from e
+
+            self.last_error = None
+            if rulebook.version != current.version:
+                self.install(rulebook)
+                self.reloads += 1
+                logger.info("rules reloaded: %s -> %s", current.version, rulebook.version)
+
+            return current.version, rulebook.version
+
+    def check(self):
+        """
+        Reloads if the rule files changed since the last look. Returns True
+        when a reload was attempted.
+        """
+
+        if file_signature(self.directory) == self._signature:
+            return False
+
+        try:
+            self.reload()
+        except ValueError:
+            pass
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="rule-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {
+            "version": get_rulebook().version,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,111 @@
+"""
+Typed analyze() results.
+
+Inside analyze() conflicts are Conflict objects: slotted and frozen, so
+the ones compiled into the rules (clinical.json escalations, interaction
+entries) are shared between requests instead of copied into each one.
+The outcome is gathered in an AnalysisResult and turned into the public
+dict once, by as_dict(), with the keys in a fixed order. Only conflicts
+that survive deduplication ever become dicts.
+
+The JSON shape is unchanged: a conflict is {"risk", "severity"}, or a copy
+of its interactions.json entry.
+"""
+
+
+class Conflict:
+
+    __slots__ = ("risk", "severity", "entry")
+
+    def __init__(self, risk, severity, entry=None):
+        set_slot = object.__setattr__
+        set_slot(self, "risk", risk)
+        set_slot(self, "severity", severity)
+        # interactions.json entry this conflict reports, if any
+        set_slot(self, "entry", entry)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Conflict is immutable (cannot set {name!r})")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Conflict is immutable (cannot delete {name!r})")
+
+    def __reduce__(self):
+        return Conflict, (self.risk, self.severity, self.entry)
+
+    @classmethod
+    def from_entry(cls, entry):
+        return cls(entry["risk"], entry["severity"], entry)
+
+    def as_dict(self):
+        if self.entry is not None:
+            return dict(self.entry)
+        return {"risk": self.risk, "severity": self.severity}
+
+    def __repr__(self):
+        return f"Conflict({self.risk!r}, {self.severity!r})"
+
+
+class AnalysisResult:
+
+    __slots__ = (
+        "score", "risk_level", "issues", "guidance", "conflicts",
+        "liver_load", "stomach_risk", "kidney_load", "nsaid_stacking",
+        "duplicate_stacking", "total_dose", "min_spacing", "absolute_block"
+    )
+
+    def __init__(
+        self,
+        score,
+        risk_level,
+        issues,
+        guidance,
+        conflicts,
+        liver_load,
+        stomach_risk,
+        kidney_load,
+        nsaid_stacking,
+        duplicate_stacking,
+        total_dose,
+        min_spacing,
+        absolute_block=False
+    ):
+        self.score = score
+        self.risk_level = risk_level
+        self.issues = issues
+        self.guidance = guidance
+        self.conflicts = conflicts
+        self.liver_load = liver_load
+        self.stomach_risk = stomach_risk
+        self.kidney_load = kidney_load
+        self.nsaid_stacking = nsaid_stacking
+        self.duplicate_stacking = duplicate_stacking
+        self.total_dose = total_dose
+        self.min_spacing = min_spacing
+        # Whether a critical conflict forced HIGH RISK whatever the score;
+        # not part of the response
+        self.absolute_block = absolute_block
+
+    def as_dict(self, rule_version=None):
+        """
+        The analyze() response, built in one go (rule_version included).
+        """
+
+        return {
+            "score": self.score,
+            "risk_level": self.risk_level,
+            "issues": self.issues,
+            "guidance": self.guidance,
+            "conflicts": [conflict.as_dict() for conflict in self.conflicts],
+            "liver_load": self.liver_load,
+            "stomach_risk": self.stomach_risk,
+            "kidney_load": self.kidney_load,
+            "nsaid_stacking": self.nsaid_stacking,
+            "duplicate_stacking": self.duplicate_stacking,
+            "total_dose": self.total_dose,
+            "min_spacing": self.min_spacing,
+            "rule_version": rule_version
+        }
+
+    def __repr__(self):
+        return f"AnalysisResult(risk_level={self.risk_level!r}, score={self.score!r})"
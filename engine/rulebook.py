@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import threading
+from types import MappingProxyType
+
+from functools import lru_cache
+
+from engine.interactions import InteractionIndex
+from engine.conflict_matrix import build_conflict_matrix
+from engine.clinical import ClinicalRules, CLINICAL_FILE
+from engine.search import SearchIndex
+
+
+# ----------------------------
+# Rule file locations (package-relative, not cwd-relative)
+# ----------------------------
+
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Where the shared RuleBook is read from (e.g. a generated formulary)
+RULES_DIR = os.environ.get("RULES_DIR") or ENGINE_DIR
+
+RULES_FILE = "rules.json"
+INTERACTIONS_FILE = "interactions.json"
+BRAND_MAP_FILE = "brand_map.json"
+
+
+def rule_path(filename, directory=None):
+    return os.path.join(directory or RULES_DIR, filename)
+
+
+def source_path(filename, directory=None):
+    """
+    Like rule_path(), but a directory without its own clinical.json uses
+    the one shipped with the engine.
+    """
+
+    path = rule_path(filename, directory)
+    if filename == CLINICAL_FILE and not os.path.exists(path):
+        return os.path.join(ENGINE_DIR, CLINICAL_FILE)
+    return path
+
+
+@lru_cache(maxsize=1)
+def _default_clinical():
+    with open(os.path.join(ENGINE_DIR, CLINICAL_FILE)) as f:
+        return json.load(f)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _alias_map(rules):
+    # Other names of an ingredient expand to it, like a one-ingredient brand
+    return {
+        alias.lower(): (name,)
+        for name, rule in rules.items()
+        for alias in rule.get("aliases", ())
+    }
+
+
+def _fingerprint(*blobs):
+    digest = hashlib.sha256()
+    for blob in blobs:
+        digest.update(blob)
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+# ----------------------------
+# RuleBook
+# ----------------------------
+
+class RuleBook:
+    """
+    Immutable, pre-parsed view of rules.json, interactions.json,
+    brand_map.json and clinical.json (compiled, see engine.clinical).
+    Build it once and share it across calls to analyze().
+    """
+
+    __slots__ = (
+        "rules", "brand_map", "version", "conflict_matrix", "clinical",
+        "_aliases", "_interactions", "_interaction_index", "_search_index", "_lock"
+    )
+
+    def __init__(self, rules, interactions, brand_map, version=None, matrix=True, clinical=None):
+        if clinical is None:
+            clinical = _default_clinical()
+
+        if version is None:
+            version = _fingerprint(
+                json.dumps(rules, sort_keys=True).encode(),
+                json.dumps(interactions, sort_keys=True).encode(),
+                json.dumps(brand_map, sort_keys=True).encode(),
+                json.dumps(clinical, sort_keys=True).encode()
+            )
+
+        object.__setattr__(self, "rules", _freeze(rules))
+        object.__setattr__(self, "_interactions", _freeze(interactions))
+        object.__setattr__(self, "brand_map", _freeze(brand_map))
+        object.__setattr__(self, "_aliases", _alias_map(rules))
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "clinical", ClinicalRules(clinical))
+        object.__setattr__(self, "_lock", threading.RLock())
+        object.__setattr__(self, "_search_index", None)
+        object.__setattr__(self, "_interaction_index", InteractionIndex(self._interactions))
+        object.__setattr__(
+            self,
+            "conflict_matrix",
+            build_conflict_matrix(rules, interactions, brand_map, self._interaction_index)
+            if matrix else None
+        )
+
+    @classmethod
+    def from_parts(cls, rules, brand_map, version, conflict_matrix, interactions, clinical):
+        """
+        Assembles a RuleBook from already compiled parts (see engine.bundle).
+        rules and brand_map must be frozen; interactions may be a callable
+        returning the frozen entries, called on first use. clinical is a
+        ClinicalRules.
+        """
+
+        self = object.__new__(cls)
+        for name, value in (
+            ("rules", rules),
+            ("brand_map", brand_map),
+            ("version", version),
+            ("conflict_matrix", conflict_matrix),
+            ("clinical", clinical),
+            ("_aliases", _alias_map(rules)),
+            ("_interactions", interactions),
+            ("_interaction_index", None),
+            ("_search_index", None),
+            ("_lock", threading.RLock())
+        ):
+            object.__setattr__(self, name, value)
+        return self
+
+    @property
+    def interactions(self):
+        entries = self._interactions
+        if callable(entries):
+            with self._lock:
+                if callable(self._interactions):
+                    object.__setattr__(self, "_interactions", self._interactions())
+                entries = self._interactions
+        return entries
+
+    @property
+    def interaction_index(self):
+        index = self._interaction_index
+        if index is None:
+            with self._lock:
+                if self._interaction_index is None:
+                    object.__setattr__(self, "_interaction_index", InteractionIndex(self.interactions))
+                index = self._interaction_index
+        return index
+
+    @property
+    def search_index(self):
+        """
+        Name search over brands and ingredients (engine.search), built on first use.
+        """
+
+        index = self._search_index
+        if index is None:
+            with self._lock:
+                if self._search_index is None:
+                    object.__setattr__(self, "_search_index", SearchIndex(self.rules, self.brand_map))
+                index = self._search_index
+        return index
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RuleBook is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("RuleBook is immutable")
+
+    def __reduce__(self):
+        # Rebuilt from plain data so it can be shipped to worker processes
+        return (RuleBook, (*self.to_data(), self.version, True, self.clinical.to_data()))
+
+    def to_data(self):
+        """
+        Returns mutable (rules, interactions, brand_map) copies; the
+        clinical rules have their own to_data().
+        """
+        return _thaw(self.rules), _thaw(self.interactions), _thaw(self.brand_map)
+
+    def expand(self, med):
+        """
+        The ingredients of a brand, the ingredient an alias names (e.g.
+        acetaminophen for paracetamol), or (med,) itself.
+        """
+        return self.brand_map.get(med) or self._aliases.get(med, (med,))
+
+    def __repr__(self):
+        return (
+            f"RuleBook(version={self.version!r}, rules={len(self.rules)}, "
+            f"interactions={len(self.interactions)}, brands={len(self.brand_map)})"
+        )
+
+
+def load_rulebook(directory=None, bundle=True):
+    """
+    Read and compile the rule files from `directory` (defaults to the
+    engine package directory). A current rules.bundle there (see
+    engine.compile_rules) is used instead when present.
+    """
+
+    if bundle:
+        from engine.bundle import load_bundle
+        rulebook = load_bundle(directory)
+        if rulebook is not None:
+            return rulebook
+
+    blobs = []
+    for filename in (RULES_FILE, INTERACTIONS_FILE, BRAND_MAP_FILE, CLINICAL_FILE):
+        with open(source_path(filename, directory), "rb") as f:
+            blobs.append(f.read())
+
+    rules, interactions, brand_map, clinical = (json.loads(blob) for blob in blobs)
+
+    return RuleBook(rules, interactions, brand_map, version=_fingerprint(*blobs), clinical=clinical)
+
+
+# ----------------------------
+# Process-wide shared instance
+# ----------------------------
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_rulebook():
+    global _shared
+
+    rulebook = _shared
+    if rulebook is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = load_rulebook()
+            rulebook = _shared
+
+    return rulebook
+
+
+def set_rulebook(rulebook):
+    """
+    Replaces the shared RuleBook. Calls already running keep the RuleBook
+    they started with; later get_rulebook() calls see the new one.
+    """
+
+    global _shared
+
+    with _shared_lock:
+        _shared = rulebook
@@ -18,10 +18,10 @@ def compute_score(
         issues.append("Dose taken too soon")
 
     if conflicts:
+        # engine.result.Conflict objects
         for conflict in conflicts:
-            severity = conflict.get("severity", 1)
-            score += severity * 10
-            issues.append(f"Interaction risk: {conflict['risk']}")
+            score += conflict.severity * 10
+            issues.append(f"Interaction risk: {conflict.risk}")
 
 
     if alcohol:
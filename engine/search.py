@@ -0,0 +1,254 @@
+"""
+Medicine name search for autocomplete.
+
+SearchIndex covers every brand in brand_map.json and every ingredient in
+rules.json, plus the "aliases" a rule may list (e.g. acetaminophen for
+paracetamol). Names are matched in normalized form: lowercase, with runs
+of spaces and punctuation as "_", so "Dolo 650" finds dolo_650. A compact
+form without separators ("dolo650") is indexed as well.
+
+  * Prefix matches come from a trie whose nodes hold their best
+    completions precomputed, so a lookup walks len(query) nodes. Word
+    starts inside a name are indexed too ("action" finds
+    vicks_action_500), ranked below matches on the start of the name.
+  * If that leaves room, misspellings are matched through a trigram
+    index: the names sharing most trigrams with the query are ranked by
+    edit distance (transpositions included) to the name or to its start.
+
+Brands whose first ingredient has no rule are left out, since analyze()
+cannot check them.
+"""
+
+import re
+from collections import Counter
+from heapq import merge
+from itertools import chain
+from operator import itemgetter
+
+
+MAX_RESULTS = 50
+
+# Names sharing the most trigrams with a query that get an edit-distance check
+FUZZY_CANDIDATES = 64
+
+# Match tiers, best first
+EXACT, PREFIX, WORD, FUZZY = range(4)
+MATCH_NAMES = ("exact", "prefix", "word", "fuzzy")
+
+_SEPARATORS = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    return _SEPARATORS.sub("_", text.lower()).strip("_")
+
+
+def _compact(key):
+    return key.replace("_", "")
+
+
+def _trigrams(key):
+    padded = "$$" + key
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _max_distance(query):
+    return 1 if len(query) <= 5 else 2
+
+
+def _pattern(query):
+    masks = {}
+    for i, char in enumerate(query):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def _distances(query, key, masks):
+    """
+    (edit distance from query to key, to the closest prefix of key),
+    counting an adjacent transposition as one edit. Bit-parallel over the
+    query (Myers, with Hyyro's transposition term), one step per key char.
+    """
+
+    full = (1 << len(query)) - 1
+    high = 1 << (len(query) - 1)
+    vp, vn = full, 0
+    score = best = len(query)
+    d0 = previous = 0
+
+    for char in key:
+        eq = masks.get(char, 0)
+        transposed = (((~d0) & eq) << 1) & previous
+        d0 = ((((eq & vp) + vp) ^ vp) | eq | vn | transposed) & full
+        hp = vn | (~(d0 | vp) & full)
+        hn = vp & d0
+
+        if hp & high:
+            score += 1
+        elif hn & high:
+            score -= 1
+            if score < best:
+                best = score
+
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = hn | (~(d0 | hp) & full)
+        vn = hp & d0
+        previous = eq
+
+    return score, best
+
+
+class _Node:
+
+    __slots__ = ("children", "best")
+
+    def __init__(self):
+        self.children = {}
+        self.best = {}
+
+
+class SearchIndex:
+
+    def __init__(self, rules, brand_map):
+        # One entry per searchable name: (name, kind, ingredients, alias)
+        self.entries = []
+        self._root = _Node()
+        self._grams = {}
+        self._keys = []
+        self._exact = {}
+
+        for ingredient, rule in rules.items():
+            self._add(ingredient, "ingredient", (ingredient,), None)
+            for alias in rule.get("aliases", ()):
+                self._add(ingredient, "ingredient", (ingredient,), alias)
+
+        for brand, ingredients in brand_map.items():
+            if ingredients and ingredients[0] in rules:
+                self._add(brand, "brand", tuple(ingredients), None)
+
+        self._finish(self._root)
+        self._grams = {gram: tuple(ids) for gram, ids in self._grams.items()}
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ---------------- Building ----------------
+
+    def _add(self, name, kind, ingredients, alias):
+        key = normalize(alias or name)
+        if not key:
+            return
+
+        entry_id = len(self.entries)
+        self.entries.append((name, kind, ingredients, alias))
+        self._keys.append(key)
+
+        for form in {key, _compact(key)}:
+            self._insert(form, entry_id, (PREFIX, len(key), name))
+            self._exact.setdefault(form, []).append(entry_id)
+
+        for start in (m.end() for m in re.finditer("_", key)):
+            self._insert(key[start:], entry_id, (WORD, len(key), name))
+
+        for gram in _trigrams(key):
+            self._grams.setdefault(gram, []).append(entry_id)
+
+    def _insert(self, key, entry_id, rank):
+        node = self._root
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            found = node.best.get(entry_id)
+            if found is None or rank < found:
+                node.best[entry_id] = rank
+
+    def _finish(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            ranked = sorted(node.best.items(), key=lambda item: item[1])
+            node.best = tuple(ranked[:MAX_RESULTS])
+            stack.extend(node.children.values())
+
+    # ---------------- Lookup ----------------
+
+    def _walk(self, key):
+        node = self._root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return ()
+        return node.best
+
+    def _fuzzy(self, query):
+        limit = _max_distance(query)
+        grams = _trigrams(query)
+
+        # A name within `limit` edits shares all but 3 * limit of the
+        # query's trigrams; trigrams in most names are skipped (and
+        # subtracted from that bound) as they barely narrow things down.
+        common = len(self.entries) // 8
+        postings = [self._grams.get(gram, ()) for gram in grams]
+        kept = [found for found in postings if len(found) <= common] or postings
+        needed = max(1, len(grams) - 3 * limit - (len(postings) - len(kept)))
+
+        masks = _pattern(query)
+        found = {}
+        for entry_id, count in Counter(chain.from_iterable(kept)).most_common(FUZZY_CANDIDATES):
+            if count < needed:
+                break
+            key = self._keys[entry_id]
+            if len(key) < len(query) - limit:
+                continue
+            full, prefix = _distances(query, key, masks)
+            if prefix <= limit:
+                found[entry_id] = (FUZZY, prefix, full, len(key), self.entries[entry_id][0])
+        return found.items()
+
+    def search(self, query, limit=10):
+        """
+        Ranked matches for `query`: exact and prefix matches on the name,
+        then on a word inside it, then misspellings.
+        """
+
+        key = normalize(query)
+        if not key:
+            return []
+
+        forms = {key, _compact(key)}
+        exact = sorted(
+            ((EXACT, len(self._keys[i]), self.entries[i][0]), i)
+            for form in forms for i in self._exact.get(form, ())
+        )
+        ranked = chain(
+            ((entry_id, rank) for rank, entry_id in exact),
+            merge(*(self._walk(form) for form in forms), key=itemgetter(1))
+        )
+
+        results = []
+        seen = set()
+        self._collect(ranked, results, seen, limit)
+
+        if len(results) < limit and len(key) >= 3:
+            self._collect(sorted(self._fuzzy(key), key=itemgetter(1)), results, seen, limit)
+
+        return results
+
+    def _collect(self, ranked, results, seen, limit):
+        for entry_id, rank in ranked:
+            if len(results) == limit:
+                return
+
+            name, kind, ingredients, alias = self.entries[entry_id]
+            if name in seen:
+                continue
+            seen.add(name)
+
+            result = {
+                "name": name,
+                "kind": kind,
+                "ingredients": list(ingredients),
+                "match": MATCH_NAMES[rank[0]]
+            }
+            if alias:
+                result["alias"] = alias
+            results.append(result)
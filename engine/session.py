@@ -0,0 +1,409 @@
+"""
+Stateful patient sessions.
+
+A session keeps the patient profile (age, weight, pregnancy, alcohol,
+other_meds) and a DoseTimeline of the doses taken, so check-ins only send
+the new dose. Each dose is analyzed against the timeline (spacing and the
+rolling 24h window in O(log n)) with a per-session profile cache, so the
+interaction, contraindication, duplicate and organ-load stages only run
+again when the medicine or the profile changes. The response is a delta
+against the previous result.
+
+Stores: MemorySessionStore (default; sessions live in this process) and
+SQLiteSessionStore (shared by worker processes on one host).
+"""
+
+import json
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+
+from engine.analyzer import analyze
+from engine.rulebook import get_rulebook
+from engine.timeline import DoseEvent, DoseTimeline, events_for_dose, parse_timestamp
+
+
+PROFILE_FIELDS = ("age", "weight", "pregnant", "alcohol", "other_meds")
+
+# Profile-stage results kept per session (one per medicine checked)
+PROFILE_CACHE_SIZE = 32
+
+# Times a write is retried against a reloaded session after a concurrent change
+SAVE_ATTEMPTS = 5
+
+
+class StaleSession(Exception):
+    """
+    Raised by a store when the session was changed elsewhere since it was
+    loaded; nothing was written.
+    """
+
+
+class Session:
+
+    __slots__ = ("id", "profile", "timeline", "doses", "result", "revision", "lock", "profile_cache")
+
+    def __init__(self, session_id, profile, timeline=None, doses=0, result=None, revision=0):
+        self.id = session_id
+        self.profile = profile
+        self.timeline = timeline if timeline is not None else DoseTimeline()
+        self.doses = doses
+        self.result = result
+        self.revision = revision
+        self.lock = threading.Lock()
+        self.profile_cache = {}
+
+    def as_dict(self):
+        return {
+            "session_id": self.id,
+            "profile": self.profile,
+            "doses": self.doses,
+            "result": self.result
+        }
+
+
+def validate_profile(profile):
+    """
+    Returns an error message, or None when the profile fields are usable.
+    """
+
+    if not isinstance(profile, dict):
+        return "Profile must be a JSON object"
+
+    for field, value in profile.items():
+        if field not in PROFILE_FIELDS:
+            return f"Unknown profile field: {field}"
+
+        if value is None:
+            continue
+
+        if field in ("age", "weight"):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return f"Invalid {field} format: must be a number"
+            if field == "weight" and value <= 0:
+                return "Invalid weight value: must be positive"
+            if field == "age" and value < 0:
+                return "Invalid age value: must be zero or positive"
+
+        elif field == "other_meds":
+            if not isinstance(value, list) or not all(isinstance(m, str) for m in value):
+                return "Invalid other_meds format: must be a list of names"
+
+        elif not isinstance(value, bool):
+            return f"Invalid {field} format: must be true or false"
+
+    return None
+
+
+# ----------------------------
+# Stores
+# ----------------------------
+
+class MemorySessionStore:
+    """
+    Sessions in this process only, least recently used dropped first.
+    """
+
+    def __init__(self, max_sessions=10000):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, profile):
+        session = Session(uuid.uuid4().hex, dict(profile))
+
+        with self._lock:
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def save_profile(self, session, profile):
+        session.profile = profile
+
+    def append_dose(self, session, events, record, result):
+        for event in events:
+            session.timeline.add(event)
+        session.doses += 1
+        session.result = result
+        session.revision += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+
+class SQLiteSessionStore:
+    """
+    Sessions in a SQLite database. Loaded sessions are kept in memory and
+    reused while their revision matches the database, so a dose costs one
+    indexed read and one insert rather than reloading the history.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            profile TEXT NOT NULL,
+            result TEXT,
+            doses INTEGER NOT NULL DEFAULT 0,
+            revision INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS session_doses (
+            session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+            taken_at TEXT NOT NULL,
+            medicine TEXT NOT NULL,
+            ingredient TEXT NOT NULL,
+            dose REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS session_doses_by_session
+            ON session_doses (session_id, taken_at);
+    """
+
+    def __init__(self, path, max_cached=1000):
+        self.path = path
+        self.max_cached = max_cached
+        self._local = threading.local()
+        self._cached = OrderedDict()
+        self._lock = threading.Lock()
+
+        with self._connection() as db:
+            db.executescript(self.SCHEMA)
+
+    def _connection(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            self._local.db = db
+        return db
+
+    def _remember(self, session):
+        with self._lock:
+            self._cached[session.id] = session
+            self._cached.move_to_end(session.id)
+            while len(self._cached) > self.max_cached:
+                self._cached.popitem(last=False)
+
+    def create(self, profile):
+        session = Session(uuid.uuid4().hex, dict(profile))
+
+        with self._connection() as db:
+            db.execute(
+                "INSERT INTO sessions (id, profile) VALUES (?, ?)",
+                (session.id, json.dumps(session.profile))
+            )
+
+        self._remember(session)
+        return session
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            "SELECT profile, result, doses, revision FROM sessions WHERE id = ?",
+            (session_id,)
+        ).fetchone()
+
+        if row is None:
+            with self._lock:
+                self._cached.pop(session_id, None)
+            return None
+
+        profile, result, doses, revision = row
+
+        with self._lock:
+            session = self._cached.get(session_id)
+        if session is not None and session.revision == revision:
+            return session
+
+        # Changed by another process (or not loaded yet): rebuild from the rows
+        events = [
+            DoseEvent(parse_timestamp(taken_at), ingredient, dose)
+            for taken_at, ingredient, dose in self._connection().execute(
+                "SELECT taken_at, ingredient, dose FROM session_doses WHERE session_id = ?",
+                (session_id,)
+            )
+        ]
+
+        session = Session(
+            session_id,
+            json.loads(profile),
+            DoseTimeline(events),
+            doses,
+            json.loads(result) if result else None,
+            revision
+        )
+        self._remember(session)
+        return session
+
+    def _bump_revision(self, db, session, assignments, values):
+        # Optimistic check: raising inside the transaction rolls it back
+        cursor = db.execute(
+            f"UPDATE sessions SET {assignments}, revision = revision + 1 WHERE id = ? AND revision = ?",
+            (*values, session.id, session.revision)
+        )
+        if cursor.rowcount == 0:
+            raise StaleSession(session.id)
+
+    def save_profile(self, session, profile):
+        with self._connection() as db:
+            self._bump_revision(db, session, "profile = ?", (json.dumps(profile),))
+
+        session.profile = profile
+        session.revision += 1
+
+    def append_dose(self, session, events, record, result):
+        with self._connection() as db:
+            self._bump_revision(db, session, "result = ?, doses = doses + 1", (json.dumps(result),))
+            db.executemany(
+                "INSERT INTO session_doses (session_id, taken_at, medicine, ingredient, dose) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (session.id, event.taken_at.isoformat(), record["medicine"], event.ingredient, event.dose)
+                    for event in events
+                ]
+            )
+
+        for event in events:
+            session.timeline.add(event)
+        session.doses += 1
+        session.result = result
+        session.revision += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            self._cached.pop(session_id, None)
+
+        with self._connection() as db:
+            cursor = db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+
+def store_from_env(url):
+    """
+    "memory" (or empty) -> MemorySessionStore; "sqlite:///path/to.db" ->
+    SQLiteSessionStore.
+    """
+
+    if not url or url == "memory":
+        return MemorySessionStore()
+
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):])
+
+    raise ValueError(f"Unsupported session store: {url}")
+
+
+# ----------------------------
+# Session operations
+# ----------------------------
+
+def result_delta(previous, result):
+    """
+    Fields of `result` that differ from `previous`, with conflicts split
+    into added and removed.
+    """
+
+    previous = previous or {}
+    old_conflicts = previous.get("conflicts", [])
+    new_conflicts = result.get("conflicts", [])
+
+    return {
+        "changed": {
+            key: value for key, value in result.items()
+            if key != "conflicts" and previous.get(key) != value
+        },
+        "conflicts_added": [c for c in new_conflicts if c not in old_conflicts],
+        "conflicts_removed": [c for c in old_conflicts if c not in new_conflicts]
+    }
+
+
+def _write(store, session, write):
+    """
+    Runs write(session) under the session lock. When the store finds the
+    session changed elsewhere meanwhile, reloads it and runs write again on
+    the fresh copy, so the analysis sees the doses recorded by others.
+    """
+
+    for _ in range(SAVE_ATTEMPTS):
+        with session.lock:
+            try:
+                return write(session)
+            except StaleSession:
+                pass
+
+        session = store.get(session.id)
+        if session is None:
+            return {"error": "Unknown session id"}
+
+    return {"error": "Session changed concurrently, please retry"}
+
+
+def update_profile(store, session, changes):
+    """
+    Merges profile changes; the next dose re-runs the profile stages.
+    """
+
+    error = validate_profile(changes)
+    if error:
+        return {"error": error}
+
+    def write(session):
+        store.save_profile(session, {**session.profile, **changes})
+        session.profile_cache.clear()
+        return session.as_dict()
+
+    return _write(store, session, write)
+
+
+def add_dose(store, session, record, rulebook=None):
+    """
+    Analyzes and records one dose {"medicine", "dose", "time" (ISO 8601)}.
+    Returns the risk level, score and the delta against the last result,
+    or {"error": ...} (the dose is then not recorded).
+    """
+
+    if rulebook is None:
+        rulebook = get_rulebook()
+
+    def write(session):
+        result = analyze(
+            {
+                **session.profile,
+                "medicine": record["medicine"],
+                "dose": record["dose"],
+                "time": record["time"],
+                "dose_events": session.timeline
+            },
+            rulebook,
+            session.profile_cache
+        )
+
+        if "error" in result:
+            return result
+
+        if len(session.profile_cache) > PROFILE_CACHE_SIZE:
+            session.profile_cache.clear()
+
+        events = events_for_dose(parse_timestamp(record["time"]), record["medicine"], record["dose"], rulebook)
+
+        delta = result_delta(session.result, result)
+        store.append_dose(session, events, record, result)
+
+        return {
+            "session_id": session.id,
+            "doses": session.doses,
+            "risk_level": result["risk_level"],
+            "score": result["score"],
+            "delta": delta
+        }
+
+    return _write(store, session, write)
@@ -1,8 +1,11 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
 def check_spacing(previous_time_str, current_time_str, min_spacing_hours):
     """
     Returns True if spacing violation exists.
+
+    A current time earlier than the previous one is on the next day
+    (23:00 -> 01:00 is a 2 hour gap).
     """
 
     time_format = "%H:%M"
@@ -10,6 +13,6 @@ def check_spacing(previous_time_str, current_time_str, min_spacing_hours):
     previous_time = datetime.strptime(previous_time_str, time_format)
     current_time = datetime.strptime(current_time_str, time_format)
 
-    hours_diff = abs((current_time - previous_time).total_seconds()) / 3600
+    hours_diff = ((current_time - previous_time) % timedelta(days=1)).total_seconds() / 3600
 
     return hours_diff < min_spacing_hours
@@ -0,0 +1,175 @@
+"""
+Streaming NDJSON analysis.
+
+Reads one analyze() input per line from a file or stdin and writes one
+result per line, holding at most one chunk of records in memory:
+
+    python -m engine.stream doses.ndjson -o results.ndjson
+    cat doses.ndjson | python -m engine.stream > results.ndjson
+
+Each output line is {"line": <input line number>, "result": {...}}.
+Progress and throughput counters are written to stderr as NDJSON.
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+from collections import deque
+
+from engine.analyzer import analyze_many
+from engine.parallel import ParallelAnalyzer, _chunked, default_workers
+from engine.rulebook import get_rulebook
+
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+# ----------------------------
+# Counters
+# ----------------------------
+
+class StreamStats:
+    __slots__ = ("records", "errors", "started")
+
+    def __init__(self):
+        self.records = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "records": self.records,
+            "errors": self.errors,
+            "elapsed_s": round(elapsed, 3),
+            "records_per_s": round(self.records / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
+
+# ----------------------------
+# Generator API
+# ----------------------------
+
+def read_ndjson(lines):
+    """
+    Yields (line_number, record) for each non-blank line. Lines that are not
+    valid JSON yield (line_number, None).
+    """
+
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def analyze_stream(records, rulebook=None, chunk_size=DEFAULT_CHUNK_SIZE, stats=None, workers=None):
+    """
+    Lazily analyzes (line_number, record) pairs chunk by chunk and yields
+    (line_number, result) pairs in input order. With workers > 1 chunks are
+    analyzed on a process pool, a bounded number at a time.
+    """
+
+    chunks = _chunked(records, chunk_size)
+
+    if workers and workers > 1:
+        # imap_chunks reads ahead by up to 2 * workers chunks; keep the
+        # original (line_number, record) chunks queued alongside in order
+        pending = deque()
+
+        def submitted():
+            for chunk in chunks:
+                pending.append(chunk)
+                yield [record for _, record in chunk if record is not None]
+
+        with ParallelAnalyzer(workers, chunk_size, rulebook) as pool:
+            for results in pool.imap_chunks(submitted()):
+                yield from _merge(pending.popleft(), results, stats)
+        return
+
+    if rulebook is None:
+        rulebook = get_rulebook()
+
+    for chunk in chunks:
+        valid = [record for _, record in chunk if record is not None]
+        yield from _merge(chunk, analyze_many(valid, rulebook), stats)
+
+
+def _merge(chunk, results, stats):
+    results = iter(results)
+
+    for line_number, record in chunk:
+        if record is None:
+            result = {"error": "Invalid JSON"}
+        else:
+            result = next(results)
+
+        if stats is not None:
+            stats.records += 1
+            if "error" in result:
+                stats.errors += 1
+
+        yield line_number, result
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+
+def _open_input(path):
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin)
+    return open(path)
+
+
+def _open_output(path):
+    if path == "-":
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, "w")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m engine.stream",
+        description="Analyze NDJSON medication records as a stream."
+    )
+    parser.add_argument("input", nargs="?", default="-", help="NDJSON file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output file, or - for stdout")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="analyze on a process pool of this many workers (0 = one per core)"
+    )
+    parser.add_argument(
+        "--progress-every", type=int, default=10000,
+        help="report counters to stderr every N records (0 disables)"
+    )
+    args = parser.parse_args(argv)
+
+    stats = StreamStats()
+
+    with _open_input(args.input) as src, _open_output(args.output) as dst:
+        for line_number, result in analyze_stream(
+            read_ndjson(src),
+            chunk_size=args.chunk_size,
+            stats=stats,
+            workers=args.workers if args.workers > 0 else default_workers()
+        ):
+            dst.write(json.dumps({"line": line_number, "result": result}))
+            dst.write("\n")
+
+            if args.progress_every and stats.records % args.progress_every == 0:
+                sys.stderr.write(json.dumps({"progress": stats.as_dict()}) + "\n")
+
+    sys.stderr.write(json.dumps({"summary": stats.as_dict()}) + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
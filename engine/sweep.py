@@ -0,0 +1,208 @@
+"""
+Vectorized what-if sweep.
+
+Evaluates one scenario (medicine, other_meds, alcohol, age, previous
+dose...) over a whole grid of weights x times x doses in a single NumPy
+pass instead of one analyze() call per cell.
+
+The score splits into a part that does not depend on the grid axes (one
+reference analyze() call per weight kind) and the components that do:
+spacing (+30), overdose (+50), the mg/kg conflicts of clinical.json (+40/+100)
+and the infant block (+100). Risk levels then follow analyze()'s
+deterministic logic cell by cell.
+
+As in engine.next_dose, dose_history lists the doses taken before the
+swept dose.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from engine.analyzer import analyze, analyze_result
+from engine.clinical import WEIGHT_CAUTION_SEVERITY, WEIGHT_BLOCK_SEVERITY
+from engine.spacing import check_spacing
+from engine.rulebook import get_rulebook
+
+
+RISK_LEVELS = ("SAFE", "CAUTION", "HIGH RISK")
+SAFE, CAUTION, HIGH_RISK = range(3)
+
+# Weight standing in for "no weight-based conflicts" in the reference call
+_REFERENCE_WEIGHT = 1e9
+
+# Tiny dose for the reference call: no overdose, near-limit or mg/kg terms
+_REFERENCE_DOSE = 1e-9
+
+
+def time_grid(step_minutes=15, start="00:00", hours=24):
+    """
+    HH:MM times every step_minutes, e.g. 96 quarter hours over a day.
+    """
+
+    first = datetime.strptime(start, "%H:%M")
+    steps = int(hours * 60 // step_minutes)
+    return [
+        (first + timedelta(minutes=step_minutes * i)).strftime("%H:%M")
+        for i in range(steps)
+    ]
+
+
+def _reference(input_data, weight, rulebook):
+    """
+    analyze_result() with every grid-dependent term switched off.
+    """
+
+    data = {
+        key: value for key, value in input_data.items()
+        if key not in ("dose", "dose_history", "time", "previous_time", "weight")
+    }
+    data["dose"] = _REFERENCE_DOSE
+    data["dose_history"] = [_REFERENCE_DOSE]
+    data["time"] = "00:00"
+    if weight is not None:
+        data["weight"] = _REFERENCE_WEIGHT
+
+    return analyze_result(data, rulebook)
+
+
+def sweep(input_data, doses, times=None, weights=None, rulebook=None):
+    """
+    Returns {"weights", "times", "doses", "score", "risk"} where score and
+    risk are arrays of shape (len(weights), len(times), len(doses)); risk
+    holds indexes into RISK_LEVELS. Invalid input returns {"error": ...}
+    exactly as analyze() would.
+    """
+
+    if rulebook is None:
+        rulebook = get_rulebook()
+
+    times = list(times) if times is not None else time_grid()
+    weights = list(weights) if weights is not None else [input_data.get("weight")]
+    doses = list(doses)
+
+    history = input_data.get("dose_history", [])
+    if not isinstance(history, list):
+        return {"error": "Invalid dose_history format"}
+
+    for time in times:
+        try:
+            datetime.strptime(time, "%H:%M")
+        except (TypeError, ValueError):
+            return {"error": "Invalid time format. Use HH:MM"}
+
+    for dose in doses:
+        if not isinstance(dose, (int, float)) or dose <= 0:
+            return {"error": "Invalid dose value"}
+
+    # Everything else is validated by analyze() itself, once per weight
+    for weight in set(weights):
+        checked = analyze({
+            **input_data,
+            "dose": 1,
+            "dose_history": history + [1],
+            "time": times[0] if times else "00:00",
+            "weight": weight
+        }, rulebook)
+        if "error" in checked:
+            return checked
+
+    primary = rulebook.expand(input_data["medicine"].lower())[0]
+    rule = rulebook.rules[primary]
+    max_daily = rule["max_daily_dose"]
+
+    # ---------------- Per-axis components ----------------
+
+    previous_time = input_data.get("previous_time")
+    spacing = np.array([
+        bool(previous_time) and check_spacing(previous_time, time, rule["min_spacing_hours"])
+        for time in times
+    ])[None, :, None]
+
+    dose = np.array(doses, dtype=float)[None, None, :]
+    total = sum(history) + dose
+
+    overdose = (
+        (dose > rule["single_dose_limit"])
+        | any(d > rule["single_dose_limit"] for d in history)
+        | (total > max_daily)
+    )
+    factor = rulebook.clinical.near_limit_factor(primary)
+    near_limit = (total >= factor * max_daily) & ~overdose
+
+    # Reference score and absolute block for each weight kind (given / not given)
+    base_score = np.zeros((len(weights), 1, 1))
+    base_high = np.zeros((len(weights), 1, 1), dtype=bool)
+    infant = np.zeros((len(weights), 1, 1), dtype=bool)
+    weight_values = np.full((len(weights), 1, 1), np.nan)
+
+    references = {}
+    for i, weight in enumerate(weights):
+        kind = weight is not None
+        if kind not in references:
+            references[kind] = _reference(input_data, weight, rulebook)
+        base_score[i] = references[kind].score
+        # Only a critical conflict is final; a high score alone can still
+        # be lowered to CAUTION by the near-limit rule, as in analyze()
+        base_high[i] = references[kind].absolute_block
+        if weight is not None:
+            weight_values[i] = float(weight)
+            infant[i] = float(weight) < 5
+
+    # ---------------- Weight-based dosing (mg/kg) ----------------
+
+    conflict_score = np.zeros((len(weights), 1, len(doses)))
+    block = base_high | infant
+
+    tables = rulebook.clinical.mg_per_kg.get(primary, {})
+    with np.errstate(invalid="ignore"):
+        for basis, amount in (("single_mg_per_kg", dose), ("daily_mg_per_kg", total)):
+            limits = tables.get(basis)
+            if limits is None:
+                continue
+            per_kg = amount / weight_values
+            over_hard = per_kg > limits.block
+            over_caution = (per_kg > limits.caution) & ~over_hard
+            conflict_score = (
+                conflict_score
+                + 10 * WEIGHT_BLOCK_SEVERITY * over_hard
+                + 10 * WEIGHT_CAUTION_SEVERITY * over_caution
+            )
+            block = block | over_hard
+
+    # ---------------- Score & risk ----------------
+
+    score = np.minimum(
+        base_score + 30 * spacing + 50 * overdose + 100 * infant + conflict_score,
+        100
+    ).astype(np.int16)
+
+    risk = np.where(score <= 25, SAFE, np.where(score <= 60, CAUTION, HIGH_RISK))
+    risk = np.where(near_limit, CAUTION, risk)
+    risk = np.where(block | overdose, HIGH_RISK, risk).astype(np.uint8)
+
+    return {
+        "weights": weights,
+        "times": times,
+        "doses": doses,
+        "score": score,
+        "risk": risk
+    }
+
+
+def sweep_payload(result):
+    """
+    JSON-ready form of a sweep() result.
+    """
+
+    if "error" in result:
+        return result
+
+    return {
+        "weights": result["weights"],
+        "times": result["times"],
+        "doses": result["doses"],
+        "levels": list(RISK_LEVELS),
+        "score": result["score"].tolist(),
+        "risk": result["risk"].tolist()
+    }
@@ -0,0 +1,188 @@
+"""
+Timestamped dose timelines.
+
+A DoseEvent is one dose of one ingredient at a full timestamp. A
+DoseTimeline keeps, per ingredient, the event times in order with running
+totals, so the questions analyze() asks for a new dose — when was the
+last dose, and what was taken in the rolling 24h window — take two
+bisections instead of a scan over the whole history.
+
+analyze() uses this when the input carries "dose_events" (see
+dose_window); plain HH:MM inputs keep the same-day behaviour. Sessions
+(engine.session) keep a DoseTimeline per patient and pass it directly.
+"""
+
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+
+
+WINDOW = timedelta(hours=24)
+
+
+def parse_timestamp(value):
+    """
+    ISO 8601 timestamp -> naive UTC datetime (naive input is taken as UTC).
+    """
+
+    if not isinstance(value, str):
+        raise ValueError(value)
+
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+class DoseEvent:
+
+    __slots__ = ("taken_at", "ingredient", "dose")
+
+    def __init__(self, taken_at, ingredient, dose):
+        self.taken_at = taken_at
+        self.ingredient = ingredient
+        self.dose = dose
+
+    def __lt__(self, other):
+        return self.taken_at < other.taken_at
+
+    def __repr__(self):
+        return f"DoseEvent({self.taken_at.isoformat()}, {self.ingredient!r}, {self.dose})"
+
+
+class DoseTimeline:
+    """
+    Per-ingredient event times and prefix sums of their doses.
+
+    Appending in time order is O(1); an event older than the latest one for
+    its ingredient is inserted and the running totals after it rebuilt.
+    Window queries are O(log n).
+    """
+
+    def __init__(self, events=(), window=WINDOW):
+        self.window = window
+        self._times = {}
+        self._doses = {}
+        self._prefix = {}
+
+        for event in sorted(events):
+            self.add(event)
+
+    def __len__(self):
+        return sum(len(times) for times in self._times.values())
+
+    def add(self, event):
+        times = self._times.setdefault(event.ingredient, [])
+        doses = self._doses.setdefault(event.ingredient, [])
+        prefix = self._prefix.setdefault(event.ingredient, [0])
+
+        if not times or event.taken_at >= times[-1]:
+            times.append(event.taken_at)
+            doses.append(event.dose)
+            prefix.append(prefix[-1] + event.dose)
+            return
+
+        index = bisect_right(times, event.taken_at)
+        times.insert(index, event.taken_at)
+        doses.insert(index, event.dose)
+        del prefix[index + 1:]
+        for dose in doses[index:]:
+            prefix.append(prefix[-1] + dose)
+
+    def _bounds(self, ingredient, at):
+        times = self._times.get(ingredient, ())
+        return bisect_right(times, at - self.window), bisect_right(times, at)
+
+    def last_before(self, ingredient, at):
+        """
+        Time of the latest dose at or before `at`, or None.
+        """
+
+        _, end = self._bounds(ingredient, at)
+        return self._times[ingredient][end - 1] if end else None
+
+    def window_total(self, ingredient, at):
+        """
+        Total taken in the window ending at `at` (start exclusive).
+        """
+
+        start, end = self._bounds(ingredient, at)
+        if end == 0:
+            return 0
+        prefix = self._prefix[ingredient]
+        return prefix[end] - prefix[start]
+
+    def window_doses(self, ingredient, at):
+        """
+        Doses taken in the window ending at `at`, oldest first.
+        """
+
+        start, end = self._bounds(ingredient, at)
+        return self._doses.get(ingredient, [])[start:end]
+
+
+# ----------------------------
+# analyze() integration
+# ----------------------------
+
+def events_for_dose(taken_at, medicine, dose, rulebook):
+    """
+    One DoseEvent per ingredient of `medicine` (a brand, alias or
+    ingredient), each with the full dose: analyze() counts the entered dose
+    against the ingredient it checks the same way, as brand_map.json has no
+    per-ingredient strengths.
+    """
+
+    return [
+        DoseEvent(taken_at, ingredient, dose)
+        for ingredient in dict.fromkeys(rulebook.expand(medicine.lower()))
+    ]
+
+
+def events_from_input(dose_events, rulebook):
+    """
+    [{"medicine", "dose", "time"}, ...] -> DoseEvents for every ingredient
+    of each medicine (see events_for_dose).
+    """
+
+    if not isinstance(dose_events, list):
+        raise ValueError("Invalid dose_events format")
+
+    events = []
+    for item in dose_events:
+        try:
+            dose = item["dose"]
+            if not isinstance(dose, (int, float)) or dose <= 0:
+                raise ValueError
+            events.extend(events_for_dose(parse_timestamp(item["time"]), item["medicine"], dose, rulebook))
+        except (KeyError, TypeError, AttributeError, ValueError):
+            raise ValueError("Invalid dose_events format")
+
+    return events
+
+
+def dose_window(primary, dose, time, dose_events, rulebook):
+    """
+    Resolves a timestamped request for analyze(). dose_events is the
+    request's event list, or a DoseTimeline kept by the caller. Returns
+    (dose_history, gap_hours, current, previous) where dose_history holds
+    the doses of `primary` in the 24h window ending at `time` plus the
+    current dose, gap_hours is the time since the last one (None if there
+    is none) and current/previous are the datetimes.
+    """
+
+    try:
+        current = parse_timestamp(time)
+    except ValueError:
+        raise ValueError("Invalid time format. Use an ISO 8601 timestamp with dose_events")
+
+    if isinstance(dose_events, DoseTimeline):
+        timeline = dose_events
+    else:
+        timeline = DoseTimeline(events_from_input(dose_events, rulebook))
+
+    previous = timeline.last_before(primary, current)
+    gap_hours = None
+    if previous is not None:
+        gap_hours = (current - previous).total_seconds() / 3600
+
+    return timeline.window_doses(primary, current) + [dose], gap_hours, current, previous
@@ -18,3 +18,116 @@ export async function analyzeMedicine(data) {
 
   return await response.json();
 }
+
+export async function searchMedicines(query, limit = 8) {
+  const params = new URLSearchParams({ q: query, limit: String(limit) });
+  const response = await fetch(`${BASE_URL}/search?${params}`);
+
+  if (!response.ok) {
+    return [];
+  }
+
+  const data = await response.json();
+  return data.results;
+}
+
+// ----------------------------
+// Rule snapshot (GET /rules)
+// ----------------------------
+
+let rulesRequest = null;
+
+// Fetched once per page load. The response carries an ETag and a long
+// Cache-Control, so the browser's HTTP cache revalidates it for us.
+export function loadRules() {
+  if (!rulesRequest) {
+    rulesRequest = fetch(`${BASE_URL}/rules`)
+      .then((response) => (response.ok ? response.json() : null))
+      .catch(() => null)
+      .then((rules) => {
+        if (!rules) rulesRequest = null;
+        return rules;
+      });
+  }
+  return rulesRequest;
+}
+
+function normalizeName(text) {
+  return text.toLowerCase().replace(/[^a-z0-9]+/g, "_").replace(/^_+|_+$/g, "");
+}
+
+// Brands and aliases resolve as RuleBook.expand() does on the server
+function primaryIngredient(medicine, rules) {
+  const name = medicine.toLowerCase();
+  if (Object.hasOwn(rules.brands, name)) return rules.brands[name][0];
+  return Object.hasOwn(rules.aliases, name) ? rules.aliases[name] : name;
+}
+
+// {max_daily_dose, single_dose_limit, min_spacing_hours} for a medicine, or null
+export function medicineLimits(medicine, rules) {
+  if (!rules || !medicine) return null;
+
+  const values = rules.ingredients[primaryIngredient(medicine.trim(), rules)];
+  if (!values) return null;
+
+  return Object.fromEntries(rules.limits.map((field, i) => [field, values[i]]));
+}
+
+// Prefix matches in the same shape as /search results
+export function suggestMedicines(query, rules, limit = 8) {
+  const key = normalizeName(query);
+  if (!rules || !key) return [];
+
+  const results = [];
+  const seen = new Set();
+  const add = (name, ingredients) => {
+    if (results.length < limit && !seen.has(name)) {
+      seen.add(name);
+      results.push({ name, ingredients });
+    }
+  };
+
+  for (const name of Object.keys(rules.ingredients)) {
+    if (normalizeName(name).startsWith(key)) add(name, [name]);
+  }
+  for (const [alias, name] of Object.entries(rules.aliases)) {
+    if (normalizeName(alias).startsWith(key)) add(name, [name]);
+  }
+  for (const [brand, ingredients] of Object.entries(rules.brands)) {
+    if (normalizeName(brand).startsWith(key)) add(brand, ingredients);
+  }
+
+  return results;
+}
+
+const TIME_PATTERN = /^(\d{1,2}):(\d{1,2})$/;
+
+function isTime(value) {
+  const match = TIME_PATTERN.exec(value || "");
+  return Boolean(match) && Number(match[1]) < 24 && Number(match[2]) < 60;
+}
+
+// The server's input validation, in its order and with its messages, so
+// requests it would reject never leave the browser. Returns the error
+// message, or null when the request should be sent.
+export function precheckAnalysis(data, rules) {
+  if (data.weight != null && !(data.weight > 0)) {
+    return "Invalid weight value: must be positive";
+  }
+  if (data.age != null && !(data.age >= 0)) {
+    return "Invalid age value: must be zero or positive";
+  }
+  if (!Number.isFinite(data.dose) || data.dose <= 0) {
+    return "Invalid dose value";
+  }
+  if (!isTime(data.time)) {
+    return "Invalid time format. Use HH:MM";
+  }
+  if (data.previous_time && !isTime(data.previous_time)) {
+    return "Invalid previous_time format. Use HH:MM";
+  }
+  if (rules && !Object.hasOwn(rules.ingredients, primaryIngredient(data.medicine, rules))) {
+    return "Medicine not found in rules";
+  }
+  return null;
+}
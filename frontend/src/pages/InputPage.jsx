@@ -1,6 +1,6 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
-import { analyzeMedicine } from "../api/api";
+import { analyzeMedicine, loadRules, medicineLimits, precheckAnalysis, searchMedicines, suggestMedicines } from "../api/api";
 import { AlertCircle, Pill, ShieldCheck, Clock, Activity, Heart, Wine } from "lucide-react";
 import logo from "../assets/logo.jpg";
 
@@ -43,6 +43,44 @@ function InputPage({ setResult }) {
     weight: ""
   });
 
+  const [suggestions, setSuggestions] = useState([]);
+  const [rules, setRules] = useState(null);
+
+  useEffect(() => {
+    loadRules().then(setRules);
+  }, []);
+
+  useEffect(() => {
+    const query = formData.medicine.trim();
+    if (!query) {
+      setSuggestions([]);
+      return;
+    }
+
+    // Known names complete locally; only misspellings need the server's fuzzy search
+    const local = suggestMedicines(query, rules);
+    if (local.length) {
+      setSuggestions(local);
+      return;
+    }
+
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      searchMedicines(query)
+        .then((results) => {
+          if (!cancelled) setSuggestions(results);
+        })
+        .catch(() => {});
+    }, 150);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [formData.medicine, rules]);
+
+  const limits = medicineLimits(formData.medicine, rules);
+
   const handleChange = (e) => {
     const { name, value, type, checked } = e.target;
     setFormData({
@@ -70,6 +108,11 @@ function InputPage({ setResult }) {
           : []
       };
 
+      const invalid = precheckAnalysis(formatted, rules);
+      if (invalid) {
+        throw new Error(invalid);
+      }
+
       const result = await analyzeMedicine(formatted);
       setResult(result);
       navigate("/dashboard");
@@ -104,11 +147,21 @@ function InputPage({ setResult }) {
             <div style={{ display: "grid", gridTemplateColumns: "1fr 1fr", gap: "16px" }}>
               <div>
                 <label style={labelStyle}><Pill size={14} /> Medicine</label>
-                <input name="medicine" value={formData.medicine} placeholder="e.g. Paracetamol" onChange={handleChange} required />
+                <input name="medicine" list="medicine-suggestions" autoComplete="off" value={formData.medicine} placeholder="e.g. Paracetamol" onChange={handleChange} required />
+                <datalist id="medicine-suggestions">
+                  {suggestions.map((match) => (
+                    <option key={match.name} value={match.name} label={match.ingredients.join(" + ")} />
+                  ))}
+                </datalist>
               </div>
               <div>
                 <label style={labelStyle}>Dose (mg)</label>
                 <input name="dose" type="number" value={formData.dose} placeholder="e.g. 500" onChange={handleChange} required />
+                {limits && (
+                  <p style={{ marginTop: "6px", fontSize: "12px", color: "var(--text-muted)" }}>
+                    Max {limits.single_dose_limit} mg per dose, {limits.max_daily_dose} mg per day
+                  </p>
+                )}
               </div>
             </div>
 
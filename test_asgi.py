@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+from api.asgi import app as asgi_app
+
+
+def _asgi_request(method, path, payload=None, query=b""):
+    body = b"" if payload is None else json.dumps(payload).encode()
+    headers = [(b"content-type", b"application/json")] if payload is not None else []
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": method, "path": path,
+        "query_string": query, "headers": headers
+    }
+    asyncio.run(asgi_app(scope, receive, send))
+
+    status = sent[0]["status"]
+    return status, b"".join(m.get("body", b"") for m in sent[1:])
+
+
+CASES = [
+    ("GET", "/health", None),
+    ("POST", "/analyze", {"medicine": "paracetamol", "dose": 500, "time": "14:00"}),
+    ("POST", "/analyze", {"medicine": "crocin", "dose": 500, "other_meds": ["dolo_650"], "time": "14:00"}),
+    ("POST", "/analyze", {"medicine": "randompill", "dose": 100, "time": "10:00"}),
+    ("POST", "/analyze", {"medicine": "paracetamol"}),
+    ("POST", "/analyze/batch", {"items": [{"medicine": "aspirin", "dose": 500, "time": "10:00", "age": 5}, 7]}),
+    ("POST", "/analyze/batch", {"items": "nope"}),
+    ("POST", "/next-dose", {"medicine": "paracetamol", "time": "10:00", "previous_time": "08:00", "dose_history": [1000]}),
+    ("POST", "/next-dose", {"medicine": "paracetamol"}),
+    ("POST", "/sweep", {"medicine": "paracetamol", "previous_time": "08:00", "doses": [500, 1000], "weights": [None, 20], "step_minutes": 240}),
+    ("POST", "/sweep", {"medicine": "paracetamol"}),
+    ("GET", "/explanations/unknown", None),
+    ("GET", "/rules", None),
+]
+
+
+@pytest.mark.parametrize("method,path,payload", CASES)
+def test_asgi_matches_flask_byte_for_byte(method, path, payload):
+    pytest.importorskip("flask")
+    from api.app import app as flask_app
+
+    client = flask_app.test_client()
+    expected = client.open(path, method=method, json=payload)
+
+    assert _asgi_request(method, path, payload) == (expected.status_code, expected.data)
+
+
+@pytest.mark.parametrize("query", [b"q=dolo", b"q=paracetmol&limit=3", b"q=", b"q=para&limit=99"])
+def test_asgi_search_matches_flask(query):
+    pytest.importorskip("flask")
+    from api.app import app as flask_app
+
+    expected = flask_app.test_client().get("/search?" + query.decode())
+
+    assert _asgi_request("GET", "/search", query=query) == (expected.status_code, expected.data)
+
+
+def test_asgi_rejects_non_json_body():
+    status, body = _asgi_request("POST", "/analyze")
+
+    assert status == 400
+    assert json.loads(body) == {"error": "Request must be JSON"}
+
+
+def test_asgi_session_flow():
+    status, body = _asgi_request("POST", "/sessions", {"age": 40})
+    assert status == 201
+    session_id = json.loads(body)["session_id"]
+
+    dose = {"medicine": "ibuprofen", "dose": 400, "time": "2026-03-01T09:00"}
+    status, body = _asgi_request("POST", f"/sessions/{session_id}/doses", dose)
+    assert status == 200
+    assert json.loads(body)["risk_level"] == "SAFE"
+
+    assert _asgi_request("DELETE", f"/sessions/{session_id}")[0] == 200
+    assert _asgi_request("GET", f"/sessions/{session_id}")[0] == 404
@@ -0,0 +1,71 @@
+import json
+import os
+import shutil
+
+from engine.analyzer import analyze
+from engine.bundle import BUNDLE_FILE
+from engine.compile_rules import main as compile_main
+from engine.rulebook import ENGINE_DIR, load_rulebook
+from test_engine import tests as ENGINE_CASES
+
+
+SOURCES = ("rules.json", "interactions.json", "brand_map.json")
+
+
+def _rule_dir(tmp_path):
+    for name in SOURCES:
+        shutil.copy(os.path.join(ENGINE_DIR, name), tmp_path / name)
+    return str(tmp_path)
+
+
+def _run(case, rulebook):
+    try:
+        return analyze(case, rulebook)
+    except Exception as e:
+        return type(e).__name__
+
+
+def test_bundle_matches_json_rules(tmp_path):
+    directory = _rule_dir(tmp_path)
+    assert compile_main(["--dir", directory]) == 0
+
+    from_json = load_rulebook(directory, bundle=False)
+    from_bundle = load_rulebook(directory)
+
+    # Loaded from the memory-mapped tables, not rebuilt
+    assert isinstance(from_bundle.conflict_matrix.cells, memoryview)
+    assert from_bundle.version == from_json.version
+    assert from_bundle.to_data() == from_json.to_data()
+
+    for case in ENGINE_CASES:
+        assert _run(case, from_bundle) == _run(case, from_json), case
+
+
+def test_stale_bundle_falls_back_to_json(tmp_path):
+    directory = _rule_dir(tmp_path)
+    compile_main(["--dir", directory])
+
+    rules = json.loads((tmp_path / "rules.json").read_text())
+    rules["paracetamol"]["max_daily_dose"] = 3000
+    (tmp_path / "rules.json").write_text(json.dumps(rules))
+
+    rulebook = load_rulebook(directory)
+
+    assert rulebook.rules["paracetamol"]["max_daily_dose"] == 3000
+    assert rulebook.version == load_rulebook(directory, bundle=False).version
+
+
+def test_invalid_rules_are_not_compiled(tmp_path):
+    directory = _rule_dir(tmp_path)
+    rules = json.loads((tmp_path / "rules.json").read_text())
+    del rules["ibuprofen"]["single_dose_limit"]
+    (tmp_path / "rules.json").write_text(json.dumps(rules))
+
+    assert compile_main(["--dir", directory]) == 1
+    assert not (tmp_path / BUNDLE_FILE).exists()
+
+
+def test_results_carry_rule_version():
+    result = analyze({"medicine": "paracetamol", "dose": 500, "time": "10:00"})
+
+    assert result["rule_version"] == load_rulebook(bundle=False).version
@@ -0,0 +1,84 @@
+from api import handlers
+from engine.analyzer import analyze
+from engine.cache import ResultCache, cache_key, canonicalize, cached_analyze
+from engine.rulebook import RuleBook, get_rulebook
+
+
+CASE = {"medicine": "Crocin", "dose": 500, "other_meds": ["ibuprofen", "Cetirizine"], "time": "9:05"}
+
+
+def _key(case):
+    return cache_key(canonicalize(case))
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_equivalent_inputs_share_a_key():
+    reordered = {"time": "09:05", "other_meds": ["cetirizine", "IBUPROFEN"], "dose": 500, "medicine": "crocin"}
+    assert _key(reordered) == _key(CASE)
+
+    # Brands keep their own key: hidden-duplicate detection scores them apart
+    assert _key({**CASE, "medicine": "paracetamol"}) != _key(CASE)
+    assert _key({**CASE, "dose": 500.0}) != _key(CASE)
+
+    # Too malformed to canonicalize: bypasses the cache
+    assert canonicalize({"dose": 500}) is None
+
+
+def test_least_recently_used_entry_is_evicted_at_capacity():
+    cache = ResultCache(maxsize=2)
+    cache.put("a", 1, {"n": 1})
+    cache.put("b", 1, {"n": 2})
+    assert cache.get("a", 1) == {"n": 1}
+
+    cache.put("c", 1, {"n": 3})
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == {"n": 1} and cache.get("c", 1) == {"n": 3}
+    assert len(cache) == 2 and cache.evictions == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResultCache(ttl=10, clock=clock)
+    cache.put("a", 1, {"n": 1})
+
+    clock.now = 9.9
+    assert cache.get("a", 1) == {"n": 1}
+    clock.now = 10.0
+    assert cache.get("a", 1) is None
+    assert len(cache) == 0 and cache.evictions == 1
+
+
+def test_rule_version_change_invalidates_entries():
+    rulebook = get_rulebook()
+    cache = ResultCache()
+
+    assert cached_analyze(CASE, cache) == analyze(CASE)
+    assert cached_analyze(CASE, cache) == analyze(CASE)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    newer = RuleBook(*rulebook.to_data(), version="next")
+    cached_analyze(CASE, cache, newer)
+
+    assert cache.invalidations == 1 and cache.misses == 2
+    assert cache.version == "next" and len(cache) == 1
+
+
+def test_metrics_expose_cache_counters(monkeypatch):
+    monkeypatch.setattr(handlers, "result_cache", ResultCache(maxsize=8))
+
+    handlers.run_analysis(CASE)
+    handlers.run_analysis(dict(reversed(list(CASE.items()))))
+    text = handlers.metrics_text()
+
+    assert "analyze_cache_hits_total 1\n" in text
+    assert "analyze_cache_misses_total 1\n" in text
+    assert "analyze_cache_size 1\n" in text
@@ -0,0 +1,107 @@
+import json
+import pickle
+import shutil
+
+import pytest
+
+from engine.analyzer import INFANT_CONFLICT, analyze
+from engine.compile_rules import main as compile_main, validate_clinical
+from engine.next_dose import next_safe_dose
+from engine.rulebook import ENGINE_DIR, RuleBook, get_rulebook, load_rulebook
+
+
+def _rulebook(change):
+    shared = get_rulebook()
+    clinical = shared.clinical.to_data()
+    change(clinical)
+    return RuleBook(*shared.to_data(), clinical=clinical)
+
+
+def _risks(result):
+    return [c["risk"] for c in result["conflicts"]]
+
+
+def test_clinical_rules_drive_analysis():
+    stacked = {"medicine": "ibuprofen", "dose": 200, "time": "10:00", "other_meds": ["aspirin"]}
+    assert analyze(stacked)["nsaid_stacking"]
+
+    rulebook = _rulebook(lambda c: c["classes"]["nsaid"].remove("aspirin"))
+    assert not analyze(stacked, rulebook)["nsaid_stacking"]
+    assert "NSAID stacking" not in _risks(analyze(stacked, rulebook))
+
+    child = {"medicine": "paracetamol", "dose": 250, "time": "10:00", "weight": 20, "dose_history": [250]}
+    assert analyze(child)["risk_level"] == "SAFE"
+
+    def stricter(clinical):
+        clinical["ingredients"]["paracetamol"]["single_mg_per_kg"] = {"caution": 10, "block": 12}
+
+    rulebook = _rulebook(stricter)
+    assert rulebook.version != get_rulebook().version
+    result = analyze(child, rulebook)
+    assert result["risk_level"] == "HIGH RISK"
+    assert "Paracetamol dose too high for weight (12.5mg/kg > 12mg/kg)" in _risks(result)
+
+    # The closed-form solver reads the same tables
+    answer = next_safe_dose({k: v for k, v in child.items() if k != "dose"}, rulebook)
+    assert answer["max_dose"] == 200
+
+    def ibuprofen_with_alcohol(clinical):
+        clinical["escalations"].append({
+            "primary": "ibuprofen", "alcohol": True, "risk": "Alcohol with ibuprofen", "severity": 6
+        })
+
+    drinker = {"medicine": "ibuprofen", "dose": 200, "time": "10:00", "alcohol": True}
+    assert "Alcohol with ibuprofen" in _risks(analyze(drinker, _rulebook(ibuprofen_with_alcohol)))
+
+
+def test_validate_clinical():
+    shared = get_rulebook()
+    assert validate_clinical(shared.clinical.to_data(), shared.rules) == ([], [])
+
+    clinical = shared.clinical.to_data()
+    clinical["ingredients"]["paracetamol"]["daily_mg_per_kg"] = {"caution": 80, "block": 75}
+    clinical["classes"]["opioid"] = ["tramadol"]
+    clinical["escalations"] += [
+        {"load": "heart_load", "at_least": 2, "risk": "x", "severity": 1},
+        {"class": "statin", "at_least": 2, "risk": "x", "severity": 1},
+        {"load": "liver_load", "primary": "paracetamol", "risk": "x", "severity": 1}
+    ]
+
+    errors, warnings = validate_clinical(clinical, shared.rules)
+    assert len(errors) == 4
+    assert warnings == ["clinical.json: class opioid: tramadol has no entry in rules.json"]
+
+
+def test_clinical_rules_in_bundle_and_pickle(tmp_path):
+    for name in ("rules.json", "interactions.json", "brand_map.json"):
+        shutil.copy(f"{ENGINE_DIR}/{name}", tmp_path / name)
+
+    # A directory without clinical.json uses the engine's
+    assert load_rulebook(str(tmp_path)).version == get_rulebook().version
+
+    clinical = get_rulebook().clinical.to_data()
+    clinical["near_limit_factor"] = 0.5
+    (tmp_path / "clinical.json").write_text(json.dumps(clinical))
+    assert compile_main(["--dir", str(tmp_path)]) == 0
+
+    from_bundle = load_rulebook(str(tmp_path))
+    assert from_bundle.version == load_rulebook(str(tmp_path), bundle=False).version
+    assert from_bundle.clinical.near_limit_factor("ibuprofen") == 0.5
+    assert from_bundle.clinical.near_limit_factor("paracetamol") == 0.75
+
+    copied = pickle.loads(pickle.dumps(from_bundle))
+    assert copied.version == from_bundle.version
+    assert copied.clinical.to_data() == clinical
+
+
+def test_shared_conflicts_are_frozen():
+    escalation = get_rulebook().clinical.escalations[0].conflict
+
+    for conflict in (INFANT_CONFLICT, escalation):
+        with pytest.raises(AttributeError):
+            conflict.severity = 0
+        with pytest.raises(AttributeError):
+            del conflict.risk
+
+    copied = pickle.loads(pickle.dumps(escalation))
+    assert (copied.risk, copied.severity) == (escalation.risk, escalation.severity)
@@ -0,0 +1,52 @@
+import itertools
+
+from engine.analyzer import analyze
+from engine.rulebook import RuleBook, get_rulebook
+
+
+def _rulebooks():
+    shared = get_rulebook()
+    without_matrix = RuleBook(*shared.to_data(), version=shared.version, matrix=False)
+    return shared, without_matrix
+
+
+def _names(rulebook):
+    return sorted(set(rulebook.rules) | set(rulebook.brand_map))
+
+
+def test_matrix_is_built_for_bundled_rules():
+    shared, without_matrix = _rulebooks()
+
+    assert shared.conflict_matrix is not None
+    assert without_matrix.conflict_matrix is None
+
+
+def test_matrix_matches_pair_scan_on_all_small_combinations():
+    with_matrix, without_matrix = _rulebooks()
+    names = _names(with_matrix)
+
+    checked = 0
+    for medicine in names:
+        for size in (0, 1, 2):
+            for other_meds in itertools.combinations_with_replacement(names, size):
+                for alcohol in (False, True):
+                    case = {
+                        "medicine": medicine,
+                        "dose": 500,
+                        "time": "14:00",
+                        "other_meds": list(other_meds),
+                        "alcohol": alcohol
+                    }
+                    assert analyze(case, with_matrix) == analyze(case, without_matrix), case
+                    checked += 1
+
+    assert checked > 10000
+
+
+def test_matrix_pair_entries():
+    matrix = get_rulebook().conflict_matrix
+
+    para, alcohol = matrix.id_of("paracetamol"), matrix.id_of("alcohol")
+
+    assert [e["risk"] for e in matrix.pair_entries(alcohol, para)] == ["liver stress"]
+    assert matrix.pair_entries(matrix.id_of("unknown"), para) == ()
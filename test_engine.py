@@ -1,7 +1,13 @@
 from engine.analyzer import analyze
 import itertools
 
-tests = []
+SCENARIOS = {
+    name: [] for name in (
+        "basic", "spacing", "single_dose", "mg_per_kg", "accumulation",
+        "alcohol", "brand_duplicates", "nsaid_stacking", "pregnancy_age",
+        "invalid", "organ_stress", "pediatric", "invalid_age"
+    )
+}
 
 # --------------------------------------------------
 # 1️⃣ Basic Valid Cases
@@ -13,7 +19,7 @@ base_valid = [
     {"medicine": "aspirin", "dose": 500, "time": "14:00"},
 ]
 
-tests.extend(base_valid)
+SCENARIOS["basic"].extend(base_valid)
 
 
 # --------------------------------------------------
@@ -27,7 +33,7 @@ spacing_cases = [
 ]
 
 for case in spacing_cases:
-    tests.append({
+    SCENARIOS["spacing"].append({
         "medicine": "paracetamol",
         "dose": 500,
         **case
@@ -41,7 +47,7 @@ for case in spacing_cases:
 dose_values = [0, -100, 500, 1000, 1500, 4000]
 
 for d in dose_values:
-    tests.append({
+    SCENARIOS["single_dose"].append({
         "medicine": "paracetamol",
         "dose": d,
         "time": "14:00"
@@ -56,7 +62,7 @@ weights = [10, 20, 25, 30, 50]
 doses = [150, 300, 500, 650, 1000]
 
 for w, d in itertools.product(weights, doses):
-    tests.append({
+    SCENARIOS["mg_per_kg"].append({
         "medicine": "paracetamol",
         "dose": d,
         "weight": w,
@@ -77,7 +83,7 @@ dose_histories = [
 ]
 
 for history in dose_histories:
-    tests.append({
+    SCENARIOS["accumulation"].append({
         "medicine": "paracetamol",
         "dose": 500,
         "dose_history": history,
@@ -90,7 +96,7 @@ for history in dose_histories:
 # --------------------------------------------------
 
 for med in ["paracetamol", "ibuprofen", "diclofenac"]:
-    tests.append({
+    SCENARIOS["alcohol"].append({
         "medicine": med,
         "dose": 500,
         "alcohol": True,
@@ -110,7 +116,7 @@ brand_tests = [
 
 for bt in brand_tests:
     bt["time"] = "14:00"
-    tests.append(bt)
+    SCENARIOS["brand_duplicates"].append(bt)
 
 
 # --------------------------------------------------
@@ -124,7 +130,7 @@ nsaid_pairs = [
 ]
 
 for m1, m2 in nsaid_pairs:
-    tests.append({
+    SCENARIOS["nsaid_stacking"].append({
         "medicine": m1,
         "dose": 400,
         "other_meds": [m2],
@@ -148,7 +154,7 @@ age_cases = [
 
 for case in pregnancy_cases + age_cases:
     case["time"] = "10:00"
-    tests.append(case)
+    SCENARIOS["pregnancy_age"].append(case)
 
 
 # --------------------------------------------------
@@ -161,7 +167,7 @@ invalid_inputs = [
     {"medicine": "paracetamol", "dose": 500, "weight": 0, "time": "14:00"},
 ]
 
-tests.extend(invalid_inputs)
+SCENARIOS["invalid"].extend(invalid_inputs)
 
 
 # --------------------------------------------------
@@ -175,7 +181,7 @@ organ_cases = [
 
 for case in organ_cases:
     case["time"] = "18:00"
-    tests.append(case)
+    SCENARIOS["organ_stress"].append(case)
 
 
 # --------------------------------------------------
@@ -203,22 +209,26 @@ pediatric_tests = [
 ]
 
 for case in pediatric_tests:
-    tests.append(case)
-
-print(f"\nTOTAL TESTS: {len(tests)}")
+    SCENARIOS["pediatric"].append(case)
 
 # 21 Invalid age (Negative)
-tests.append({
+SCENARIOS["invalid_age"].append({
     "medicine": "paracetamol",
     "dose": 500,
     "age": -1,
     "time": "14:00"
 })
 
-for i, test in enumerate(tests, 1):
-    print(f"\n--- TEST {i} ---")
-    try:
-        result = analyze(test)
-        print(result)
-    except Exception as e:
-        print("CRASHED:", e)
+tests = [case for cases in SCENARIOS.values() for case in cases]
+
+
+if __name__ == "__main__":
+    print(f"\nTOTAL TESTS: {len(tests)}")
+
+    for i, test in enumerate(tests, 1):
+        print(f"\n--- TEST {i} ---")
+        try:
+            result = analyze(test)
+            print(result)
+        except Exception as e:
+            print("CRASHED:", e)
@@ -0,0 +1,132 @@
+"""
+generate_explanation() must keep producing exactly the text it did before
+its templates were precompiled. test_explain_golden.json holds the
+recorded outputs; after an intended wording change, regenerate it with
+
+    python test_explain_golden.py
+"""
+
+import json
+import os
+import random
+import re
+
+from ai.explain import explanation_key, generate_explanation
+from engine.analyzer import analyze
+from test_engine import SCENARIOS
+
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_explain_golden.json")
+
+RISK_TEXTS = [
+    "Alcohol significantly increases paracetamol liver toxicity",
+    "Critical daily paracetamol accumulation (100.0mg/kg > 75mg/kg)",
+    "Critical: Hidden duplicate paracetamol detected across brands",
+    "High kidney stress detected",
+    "Infants require pediatric supervision for medication dosing.",
+    "Multiple doses of paracetamol detected",
+    "NSAID stacking",
+    "Paracetamol dose too high for weight (25.0mg/kg > 20mg/kg)",
+    "Severe liver stress detected",
+    "Weight-based dosing is required for children.",
+    "aspirin contraindicated for this age",
+    "ibuprofen contraindicated in pregnancy",
+    "Pregnancy and dosage",
+    "Duplicate NSAID dose",
+    "bleeding",
+    "stomach irritation"
+]
+
+OTHER_ENTRIES = ["not a conflict", {"severity": 3}]
+
+
+def _maybe(rng, values):
+    # None leaves the field out of the input
+    return rng.choice(values + [None])
+
+
+def golden_cases():
+    cases = []
+    for name in sorted(SCENARIOS):
+        for case in SCENARIOS[name]:
+            result = analyze(case)
+            if "error" not in result:
+                cases.append(result)
+
+    rng = random.Random(21)
+    for _ in range(3000):
+        fields = {
+            "risk_level": _maybe(rng, ["HIGH RISK", "CAUTION", "SAFE", "UNKNOWN"]),
+            "mode": _maybe(rng, ["reassuring", "standard", "firm", "playful"]),
+            "detail": _maybe(rng, ["low", "medium", "high"]),
+            "strength": _maybe(rng, ["soft", "normal", "strict", "gentle"]),
+            "audience": _maybe(rng, ["general", "clinical"]),
+            "medicine": _maybe(rng, ["paracetamol", "ibuprofen"]),
+            "liver_load": _maybe(rng, [0, 1, 3, 4, 5, 6, 7]),
+            "kidney_load": _maybe(rng, [0, 1, 3, 4, 5, 6]),
+            "stomach_risk": _maybe(rng, [0, 2, 4, 5, 8])
+        }
+        case = {key: value for key, value in fields.items() if value is not None}
+
+        if rng.random() < 0.9:
+            conflicts = [{"risk": risk, "severity": 3} for risk in rng.sample(RISK_TEXTS, rng.randint(0, 6))]
+            if rng.random() < 0.1:
+                conflicts.insert(rng.randrange(len(conflicts) + 1), rng.choice(OTHER_ENTRIES))
+            case["conflicts"] = conflicts
+
+        cases.append(case)
+
+    return cases
+
+
+def _sentences(text):
+    return re.split(r"(?<=\.) ", text)
+
+
+def _record():
+    sentences = []
+    index = {}
+    expected = []
+
+    for case in golden_cases():
+        text = generate_explanation(case)
+        parts = _sentences(text)
+        assert " ".join(parts) == text
+
+        for part in parts:
+            index.setdefault(part, len(index))
+        expected.append([index[part] for part in parts])
+
+    sentences = sorted(index, key=index.get)
+    with open(GOLDEN, "w") as f:
+        f.write('{\n"sentences": ' + json.dumps(sentences, indent=1) + ',\n"expected": [\n')
+        f.write(",\n".join(json.dumps(ids) for ids in expected))
+        f.write("\n]\n}\n")
+
+
+def test_explanations_match_golden_outputs():
+    with open(GOLDEN) as f:
+        golden = json.load(f)
+
+    cases = golden_cases()
+    expected = [" ".join(golden["sentences"][i] for i in ids) for ids in golden["expected"]]
+    assert len(cases) == len(expected)
+
+    for case, text in zip(cases, expected):
+        assert generate_explanation(case) == text, case
+
+    # Served from the memo the second time round
+    for case, text in zip(cases, expected):
+        assert generate_explanation(case) == text, case
+
+
+def test_key_ignores_what_the_text_does_not_depend_on():
+    base = {"risk_level": "CAUTION", "liver_load": 1, "conflicts": [{"risk": "bleeding"}], "medicine": "aspirin"}
+    same = {**base, "score": 55, "liver_load": 2, "conflicts": [{"risk": "stomach irritation"}], "medicine": "ibuprofen"}
+
+    assert explanation_key(base) == explanation_key(same)
+    assert explanation_key(base) != explanation_key({**base, "conflicts": [{"risk": "NSAID stacking"}]})
+
+
+if __name__ == "__main__":
+    _record()
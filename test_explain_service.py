@@ -0,0 +1,161 @@
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from ai.explain import generate_explanation
+from ai.explain_service import (
+    ExplanationJob,
+    ExplanationService,
+    SOURCE_FALLBACK,
+    SOURCE_MODEL,
+    SOURCE_TEMPLATE
+)
+from engine.analyzer import analyze
+
+
+RESULT = analyze({"medicine": "ibuprofen", "dose": 400, "other_meds": ["aspirin"], "time": "14:00"})
+
+
+class StubModel:
+    """
+    Local stand-in for the remote model: fixed latency, optional failure.
+    """
+
+    def __init__(self, latency=0.0, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    def __call__(self, result):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return f"stub explanation for {result['risk_level']}"
+
+
+def test_without_model_uses_templates():
+    service = ExplanationService()
+
+    assert service.explain(RESULT) == (generate_explanation(RESULT), SOURCE_TEMPLATE)
+
+
+def test_model_answer_within_budget():
+    service = ExplanationService(StubModel(latency=0.01), budget=1.0)
+
+    assert service.explain(RESULT) == ("stub explanation for HIGH RISK", SOURCE_MODEL)
+
+
+def test_slow_model_falls_back_within_budget():
+    service = ExplanationService(StubModel(latency=0.5), budget=0.05)
+
+    start = time.perf_counter()
+    text, source = service.explain(RESULT)
+
+    assert time.perf_counter() - start < 0.3
+    assert (text, source) == (generate_explanation(RESULT), SOURCE_FALLBACK)
+    assert service.fallbacks == 1
+
+
+def test_failing_model_falls_back():
+    service = ExplanationService(StubModel(fail=True), budget=1.0)
+
+    assert service.explain(RESULT)[1] == SOURCE_FALLBACK
+
+
+def test_deferred_job_delivers_model_text():
+    service = ExplanationService(StubModel(latency=0.05), deferred_budget=2.0)
+
+    job = service.submit(RESULT)
+    assert job.as_dict()["status"] == "pending"
+
+    assert job.wait(2.0)
+    assert service.get(job.id).as_dict() == {
+        "id": job.id,
+        "status": "ready",
+        "ai_explanation": "stub explanation for HIGH RISK",
+        "source": SOURCE_MODEL
+    }
+
+
+def test_deferred_job_resolves_to_fallback_after_deadline():
+    service = ExplanationService(StubModel(latency=1.0), deferred_budget=0.05)
+
+    job = service.submit(RESULT)
+    time.sleep(0.1)
+
+    assert job.as_dict()["source"] == SOURCE_FALLBACK
+
+
+def test_poll_never_explains_a_job_resolved_meanwhile(monkeypatch):
+    explained = []
+    monkeypatch.setattr("ai.explain_service.generate_explanation", lambda result: explained.append(result) or "text")
+
+    class RacingFuture(Future):
+        # Another thread resolves the job between poll()'s reads
+        def done(self):
+            job._complete("model text", SOURCE_MODEL)
+            return True
+
+    future = RacingFuture()
+    job = ExplanationJob(ExplanationService(), RESULT, future, budget=10.0)
+    future.set_exception(RuntimeError("model unavailable"))
+
+    assert job.as_dict()["ai_explanation"] == "model text"
+    assert None not in explained
+
+
+def test_batch_explanations_share_one_budget():
+    model = StubModel(latency=0.5)
+    service = ExplanationService(model, budget=0.05, max_workers=4)
+
+    start = time.perf_counter()
+    answers = service.explain_many([RESULT] * 4)
+
+    assert time.perf_counter() - start < 0.3
+    assert answers == [(generate_explanation(RESULT), SOURCE_FALLBACK)] * 4
+    assert ExplanationService().explain_many([RESULT]) == [(generate_explanation(RESULT), SOURCE_TEMPLATE)]
+
+
+def test_batch_endpoint_uses_the_explanation_service(monkeypatch):
+    from api import handlers
+
+    monkeypatch.setattr(handlers, "explanations", ExplanationService(StubModel(), budget=1.0))
+    body, status = handlers.handle_batch({"items": [
+        {"medicine": "ibuprofen", "dose": 400, "other_meds": ["aspirin"], "time": "14:00"},
+        {"medicine": "randompill", "dose": 1, "time": "10:00"}
+    ]})
+
+    assert (status, body["errors"]) == (200, 1)
+    assert body["results"][0]["ai_explanation"] == "stub explanation for HIGH RISK"
+    assert "ai_explanation" not in body["results"][1]
+
+
+def test_api_deferred_explanation_over_poll_and_sse(monkeypatch):
+    pytest.importorskip("flask")
+    from api import handlers
+    from api.app import app
+
+    monkeypatch.setattr(handlers, "explanations", ExplanationService(StubModel(latency=0.05)))
+    client = app.test_client()
+
+    response = client.post(
+        "/analyze?explain=deferred",
+        json={"medicine": "paracetamol", "dose": 500, "time": "14:00"}
+    )
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body["ai_explanation"] == generate_explanation(analyze(
+        {"medicine": "paracetamol", "dose": 500, "time": "14:00"}
+    ))
+
+    events = client.get(f"/explanations/{body['explanation_id']}/events").get_data(as_text=True)
+    assert "event: explanation" in events and "stub explanation for SAFE" in events
+
+    polled = client.get(f"/explanations/{body['explanation_id']}")
+    assert polled.status_code == 200
+    assert polled.get_json()["source"] == SOURCE_MODEL
+
+    assert client.get("/explanations/unknown").status_code == 404
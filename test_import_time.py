@@ -0,0 +1,42 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+
+# Cumulative import time budget for api.app, in milliseconds
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 500))
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _import_times(module):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)", line)
+        if match:
+            times[match.group(2)] = int(match.group(1)) / 1000
+    return times
+
+
+def test_api_import_skips_genai_sdk():
+    pytest.importorskip("flask")
+
+    times = _import_times("api.app")
+
+    assert not [name for name in times if name.startswith("google.genai")]
+
+
+def test_api_import_within_budget():
+    pytest.importorskip("flask")
+
+    times = _import_times("api.app")
+
+    assert times["api.app"] < IMPORT_BUDGET_MS
@@ -0,0 +1,46 @@
+import itertools
+import json
+import os
+
+from engine.interactions import InteractionIndex, check_interactions
+from engine.rulebook import ENGINE_DIR
+
+
+with open(os.path.join(ENGINE_DIR, "interactions.json")) as f:
+    INTERACTIONS = json.load(f)
+
+DRUGS = sorted({entry[side] for entry in INTERACTIONS for side in ("drugA", "drugB")} | {"unlisted"})
+
+
+def _agree(interactions, medicine, other_meds):
+    index = InteractionIndex(interactions)
+    scan = check_interactions(medicine, other_meds, interactions)
+    assert check_interactions(medicine, other_meds, index) == scan, (medicine, other_meds)
+
+
+def test_index_matches_linear_scan_for_every_pair():
+    index = InteractionIndex(INTERACTIONS)
+
+    for medicine, other in itertools.product(DRUGS, repeat=2):
+        scan = check_interactions(medicine, [other], INTERACTIONS)
+        assert check_interactions(medicine, [other], index) == scan, (medicine, other)
+
+    # Several partners, repeated partners: entries once each, in file order
+    for medicine in DRUGS:
+        others = [other for other in reversed(DRUGS) if other != medicine]
+        scan = check_interactions(medicine, others + others[:3], INTERACTIONS)
+        assert check_interactions(medicine, others + others[:3], index) == scan
+
+
+def test_index_keeps_duplicate_and_reversed_entries_in_file_order():
+    interactions = [
+        {"drugA": "a", "drugB": "b", "severity": "LOW"},
+        {"drugA": "c", "drugB": "a", "severity": "HIGH"},
+        {"drugA": "b", "drugB": "a", "severity": "MODERATE"},
+        {"drugA": "a", "drugB": "b", "severity": "LOW"}
+    ]
+
+    _agree(interactions, "a", ["c", "b"])
+    _agree(interactions, "a", ["b", "b", "c"])
+    _agree(interactions, "b", ["a"])
+    assert len(check_interactions("a", ["b", "c"], InteractionIndex(interactions))) == 4
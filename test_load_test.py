@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from ai import explain
+from ai.explain_service import SOURCE_FALLBACK, SOURCE_MODEL, ExplanationService
+from engine.analyzer import analyze
+from benchmarks.fake_model import FAKE_TEXT, FakeModelServer
+from benchmarks.httpload import build_request, open_loop
+from benchmarks.load_test import is_saturated, saturation_points
+
+
+def test_genai_client_talks_to_fake_model(monkeypatch):
+    pytest.importorskip("google.genai")
+
+    with FakeModelServer(latency_ms=20, spread=0) as model:
+        monkeypatch.setenv("GEMINI_API_KEY", "fake")
+        monkeypatch.setenv("GEMINI_BASE_URL", model.url)
+        monkeypatch.setattr(explain, "_client", None)
+
+        result = analyze({"medicine": "paracetamol", "dose": 500, "time": "10:00"})
+        service = ExplanationService(model=explain.generate_llm_explanation, budget=5.0)
+        try:
+            assert service.explain(result) == (FAKE_TEXT, SOURCE_MODEL)
+
+            model.error_rate = 1.0
+            text, source = service.explain(result)
+            assert source == SOURCE_FALLBACK and text != FAKE_TEXT
+        finally:
+            service.close()
+
+        assert model.stats()["calls"] == 2 and model.stats()["errors"] == 1
+
+
+def test_client_without_key_loads_dotenv_once(monkeypatch):
+    loads = []
+    monkeypatch.setattr("dotenv.load_dotenv", lambda: loads.append(1))
+    monkeypatch.setattr(explain, "_env_loaded", False)
+    monkeypatch.setattr(explain, "_client", None)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+
+    assert explain.get_client() is None
+    assert explain.get_client() is None
+    assert loads == [1]
+
+
+def test_open_loop_keeps_its_rate():
+    with FakeModelServer(latency_ms=50, spread=0) as model:
+        host, port = model.url.removeprefix("http://").split(":")
+        requests = [build_request("POST", "/v1beta/models/fake:generateContent", f"{host}:{port}", {})]
+
+        # 40 requests due in one second, each answered after 50ms: the client
+        # must not wait for one answer before sending the next
+        summary = asyncio.run(open_loop(host, int(port), requests, rps=40, duration=1.0)).summary()
+
+    assert summary["offered"] == summary["requests"] == 40
+    assert summary["error_rate"] == 0 and summary["statuses"] == {200: 40}
+    assert summary["p50_ms"] >= 50
+    assert model.stats()["peak_in_flight"] >= 2
+
+
+def test_saturation_points():
+    rows = [
+        {"workers": 1, "threads": 8, "offered_rps": 10, "saturated": False},
+        {"workers": 1, "threads": 8, "offered_rps": 20, "saturated": True},
+        {"workers": 2, "threads": 8, "offered_rps": 10, "saturated": False},
+    ]
+    assert saturation_points(rows) == {
+        "1x8": {"sustained_rps": 10, "saturation_rps": 20},
+        "2x8": {"sustained_rps": 10, "saturation_rps": None}
+    }
+
+    assert is_saturated({"p99_ms": 2500, "error_rate": 0}, slo_ms=2000, max_error_rate=0.01)
+    assert is_saturated({"p99_ms": 100, "error_rate": 0.05}, slo_ms=2000, max_error_rate=0.01)
+    assert not is_saturated({"p99_ms": 100, "error_rate": 0}, slo_ms=2000, max_error_rate=0.01)
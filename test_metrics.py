@@ -0,0 +1,64 @@
+import pytest
+
+from engine import metrics
+from engine.analyzer import analyze
+from engine.metrics import NULL_CLOCK, StageRegistry, enable_stage_timing, start_clock, stage_timing_enabled
+
+
+CASE = {"medicine": "crocin", "dose": 500, "other_meds": ["dolo_650"], "time": "14:00"}
+
+
+@pytest.fixture
+def stage_timing():
+    enabled = stage_timing_enabled()
+    metrics.REGISTRY.reset()
+    enable_stage_timing()
+    yield metrics.REGISTRY
+    enable_stage_timing(enabled)
+    metrics.REGISTRY.reset()
+
+
+def test_histogram_renders_cumulative_buckets_count_and_sum():
+    registry = StageRegistry()
+    for seconds in (0.000003, 0.00003, 0.00003, 0.2):
+        registry.observe("spacing", seconds)
+
+    lines = registry.render("t").splitlines()
+
+    assert lines[:2] == ["# HELP t Time spent in each analyze() stage.", "# TYPE t histogram"]
+    assert 't_bucket{stage="spacing",le="5e-06"} 1' in lines
+    assert 't_bucket{stage="spacing",le="2.5e-05"} 1' in lines
+    assert 't_bucket{stage="spacing",le="5e-05"} 3' in lines
+    # Above the largest bound: only in +Inf
+    assert 't_bucket{stage="spacing",le="0.1"} 3' in lines
+    assert 't_bucket{stage="spacing",le="+Inf"} 4' in lines
+    assert 't_sum{stage="spacing"} 0.200063000' in lines
+    assert 't_count{stage="spacing"} 4' in lines
+
+
+def test_disabled_timing_uses_the_null_clock():
+    enabled = stage_timing_enabled()
+    enable_stage_timing(False)
+    metrics.REGISTRY.reset()
+    try:
+        assert start_clock() is NULL_CLOCK
+        analyze(CASE)
+        assert metrics.REGISTRY.histograms == {}
+    finally:
+        enable_stage_timing(enabled)
+
+
+def test_metrics_endpoint_reports_stage_timings(stage_timing):
+    pytest.importorskip("flask")
+    from api.app import app
+
+    client = app.test_client()
+    assert client.post("/analyze", json=CASE).status_code == 200
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert "# TYPE rules_reloads_total counter" in text
+    assert 'analyze_stage_seconds_count{stage="total"} 1' in text
+    assert 'analyze_stage_seconds_count{stage="interactions"} 1' in text
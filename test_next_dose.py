@@ -0,0 +1,76 @@
+import pytest
+
+from engine.analyzer import analyze
+from engine.next_dose import next_safe_dose
+from engine.rulebook import RuleBook, get_rulebook
+
+
+CASES = [
+    {"medicine": "paracetamol", "time": "10:00", "previous_time": "08:00", "dose_history": [1000]},
+    {"medicine": "paracetamol", "time": "01:00", "previous_time": "23:00", "dose_history": [500]},
+    {"medicine": "paracetamol", "time": "10:00", "weight": 13.3, "dose_history": [100]},
+    {"medicine": "paracetamol", "time": "10:00", "weight": 40, "dose_history": [500, 500, 500, 500]},
+    {"medicine": "ibuprofen", "time": "10:00", "dose_history": [400, 400]},
+    {"medicine": "aspirin", "time": "09:30", "previous_time": "07:00", "other_meds": ["cetirizine"]},
+    {"medicine": "crocin", "time": "12:00", "previous_time": "09:00", "dose_history": [650]},
+]
+
+
+def _at(case, answer, dose):
+    return analyze({
+        **case,
+        "dose": dose,
+        "dose_history": case.get("dose_history", []) + [dose],
+        "time": answer["earliest_time"]
+    })
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_answer_is_safe_and_tight(case):
+    answer = next_safe_dose(case)
+
+    assert answer["safe"]
+    assert _at(case, answer, answer["max_dose"])["risk_level"] == "SAFE"
+    # One more milligram crosses a limit
+    assert _at(case, answer, answer["max_dose"] + 1)["risk_level"] != "SAFE"
+
+
+def test_waits_out_spacing_across_midnight():
+    answer = next_safe_dose(CASES[1])
+
+    assert (answer["earliest_time"], answer["wait_hours"]) == ("03:00", 2.0)
+
+
+def test_fractional_spacing_rounds_up_to_the_next_minute():
+    rules, interactions, brand_map = get_rulebook().to_data()
+    rules["paracetamol"]["min_spacing_hours"] = 4.33
+    rulebook = RuleBook(rules, interactions, brand_map)
+
+    # 4.33h after 08:00 is 12:19:48
+    case = {"medicine": "paracetamol", "time": "09:00", "previous_time": "08:00"}
+    answer = next_safe_dose(case, rulebook)
+
+    assert (answer["earliest_time"], answer["wait_hours"]) == ("12:20", 3.33)
+    too_early = analyze({**case, "dose": answer["max_dose"], "time": "12:19"}, rulebook)
+    assert "Dose taken too soon" in too_early["issues"]
+
+
+def test_daily_cap_reached():
+    answer = next_safe_dose({"medicine": "paracetamol", "time": "10:00", "dose_history": [1000, 1000, 1000]})
+
+    assert not answer["safe"]
+    assert answer["binding_limit"] == "near_limit"
+    assert answer["earliest_time"] is None
+
+
+def test_dose_independent_block():
+    answer = next_safe_dose({"medicine": "paracetamol", "time": "10:00", "alcohol": True})
+
+    assert not answer["safe"]
+    assert answer["risk_level"] == "HIGH RISK"
+
+
+def test_validation_errors():
+    assert next_safe_dose({"medicine": "randompill", "time": "10:00"}) == {"error": "Medicine not found in rules"}
+    assert next_safe_dose({"medicine": "paracetamol", "time": "25:99"}) == {"error": "Invalid time format. Use HH:MM"}
+    assert next_safe_dose({"medicine": "paracetamol", "time": "10:00", "weight": -1}) == {"error": "Invalid weight value: must be positive"}
@@ -0,0 +1,14 @@
+from engine.analyzer import analyze, analyze_many
+from test_engine import tests as ENGINE_CASES
+
+
+def test_process_pool_matches_serial_analyze_in_order():
+    # Several chunks per worker, the last one short
+    inputs = ENGINE_CASES * 2 + ENGINE_CASES[:5]
+    parallel = analyze_many(inputs, workers=2, chunk_size=7)
+
+    assert parallel == [analyze(item) for item in inputs]
+
+    # Malformed items are answered in place, as in the serial path
+    mixed = [ENGINE_CASES[0], "not a dict", {"dose": 500}, ENGINE_CASES[1]]
+    assert analyze_many(mixed, workers=2, chunk_size=1) == analyze_many(mixed)
@@ -0,0 +1,205 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from engine.analyzer import analyze
+from engine.reload import RuleWatcher, file_signature
+from engine.rulebook import ENGINE_DIR, get_rulebook, load_rulebook, set_rulebook
+
+
+# 3500mg of paracetamol today: near the limit at 4000mg/day, an overdose at 3000mg/day
+CASE = {"medicine": "paracetamol", "dose": 500, "dose_history": [1000, 1000, 1000, 500], "time": "20:00"}
+EXPECTED_RISK = {4000: "CAUTION", 3000: "HIGH RISK"}
+
+
+@pytest.fixture
+def rule_dir(tmp_path):
+    for name in ("rules.json", "interactions.json", "brand_map.json"):
+        shutil.copy(os.path.join(ENGINE_DIR, name), tmp_path / name)
+
+    previous = get_rulebook()
+    set_rulebook(load_rulebook(str(tmp_path)))
+    yield tmp_path
+    set_rulebook(previous)
+
+
+def _write_rules(directory, max_daily):
+    rules = json.loads((directory / "rules.json").read_text())
+    rules["paracetamol"]["max_daily_dose"] = max_daily
+    tmp = directory / "rules.json.tmp"
+    tmp.write_text(json.dumps(rules))
+    os.replace(tmp, directory / "rules.json")
+
+
+def _hammer(seconds, samples):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        result = analyze(CASE)
+        samples.append((started, time.perf_counter(), result["rule_version"], result["risk_level"]))
+
+
+def _under_load(seconds, step=None, threads=4, every=0.02):
+    """
+    Runs analyze() on `threads` threads for `seconds`, calling step() every
+    `every` seconds meanwhile. Returns (started, finished, rule_version,
+    risk_level) samples.
+    """
+
+    samples = [[] for _ in range(threads)]
+    workers = [threading.Thread(target=_hammer, args=(seconds, s)) for s in samples]
+    for worker in workers:
+        worker.start()
+
+    while any(worker.is_alive() for worker in workers):
+        if step is not None:
+            step()
+        time.sleep(every)
+
+    for worker in workers:
+        worker.join()
+    return [sample for per_thread in samples for sample in per_thread]
+
+
+def _p99(latencies):
+    latencies = sorted(latencies)
+    return latencies[int(len(latencies) * 0.99)]
+
+
+def test_reload_under_load_has_no_torn_reads(rule_dir):
+    versions = {}
+    for max_daily in EXPECTED_RISK:
+        _write_rules(rule_dir, max_daily)
+        versions[load_rulebook(str(rule_dir)).version] = max_daily
+
+    watcher = RuleWatcher(str(rule_dir))
+    watcher.reload()
+
+    flips = iter(range(10**6))
+
+    def swap_rules():
+        _write_rules(rule_dir, 3000 if next(flips) % 2 else 4000)
+        watcher.reload()
+
+    loaded = _under_load(1.5, swap_rules)
+
+    assert watcher.reloads >= 10 and watcher.failures == 0
+    assert {version for _, _, version, _ in loaded} == set(versions)
+
+    # Every result is wholly from one rule version
+    for _, _, version, risk in loaded:
+        assert risk == EXPECTED_RISK[versions[version]]
+
+
+def test_reloads_cause_no_latency_spikes(rule_dir):
+    # Rule files prepared upfront, so only the reload itself competes with requests
+    rules = json.loads((rule_dir / "rules.json").read_text())
+    texts = []
+    for max_daily in EXPECTED_RISK:
+        rules["paracetamol"]["max_daily_dose"] = max_daily
+        texts.append(json.dumps(rules))
+
+    watcher = RuleWatcher(str(rule_dir))
+    watcher.reload()
+    reloading = []
+
+    def swap_rules():
+        (rule_dir / "rules.json").write_text(texts[len(reloading) % 2])
+        started = time.perf_counter()
+        watcher.reload()
+        reloading.append((started, time.perf_counter()))
+
+    # One request thread, so the only GIL contention is the reload's
+    baseline = _under_load(0.5, threads=1)
+    loaded = _under_load(1.5, swap_rules, threads=1, every=0.05)
+
+    during = [
+        finished - started for started, finished, _, _ in loaded
+        if any(started < end and finished > begin for begin, end in reloading)
+    ]
+
+    assert watcher.reloads >= 10
+    assert len(during) >= 100
+    # Requests that ran while a reload was in progress are as fast as any
+    assert _p99(during) < 5 * _p99([finished - started for started, finished, _, _ in baseline])
+
+
+def test_invalid_rules_keep_the_current_version(rule_dir):
+    watcher = RuleWatcher(str(rule_dir))
+    current = get_rulebook().version
+
+    (rule_dir / "rules.json").write_text("{not json")
+
+    with pytest.raises(ValueError):
+        watcher.reload()
+
+    assert get_rulebook().version == current
+    assert watcher.failures == 1
+
+
+def test_reloads_log_at_info_and_rejections_at_warning(rule_dir, caplog):
+    watcher = RuleWatcher(str(rule_dir))
+    caplog.set_level("INFO", logger="engine.reload")
+
+    _write_rules(rule_dir, 3000)
+    watcher.reload()
+    (rule_dir / "rules.json").write_text("{not json")
+    with pytest.raises(ValueError):
+        watcher.reload()
+
+    assert [record.levelname for record in caplog.records] == ["INFO", "WARNING"]
+
+
+def test_watcher_picks_up_file_changes(rule_dir):
+    watcher = RuleWatcher(str(rule_dir), interval=0.01).start()
+    try:
+        _write_rules(rule_dir, 3000)
+        deadline = time.monotonic() + 5
+        while get_rulebook().rules["paracetamol"]["max_daily_dose"] != 3000 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        watcher.stop()
+
+    assert analyze(CASE)["risk_level"] == "HIGH RISK"
+
+
+def test_signature_watches_the_clinical_file_actually_loaded(rule_dir):
+    fallback = os.path.join(ENGINE_DIR, "clinical.json")
+    signature = file_signature(str(rule_dir))
+    assert fallback in [entry[0] for entry in signature]
+
+    # A clinical.json of its own replaces the engine's
+    shutil.copy(fallback, rule_dir / "clinical.json")
+    assert file_signature(str(rule_dir)) != signature
+    assert fallback not in [entry[0] for entry in file_signature(str(rule_dir))]
+
+
+WATCHER_LIFECYCLE = """
+import threading
+import api.app
+from api import gunicorn_conf
+
+def watching():
+    return any(thread.name == "rule-watcher" for thread in threading.enumerate())
+
+assert not watching()
+gunicorn_conf.post_fork(None, None)
+assert watching()
+gunicorn_conf.worker_exit(None, None)
+assert not watching()
+"""
+
+
+def test_api_import_starts_no_watcher():
+    subprocess.run(
+        [sys.executable, "-c", WATCHER_LIFECYCLE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "RULES_WATCH_INTERVAL": "5"},
+        check=True
+    )
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from api import handlers
+from engine.rulebook import RuleBook, get_rulebook, set_rulebook
+
+
+def test_snapshot_matches_rules():
+    rulebook = get_rulebook()
+    body, status, headers = handlers.handle_rules()
+    snapshot = json.loads(body)
+
+    assert status == 200
+    assert snapshot["version"] == rulebook.version
+    assert snapshot["ingredients"]["paracetamol"] == [4000, 1000, 4]
+    assert snapshot["aliases"]["acetaminophen"] == "paracetamol"
+    assert snapshot["brands"]["combiflam"] == ["paracetamol", "ibuprofen"]
+    # Every brand in the snapshot expands to something analyze() accepts
+    assert all(brand[0] in snapshot["ingredients"] for brand in snapshot["brands"].values())
+
+    # Encoded once per rule version
+    assert handlers.handle_rules()[0] is body
+
+
+def test_rules_etag_and_version_change():
+    pytest.importorskip("flask")
+    from api.app import app as flask_app
+
+    client = flask_app.test_client()
+    first = client.get("/rules")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert etag.startswith('"') and etag.endswith('"')
+    assert first.headers["Cache-Control"] == f"public, max-age={handlers.RULES_MAX_AGE}"
+
+    for header in (etag, f'"stale", W/{etag}', "*"):
+        cached = client.get("/rules", headers={"If-None-Match": header})
+        assert cached.status_code == 304
+        assert cached.data == b""
+        assert cached.headers["ETag"] == etag
+
+    assert client.get("/rules", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+    previous = get_rulebook()
+    rules, interactions, brand_map = previous.to_data()
+    rules["paracetamol"]["single_dose_limit"] = 500
+    set_rulebook(RuleBook(rules, interactions, brand_map))
+    try:
+        changed = client.get("/rules", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+        assert json.loads(changed.data)["ingredients"]["paracetamol"][1] == 500
+    finally:
+        set_rulebook(previous)
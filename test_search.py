@@ -0,0 +1,113 @@
+import pytest
+
+from engine.analyzer import analyze
+from engine.compile_rules import validate
+from engine.rulebook import RuleBook, get_rulebook
+from engine.search import SearchIndex, normalize
+from benchmarks.synthetic import formulary
+
+
+def _names(query, limit=10):
+    return [match["name"] for match in get_rulebook().search_index.search(query, limit)]
+
+
+def test_normalize():
+    assert normalize("  Dolo 650 ") == "dolo_650"
+    assert normalize("Vicks-Action  500") == "vicks_action_500"
+    assert normalize("?!") == ""
+
+
+@pytest.mark.parametrize("query,expected,match", [
+    ("dolo_650", "dolo_650", "exact"),
+    ("Dolo 650", "dolo_650", "exact"),
+    ("dolo650", "dolo_650", "exact"),
+    ("vicks", "vicks_action_500", "prefix"),
+    ("action", "vicks_action_500", "word"),
+    ("parac", "paracetamol", "prefix"),
+    ("paracetmol", "paracetamol", "fuzzy"),
+    ("ibuprofn", "ibuprofen", "fuzzy"),
+    ("vikcs", "vicks_action_500", "fuzzy"),
+    ("acetaminophen", "paracetamol", "exact"),
+])
+def test_search_ranks_the_intended_name_first(query, expected, match):
+    first = get_rulebook().search_index.search(query)[0]
+
+    assert (first["name"], first["match"]) == (expected, match)
+
+
+def test_results_carry_ingredient_expansions():
+    combiflam = get_rulebook().search_index.search("combiflam")[0]
+    alias = get_rulebook().search_index.search("apap")[0]
+
+    assert combiflam == {
+        "name": "combiflam", "kind": "brand", "ingredients": ["paracetamol", "ibuprofen"], "match": "exact"
+    }
+    assert alias["name"] == "paracetamol" and alias["alias"] == "apap"
+
+
+def test_every_result_is_analyzable():
+    for query in ("a", "c", "d", "o", "p", "v"):
+        for name in _names(query, 50):
+            assert "error" not in analyze({"medicine": name, "dose": 1, "time": "10:00"})
+
+
+def test_limits_order_and_unknowns():
+    assert _names("d", 2) == _names("d", 10)[:2]
+    assert len(set(_names("p", 50))) == len(_names("p", 50))
+    assert _names("zzzzzz") == []
+    assert _names("") == []
+
+
+def test_large_formulary():
+    rules, interactions, brand_map = formulary(3000, 100, seed=3)
+    index = SearchIndex(rules, brand_map)
+
+    assert [m["name"] for m in index.search("drug_12", 3)] == ["drug_12", "drug_120", "drug_121"]
+    assert index.search("drg_1234")[0]["name"] == "drug_1234"
+    assert index.search("brand_7")[0]["name"] == "brand_7"
+
+
+def test_index_follows_the_rulebook():
+    rules, interactions, brand_map = get_rulebook().to_data()
+    brand_map["newbrand"] = ["paracetamol"]
+    rulebook = RuleBook(rules, interactions, brand_map)
+
+    assert rulebook.search_index.search("newbr")[0]["name"] == "newbrand"
+    assert "newbrand" not in _names("newbr")
+
+
+def test_aliases_are_validated():
+    rules, interactions, brand_map = get_rulebook().to_data()
+    rules["paracetamol"]["aliases"] = "acetaminophen"
+
+    errors, _ = validate(rules, interactions, brand_map)
+    assert errors == ["rules.json: paracetamol: aliases must be a list of names"]
+
+
+def test_aliases_are_analyzed_as_their_ingredient():
+    case = {"medicine": "Acetaminophen", "dose": 500, "dose_history": [1000, 1000], "time": "20:00"}
+    result = analyze(case)
+
+    assert "error" not in result
+    assert result == analyze({**case, "medicine": "paracetamol"})
+    assert get_rulebook().expand("apap") == ("paracetamol",)
+
+    # Listed together with its ingredient: a duplicate, as with a brand
+    duplicate = analyze({**case, "dose_history": [], "other_meds": ["paracetamol"]})
+    assert duplicate["risk_level"] == analyze({**case, "dose_history": [], "other_meds": ["crocin"]})["risk_level"]
+
+
+def test_search_endpoint():
+    pytest.importorskip("flask")
+    from api.app import app
+
+    client = app.test_client()
+
+    response = client.get("/search?q=dolo")
+    assert response.status_code == 200
+    assert response.json["results"][0]["ingredients"] == ["paracetamol"]
+    assert response.json["rule_version"] == get_rulebook().version
+
+    assert client.get("/search").status_code == 400
+    assert client.get("/search?q=para&limit=0").status_code == 400
+    assert client.get("/search?q=para&limit=x").status_code == 400
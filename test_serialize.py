@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from api.handlers import analyze_and_explain
+from api.serialize import dumps, dumps_stdlib
+from test_engine import tests as ENGINE_CASES
+
+
+def test_fast_encoder_matches_stdlib_json():
+    for case in ENGINE_CASES:
+        payload = analyze_and_explain(case)
+        body = dumps(payload)
+
+        assert body.endswith(b"\n")
+        assert json.loads(body) == json.loads(dumps_stdlib(payload)) == payload
+        # Conflicts stay plain JSON objects
+        assert all(isinstance(c, dict) for c in payload.get("conflicts", []))
+
+    # Keys sorted at every level, as with Flask's jsonify
+    assert dumps({"b": {"d": 1, "c": 2}, "a": [1.5]}) == b'{"a":[1.5],"b":{"c":2,"d":1}}\n'
+
+    # Values orjson cannot encode fall back to the standard library
+    assert json.loads(dumps({"big": 10 ** 30})) == {"big": 10 ** 30}
+
+
+def test_flask_responses_use_shared_encoder():
+    pytest.importorskip("flask")
+    from api.app import app
+
+    case = {"medicine": "crocin", "dose": 500, "other_meds": ["dolo_650"], "time": "14:00"}
+    response = app.test_client().post("/analyze", json=case)
+
+    assert response.mimetype == "application/json"
+    assert response.data == dumps(analyze_and_explain(case))
@@ -0,0 +1,132 @@
+import pytest
+
+from engine.analyzer import analyze
+from engine.session import MemorySessionStore, SQLiteSessionStore, add_dose, update_profile
+from engine.timeline import parse_timestamp
+
+
+PROFILE = {"age": 34, "weight": 60, "other_meds": ["ibuprofen"]}
+
+DOSES = [
+    {"medicine": "crocin", "dose": 1000, "time": "2026-01-31T08:00"},
+    {"medicine": "paracetamol", "dose": 1000, "time": "2026-01-31T10:00"},
+    {"medicine": "paracetamol", "dose": 1000, "time": "2026-01-31T16:00"},
+    {"medicine": "aspirin", "dose": 300, "time": "2026-01-31T18:00"},
+    {"medicine": "paracetamol", "dose": 500, "time": "2026-02-01T09:00"},
+]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore()
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"))
+
+
+def test_incremental_doses_match_full_analysis(store):
+    session = store.create(PROFILE)
+    previous = None
+
+    for i, dose in enumerate(DOSES):
+        answer = add_dose(store, session, dose)
+        expected = analyze({**PROFILE, **dose, "dose_events": DOSES[:i]})
+
+        assert (answer["risk_level"], answer["score"]) == (expected["risk_level"], expected["score"])
+        assert session.result == expected
+
+        changed = answer["delta"]["changed"]
+        assert all(expected[key] == value for key, value in changed.items())
+        if previous is not None:
+            assert set(changed) == {k for k in expected if k != "conflicts" and previous.get(k) != expected[k]}
+        previous = expected
+
+    assert store.get(session.id).doses == len(DOSES)
+
+
+def test_rejected_dose_is_not_recorded(store):
+    session = store.create(PROFILE)
+
+    assert add_dose(store, session, {"medicine": "paracetamol", "dose": -5, "time": "2026-01-31T08:00"}) == {"error": "Invalid dose value"}
+    assert session.doses == 0
+
+
+def test_profile_change_reruns_profile_stages(store):
+    session = store.create({"age": 30})
+    add_dose(store, session, DOSES[0])
+
+    assert update_profile(store, session, {"pregnant": "yes"}) == {"error": "Invalid pregnant format: must be true or false"}
+    update_profile(store, session, {"alcohol": True})
+
+    answer = add_dose(store, session, {"medicine": "crocin", "dose": 500, "time": "2026-01-31T20:00"})
+    assert answer["risk_level"] == "HIGH RISK"
+    assert any("Alcohol" in c["risk"] for c in answer["delta"]["conflicts_added"])
+
+
+def test_sqlite_sessions_are_shared_between_stores(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first, second = SQLiteSessionStore(path), SQLiteSessionStore(path)
+
+    session = first.create(PROFILE)
+    add_dose(first, session, DOSES[0])
+
+    other = second.get(session.id)
+    add_dose(second, other, DOSES[1])
+
+    # The first store notices the newer revision and reloads the timeline
+    reloaded = first.get(session.id)
+    assert reloaded.doses == 2
+    assert reloaded.result == analyze({**PROFILE, **DOSES[1], "dose_events": DOSES[:1]})
+
+
+def test_stale_session_is_reloaded_before_writing(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first, second = SQLiteSessionStore(path), SQLiteSessionStore(path)
+
+    session = first.create(PROFILE)
+    add_dose(first, session, DOSES[0])
+    add_dose(second, second.get(session.id), DOSES[1])
+    update_profile(second, second.get(session.id), {"alcohol": True})
+
+    # `session` still has one dose and no alcohol; the write notices and redoes the analysis
+    answer = add_dose(first, session, DOSES[2])
+    assert answer["doses"] == 3
+
+    reloaded = second.get(session.id)
+    assert reloaded.doses == 3 and reloaded.profile["alcohol"] is True
+    assert reloaded.result == analyze({**PROFILE, "alcohol": True, **DOSES[2], "dose_events": DOSES[:2]})
+
+    update_profile(second, reloaded, {"age": 40})
+    assert update_profile(first, session, {"weight": 70})["profile"] == {**PROFILE, "alcohol": True, "age": 40, "weight": 70}
+
+
+def test_combination_dose_is_recorded_for_every_ingredient(store):
+    combination = {"medicine": "combiflam", "dose": 400, "time": "2026-01-31T08:00"}
+    dose = {"medicine": "brufen", "dose": 400, "time": "2026-01-31T10:00"}
+    session = store.create({})
+    add_dose(store, session, combination)
+    add_dose(store, session, dose)
+
+    # The ibuprofen in combiflam counts towards spacing and the daily total
+    assert session.result == analyze({**dose, "dose_events": [combination]})
+    assert (session.result["total_dose"], session.result["issues"]) == (800, ["Dose taken too soon"])
+    assert store.get(session.id).timeline.window_doses("ibuprofen", parse_timestamp("2026-01-31T12:00")) == [400, 400]
+
+
+def test_session_api_flow():
+    pytest.importorskip("flask")
+    from api.app import app
+
+    client = app.test_client()
+
+    created = client.post("/sessions", json={"weight": 20})
+    assert created.status_code == 201
+    session_id = created.get_json()["session_id"]
+
+    dosed = client.post(f"/sessions/{session_id}/doses", json={"medicine": "paracetamol", "dose": 250, "time": "2026-01-31T08:00"})
+    assert dosed.status_code == 200
+    assert dosed.get_json()["doses"] == 1
+
+    assert client.post(f"/sessions/{session_id}/doses", json={"medicine": "paracetamol"}).status_code == 400
+    assert client.get(f"/sessions/{session_id}").get_json()["result"]["total_dose"] == 250
+    assert client.delete(f"/sessions/{session_id}").status_code == 200
+    assert client.get(f"/sessions/{session_id}").status_code == 404
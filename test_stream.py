@@ -0,0 +1,61 @@
+import io
+import json
+
+from engine.analyzer import analyze
+from engine.stream import analyze_stream, main, read_ndjson
+from test_engine import tests as ENGINE_CASES
+
+
+def _lines(records):
+    return [json.dumps(record) + "\n" for record in records]
+
+
+def test_output_follows_input_order():
+    records = ENGINE_CASES * 3
+    output = list(analyze_stream(read_ndjson(_lines(records)), chunk_size=4))
+
+    assert [line for line, _ in output] == list(range(1, len(records) + 1))
+    assert [result for _, result in output] == [analyze(record) for record in records]
+
+
+def test_invalid_line_yields_error_record_and_stream_continues(monkeypatch, capsys):
+    lines = _lines(ENGINE_CASES[:2]) + ["{not json\n", "\n"] + _lines(ENGINE_CASES[2:4])
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(lines)))
+
+    assert main(["--chunk-size", "2"]) == 0
+    out, err = capsys.readouterr()
+    output = [json.loads(line) for line in out.splitlines()]
+
+    # The blank line is skipped, the invalid one answered in place
+    assert [record["line"] for record in output] == [1, 2, 3, 5, 6]
+    assert output[2]["result"] == {"error": "Invalid JSON"}
+    assert output[3]["result"] == analyze(ENGINE_CASES[2])
+    assert json.loads(err.splitlines()[-1])["summary"]["records"] == 5
+
+
+def _in_flight(chunk_size, workers, count=200):
+    """
+    Largest number of records read from the input but not yet answered.
+    """
+
+    read = 0
+
+    def records():
+        nonlocal read
+        for line_number in range(1, count + 1):
+            read += 1
+            yield line_number, ENGINE_CASES[line_number % len(ENGINE_CASES)]
+
+    peak = answered = 0
+    for _ in analyze_stream(records(), chunk_size=chunk_size, workers=workers):
+        answered += 1
+        peak = max(peak, read - answered + 1)
+
+    assert answered == count
+    return peak
+
+
+def test_records_in_flight_stay_bounded():
+    assert _in_flight(chunk_size=10, workers=None) <= 10
+    # imap_chunks keeps up to 2 * workers chunks submitted
+    assert _in_flight(chunk_size=10, workers=2) <= 2 * 2 * 10
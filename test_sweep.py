@@ -0,0 +1,63 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from engine.analyzer import analyze
+from engine.sweep import RISK_LEVELS, sweep, time_grid
+
+
+TIMES = time_grid(step_minutes=45)
+DOSES = [100, 250, 500, 650, 900, 1000, 1200]
+WEIGHTS = [None, 3, 12.5, 30, 70]
+
+SCENARIOS = [
+    {"medicine": "paracetamol", "previous_time": "08:00", "dose_history": [1000, 500]},
+    {"medicine": "crocin", "previous_time": "22:30", "other_meds": ["dolo_650"]},
+    {"medicine": "ibuprofen", "previous_time": "13:15", "dose_history": [400], "age": 8},
+    {"medicine": "aspirin", "other_meds": ["ibuprofen"], "pregnant": True},
+    {"medicine": "paracetamol", "alcohol": True},
+    {"medicine": "cetirizine", "previous_time": "01:00", "age": 30},
+    # Score over 60 without a critical conflict: near-limit still lowers it to CAUTION
+    {"medicine": "calpol", "other_meds": ["alcohol"], "dose_history": [1000, 1000, 1000]},
+]
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_sweep_matches_analyze_cell_for_cell(scenario):
+    grid = sweep(scenario, DOSES, TIMES, WEIGHTS)
+
+    assert grid["score"].shape == grid["risk"].shape == (len(WEIGHTS), len(TIMES), len(DOSES))
+
+    for w, weight in enumerate(WEIGHTS):
+        for t, time in enumerate(TIMES):
+            for d, dose in enumerate(DOSES):
+                data = {
+                    **scenario,
+                    "dose": dose,
+                    "dose_history": scenario.get("dose_history", []) + [dose],
+                    "time": time
+                }
+                if weight is not None:
+                    data["weight"] = weight
+
+                expected = analyze(data)
+                cell = (w, time, dose)
+
+                assert grid["score"][w, t, d] == expected["score"], cell
+                assert RISK_LEVELS[grid["risk"][w, t, d]] == expected["risk_level"], cell
+
+
+def test_sweep_near_limit_overrides_high_score():
+    case = {"medicine": "calpol", "other_meds": ["alcohol"], "dose_history": [1000, 1000, 1000]}
+    expected = analyze({**case, "dose": 1000, "dose_history": [1000] * 4, "time": "10:00"})
+    assert (expected["score"], expected["risk_level"]) == (65, "CAUTION")
+
+    grid = sweep(case, [1000], ["10:00"])
+    assert grid["score"][0, 0, 0] == 65
+    assert RISK_LEVELS[grid["risk"][0, 0, 0]] == "CAUTION"
+
+
+def test_sweep_reports_analyze_errors():
+    assert sweep({"medicine": "randompill"}, DOSES) == {"error": "Medicine not found in rules"}
+    assert sweep({"medicine": "paracetamol"}, [0]) == {"error": "Invalid dose value"}
+    assert sweep({"medicine": "paracetamol"}, DOSES, weights=[-2]) == {"error": "Invalid weight value: must be positive"}
@@ -0,0 +1,33 @@
+from engine.analyzer import analyze_many
+from engine.compile_rules import validate
+from engine.rulebook import get_rulebook, load_rulebook
+from benchmarks.synthetic import formulary, workload, write_formulary
+
+
+def test_formulary_is_deterministic_and_valid():
+    rules, interactions, brand_map = formulary(300, 2000, seed=7)
+
+    assert (rules, interactions, brand_map) == formulary(300, 2000, seed=7)
+    assert formulary(300, 2000, seed=8) != (rules, interactions, brand_map)
+
+    assert validate(rules, interactions, brand_map) == ([], [])
+    assert len(rules) == 300 and len(interactions) == 2000 and len(brand_map) == 150
+    assert any(len(ingredients) > 1 for ingredients in brand_map.values())
+
+    pairs = {frozenset((entry["drugA"], entry["drugB"])) for entry in interactions}
+    assert len(pairs) == len(interactions)
+
+
+def test_workload_runs_against_written_files(tmp_path):
+    data = formulary(300, 2000, seed=1, base=get_rulebook().to_data())
+    write_formulary(str(tmp_path), *data)
+
+    rulebook = load_rulebook(str(tmp_path))
+    assert len(rulebook.rules) == len(data[0]) and len(rulebook.interactions) == len(data[1])
+
+    items = list(workload(rulebook.rules, rulebook.brand_map, 200, seed=1))
+    assert items == list(workload(rulebook.rules, rulebook.brand_map, 200, seed=1))
+    assert all(1 <= len(item["other_meds"]) <= 30 for item in items)
+
+    results = analyze_many(items, rulebook)
+    assert not [result for result in results if "error" in result]
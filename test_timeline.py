@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from engine.analyzer import analyze, calculate_remaining_time
+from engine.spacing import check_spacing
+from engine.timeline import DoseEvent, DoseTimeline
+
+
+START = datetime(2026, 1, 31, 8, 0)
+
+
+def test_spacing_wraps_past_midnight():
+    assert check_spacing("23:00", "01:00", 4)
+    assert not check_spacing("22:00", "02:00", 4)
+    assert calculate_remaining_time("23:00", "01:00", 4) == 2.0
+
+
+def test_rolling_window_matches_a_scan():
+    events = [DoseEvent(START + timedelta(hours=5 * i), "paracetamol", 100 + i) for i in range(200)]
+    # Out-of-order arrival must give the same answers
+    timeline = DoseTimeline(events[::2])
+    for event in events[1::2]:
+        timeline.add(event)
+
+    for hours in range(0, 1000, 7):
+        at = START + timedelta(hours=hours, minutes=30)
+        window = [e.dose for e in events if at - timedelta(hours=24) < e.taken_at <= at]
+        before = [e.taken_at for e in events if e.taken_at <= at]
+
+        assert timeline.window_doses("paracetamol", at) == window
+        assert timeline.window_total("paracetamol", at) == sum(window)
+        assert timeline.last_before("paracetamol", at) == (max(before) if before else None)
+
+
+def test_analyze_with_dose_events_across_month_end():
+    events = [
+        {"medicine": "crocin", "dose": 1000, "time": "2026-01-31T08:00"},
+        {"medicine": "paracetamol", "dose": 1000, "time": "2026-01-31T14:00"},
+        {"medicine": "paracetamol", "dose": 1000, "time": "2026-01-31T20:00"},
+        {"medicine": "ibuprofen", "dose": 400, "time": "2026-01-31T23:00"},
+    ]
+
+    def run(time):
+        return analyze({"medicine": "paracetamol", "dose": 500, "time": time, "dose_events": events})
+
+    too_soon = run("2026-01-31T23:30")
+    assert too_soon["total_dose"] == 3500
+    assert "Wait about 30 minutes before the next dose." in too_soon["guidance"]
+
+    # The 08:00 dose has left the 24h window by the next morning
+    assert run("2026-02-01T09:00")["total_dose"] == 2500
+    assert run("2026-02-01T09:00")["risk_level"] == "SAFE"
+
+    assert run("14:00") == {"error": "Invalid time format. Use an ISO 8601 timestamp with dose_events"}